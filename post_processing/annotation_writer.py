@@ -10,6 +10,10 @@ import numpy as np
 from io_utils import PostprocessUtils
 from io_utils import LabelFilter
 
+# tar shards are written by the simulator; see src/tools/tar_shards.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.tools.tar_shards import CTarShardReader
+
 class AnnotationWriter():
     def __init__(self, cfg):
         self.base_path = cfg.BASE_PATH 
@@ -29,6 +33,8 @@ class AnnotationWriter():
 
         self.data = {}
 
+        self.shard_files = {} # files of batches, which are packed into tar shards; path -> [reader, name in shard]
+
         self.data_size = None
 
         self.n_remaining_labels = 0
@@ -68,7 +74,7 @@ class AnnotationWriter():
                     g_str = d['glob']
                     in_dir = os.path.join(b_path, sensor, g_str) # assumption of path structure: base_path/[sensor]/[channel_glob]
 
-                    _files = glob.glob(in_dir)
+                    _files = glob.glob(in_dir) + self._glob_shards(b_path, sensor + "/" + g_str)
                     assert len(_files) != 0, "no files found here: " + in_dir
 
                     ch_files.extend(_files)
@@ -86,6 +92,29 @@ class AnnotationWriter():
 
         return 
 
+    def _glob_shards(self, batch_path, pattern):
+        """ finds files of a batch, which are packed into tar shards; the files keep their original path
+
+        Args:
+            batch_path: path to batch folder
+            pattern: pattern of files relative to the batch folder, e.g. [sensor]/[channel_glob]
+
+        Returns:
+            list of original file paths
+        """
+        shard_path = os.path.join(batch_path, "shards")
+        if not os.path.exists(os.path.join(shard_path, "index.jsonl")):
+            return []
+
+        reader = CTarShardReader(shard_path)
+        files = []
+        for name in reader.get_names(pattern):
+            file_path = os.path.join(batch_path, *name.split("/"))
+            self.shard_files[file_path] = [reader, name]
+            files.append(file_path)
+
+        return files
+
     def _filter_data(self, data, label_key="inst_label"):
         "applies label filter on data"
 
@@ -132,6 +161,11 @@ class AnnotationWriter():
             image (np.array)
     
         """
+        if image_path in self.shard_files:
+            reader, name = self.shard_files[image_path]
+            _buffer = np.frombuffer(reader.read(name), dtype=np.uint8)
+            return cv2.imdecode(_buffer, cv2.IMREAD_ANYCOLOR | cv2.IMREAD_ANYDEPTH)
+
         image = cv2.imread(image_path, cv2.IMREAD_ANYCOLOR | cv2.IMREAD_ANYDEPTH)
         return image
 
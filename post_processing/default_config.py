@@ -23,6 +23,7 @@ _C.SENSORS = ["sensor_1", "sensor_2"] # name of sensors which should be consider
 #    "glob": [common pattern of related channel], # required for finding channel files 
 #    "post_process": [post_processing name], # this is mainly for labels but can also be used to trim the depth maps; see also PostprocessUtils in io_utils.py, there also new post_processing methods can be defined;
 #        currently for label-channels: "post_process":"denoise_label" and for depth-channels: "post_process":"trim_channels"
+#        for label ID channels of the AOVPass (labelOutputMode "ID"): "post_process":"label_id"; num_classes is not needed
 #    "num_classes": post_processing(denoise label) required parameter; please see cfg parameters maxInstanceLabelPerChannel(for instance labels) and num_labels_per_channel (for semantic labels)
 #   }
 #}
@@ -33,7 +34,10 @@ _C.DATA_DEF = [{
     'sensor_1':{ # specific channel definitions for SENSOR member rgbLeft
         #"inst_label":{"post_process":"denoise_label", "num_classes": 51, "glob":"*instance_label*"},
         #"sem_label":{"post_process":"denoise_label", "num_classes": 15, "glob":"*semantic_label*"},
+        #"inst_label":{"post_process":"label_id", "glob":"*instance_id*"},
+        #"sem_label":{"post_process":"label_id", "glob":"*semantic_id*"},
         #"pinhole_depth":{"glob":"*pinhole_depth_00.exr", "post_process":"trim_channels"},
+        #"pinhole_depth":{"glob":"*pinhole_depth_00.png", "post_process":"scaled_depth", "depth_scale": 1000.0},
         #"euclidean_depth":{"glob":"*depth_euclidean.exr", "post_process":"trim_channels"},
     },
     'sensor_2':{}
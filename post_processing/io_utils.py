@@ -36,10 +36,38 @@ class PostprocessUtils:
         _out = _label[:,:,0] + _label[:,:,1] * num_classes + _label[:,:,2] * num_classes**2
         return _out
 
+    @staticmethod
+    def label_id(input_label, cfg=None):
+        """ Convert label ID images (AOVPass with labelOutputMode "ID") to integer labels; no binning is needed
+        Args:
+            input_label: single channel label image; 32 bit float (EXR) or 16 bit integer (PNG)
+            cfg: channel definition; not used
+        Returns:
+            integer label map
+        """
+        if input_label.ndim == 3:
+            input_label = input_label[:,:,0]
+
+        # IDs are rendered with one sample and without pixel filter, the stored values are integers already
+        return np.rint(input_label).astype(int)
+
     @staticmethod
     def trim_channels(_map, cfg=None):
         return _map[:,:,0] 
 
+    @staticmethod
+    def scaled_depth(_map, cfg=None):
+        """ Convert depth of integer images (depthFormat with depthScale) to meters
+        Args:
+            _map: depth image; single channel or first channel is used
+            cfg: channel definition; requires depth_scale, see depthScale of the render pass
+        Returns:
+            depth map
+        """
+        if _map.ndim == 3:
+            _map = _map[:,:,0]
+        return _map.astype(np.float32) / cfg.get('depth_scale', 1.0)
+
 class LabelFilter:
 
     @staticmethod
@@ -0,0 +1,23 @@
+import argparse
+import glob
+import os
+import sys
+
+# tar shards are written by the simulator; see src/tools/tar_shards.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.tools.tar_shards import pack_batch_folder
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="packs the rendered files of OAISYS batches into tar shards with an index of byte offsets"
+    )
+    parser.add_argument("--base-path", required=True, type=str, help="path to the rendered image batches")
+    parser.add_argument("--batch-glob", default="batch_*", type=str, help="common pattern of the batch folders")
+    parser.add_argument("--max-shard-size", default=1024**3, type=int, help="size in bytes, after which a new shard is started")
+    parser.add_argument("--remove-files", action="store_true", help="remove files after they are packed")
+    args = parser.parse_args()
+
+    for batch_path in sorted(glob.glob(os.path.join(args.base_path, args.batch_glob))):
+        n_files = pack_batch_folder(batch_path, max_shard_size=args.max_shard_size, remove_files=args.remove_files)
+        print(f"{batch_path}: {n_files} files packed")
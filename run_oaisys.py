@@ -16,6 +16,10 @@ else:
     import contextlib
 
 import uuid
+import json
+import re
+import threading
+from datetime import datetime
 
 
 def extract_file(output_dir: str, file: str, mode: str = "ZIP"):
@@ -38,6 +42,11 @@ parser.add_argument('args', metavar='arguments', nargs='*', help='Additional arg
 parser.add_argument('--blender-install-path', dest='blender_install_path', default=None, help="Set path where blender should be installed. If None is given, /home_local/<env:USER>/blender/ is used per default. This argument is ignored if it is specified in the given YAML config.")
 parser.add_argument('--reinstall-blender', dest='reinstall_blender', action='store_true', help='If given, the blender installation is deleted and reinstalled. Is ignored, if a "custom_blender_path" is configured in the configuration file.')
 parser.add_argument('--config-file', dest='config_file',  default=None, help='config file path.')
+parser.add_argument('--workers', dest='workers', type=int, default=1, help='Number of blender processes, which are launched on this host. Each process renders a disjoint slice of numBatches and the available CPU threads are split evenly across the processes.')
+parser.add_argument('--resume', dest='resume', default=None, help='Existing output folder of a previous run (e.g. oaisys_tmp/<timestamp>). The folder is reused and all batches, which are already complete, are skipped.')
+parser.add_argument('--serve', dest='serve', default=None, help='Path of a UNIX socket. If given, a persistent blender worker is started, which receives config jobs on this socket (see src/tools/worker_client.py) instead of running a single config file.')
+parser.add_argument('--render-folder', dest='render_folder', default=None, help='Output folder of a run with renderMode "deferred" (e.g. oaisys_tmp/<timestamp>). If given, the saved batches are rendered by --workers blender processes, which split every render job into frame ranges, instead of running a config file.')
+parser.add_argument('--frames-per-chunk', dest='frames_per_chunk', type=int, default=0, help='Number of frames per animation render with --render-folder. If < 1, every render job is split evenly across the workers.')
 parser.add_argument('-h', '--help', dest='help', action='store_true', help='Show this help message and exit.')
 args = parser.parse_args()
 blender_install_path = args.blender_install_path
@@ -159,21 +168,138 @@ if config_file is None:
     print("WARNING: no config file provided! Will use default cfg file!")
     config_file = os.path.join(repo_root_directory,"cfgExamples/OAISYS_default_cfg.json")
 
-p = subprocess.Popen([blender_run_path, "--background", "--python-use-system-env", "--python-exit-code", "2", "--python", path_src_run, "--", "-c", config_file],
-                             env=dict(os.environ, PYTHONPATH=os.getcwd(), PYTHONNOUSERSITE="1"), cwd=repo_root_directory)
+def get_worker_slices(num_batches, output_id_offset, num_workers):
+    """ split batches into disjoint, contiguous slices; one slice per worker
+    Args:
+        num_batches:            number of batches defined in cfg [int]
+        output_id_offset:       outputIDOffset defined in cfg [int]
+        num_workers:            number of requested worker processes [int]
+    Returns:
+        list of (num_batches, output_id_offset) tuples, one per worker [list]
+    """
+    num_workers = max(1, min(num_workers, num_batches))
+    _slices = []
+    _offset = output_id_offset
+    for worker_id in range(0, num_workers):
+        _num_worker_batches = num_batches // num_workers + (1 if worker_id < num_batches % num_workers else 0)
+        _slices.append((_num_worker_batches, _offset))
+        _offset += _num_worker_batches
+    return _slices
+
+
+blender_cmd = [blender_run_path, "--background", "--python-use-system-env", "--python-exit-code", "2"]
+blender_env = dict(os.environ, PYTHONPATH=os.getcwd(), PYTHONNOUSERSITE="1")
+processes = []
+
+resume_args = []
+if args.resume is not None:
+    resume_args = ["--base-folder", os.path.abspath(args.resume), "--resume"]
+
+if args.serve is not None:
+    p = subprocess.Popen(blender_cmd + ["--python", os.path.join(repo_root_directory, "terrain_stage_simulator_2_worker.py"),
+                                        "--", "--socket", os.path.abspath(args.serve)],
+                         env=blender_env, cwd=repo_root_directory)
+    processes.append(p)
+elif args.render_folder is not None:
+    # render deferred batches; every worker renders every num_workers-th frame range of all render jobs
+    num_workers = max(1, args.workers)
+    num_threads = max(1, (os.cpu_count() or 1) // num_workers)
+    print("Launching {} render workers with {} threads each".format(num_workers, num_threads))
+    for worker_id in range(0, num_workers):
+        p = subprocess.Popen(blender_cmd + ["--threads", str(num_threads),
+                                            "--python", os.path.join(repo_root_directory,
+                                                                     "terrain_stage_simulator_2_render.py"),
+                                            "--", "--base-folder", os.path.abspath(args.render_folder),
+                                            "--worker-id", str(worker_id),
+                                            "--num-workers", str(num_workers),
+                                            "--frames-per-chunk", str(args.frames_per_chunk)],
+                             env=blender_env, cwd=repo_root_directory)
+        processes.append(p)
+elif args.workers <= 1:
+    p = subprocess.Popen(blender_cmd + ["--python", path_src_run, "--", "-c", config_file] + resume_args,
+                                 env=blender_env, cwd=repo_root_directory)
+    processes.append(p)
+else:
+    # read batch setup from cfg ########################################################################################
+    # relative cfg paths are resolved by blender from the repo root
+    with open(os.path.join(repo_root_directory, config_file), 'r') as f:
+        simulation_setup = json.load(f)["SIMULATION_SETUP"]
+    num_batches = simulation_setup["numBatches"]
+    num_samples_per_batch = simulation_setup["numSamplesPerBatch"]
+    worker_slices = get_worker_slices(num_batches, simulation_setup["outputIDOffset"], args.workers)
+    ################################################################################# end of read batch setup from cfg #
+
+    # create shared base folder; all workers write their batches into the same timestamped folder #####################
+    if args.resume is not None:
+        base_folder_path = os.path.abspath(args.resume)
+    else:
+        output_path = simulation_setup["outputPath"]
+        if not output_path:
+            output_path = os.path.join(repo_root_directory, "oaisys_tmp")
+        base_folder_path = os.path.join(os.path.abspath(output_path), datetime.now().strftime("%Y-%m-%d-%H-%M-%S"))
+    os.makedirs(base_folder_path, exist_ok=True)
+    ############################################################################################# end of create folder #
+
+    num_threads = max(1, (os.cpu_count() or 1) // len(worker_slices))
+    print("Launching {} workers with {} threads each; output: {}".format(len(worker_slices), num_threads,
+                                                                          base_folder_path))
+
+    # progress of all workers ##########################################################################################
+    progress_lock = threading.Lock()
+    progress_samples = [0] * len(worker_slices)
+    total_samples = num_batches * num_samples_per_batch
+    sample_pattern = re.compile(r"Sample \d+ / \d+")
+
+    def forward_output(worker_id, process):
+        """ forward output of worker to stdout and merge sample progress of all workers
+        Args:
+            worker_id:          id of worker [int]
+            process:            worker process [subprocess.Popen]
+        Returns:
+            None
+        """
+        for line in process.stdout:
+            with progress_lock:
+                sys.stdout.write("[worker {}] {}".format(worker_id, line))
+                if sample_pattern.search(line):
+                    progress_samples[worker_id] += 1
+                    print("[farm] samples started: {} / {}".format(sum(progress_samples), total_samples))
+                sys.stdout.flush()
+    ################################################################################### end of progress of all workers #
+
+    output_threads = []
+    for worker_id, (worker_num_batches, worker_offset) in enumerate(worker_slices):
+        p = subprocess.Popen(blender_cmd + ["--threads", str(num_threads),
+                                            "--python", path_src_run, "--", "-c", config_file,
+                                            "--num-batches", str(worker_num_batches),
+                                            "--output-id-offset", str(worker_offset),
+                                            "--base-folder", base_folder_path]
+                                           + (["--resume"] if args.resume is not None else []),
+                             env=blender_env, cwd=repo_root_directory,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        processes.append(p)
+        t = threading.Thread(target=forward_output, args=(worker_id, p))
+        t.daemon = True
+        t.start()
+        output_threads.append(t)
 
 def handle_sigterm(signum, frame):
-    clean_temp_dir()
-    p.terminate()
+    for p in processes:
+        p.terminate()
 signal.signal(signal.SIGTERM, handle_sigterm)
 
-try:
-    p.wait()
-except KeyboardInterrupt:
+returncode = 0
+for p in processes:
     try:
-        p.terminate()
-    except OSError:
-        pass
-    p.wait()
+        p.wait()
+    except KeyboardInterrupt:
+        for q in processes:
+            try:
+                q.terminate()
+            except OSError:
+                pass
+        p.wait()
+    if p.returncode != 0:
+        returncode = p.returncode
 
-exit(p.returncode)
+exit(returncode)
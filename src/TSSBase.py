@@ -2,15 +2,23 @@
 #import bpy
 
 # utility imports
+import array
 import json
 import os
 import inspect
 
 # OAISYS imports
 from src.utilities.OAISYSLogger import OAISYSLogger
+from src.tools.cfg_cache import CCfgCache
+from src.tools.keyframe_buffer import CKeyframeBuffer
 
 class TSSBase(object):
     """docstring for TSSBase"""
+
+    # passes, which do not have own pass entries, but use the ones of another pass; e.g. AOVPass renders the scene in
+    # the RGBDPass state and gets the labels from shader AOVs
+    PASS_ENTRY_ALIASES = {"AOVPass": "RGBDPass"}
+
     def __init__(self):
         super(TSSBase, self).__init__()
         # common vars ##################################################################################################
@@ -25,6 +33,8 @@ class TSSBase(object):
                                             #                       2 -> sub module
         self._logger = OAISYSLogger()       # logger of meta data
         self._verbose = False               # flag if debug data is displayed
+        self._compiled_pass_maps = {}       # compiled pass maps; id of pass map -> [pass map, compiled entries] [dict]
+        self._keyed_sockets = set()         # pointers of sockets, which got a keyframe by eval_pass_map [set]
         ########################################################################################### end of common vars #
 
         # load default cfg file if available
@@ -45,6 +55,8 @@ class TSSBase(object):
         self._trigger_interval = 1
         self._stepping_counter = 0
         self._logger = OAISYSLogger()
+        self._compiled_pass_maps = {}
+        self._keyed_sockets = set()
 
 
     def create(self,cfg):
@@ -152,6 +164,10 @@ class TSSBase(object):
             None
         """
 
+        # use pass entries of aliased pass, if pass has no own entries
+        if pass_name not in self._pass_dict:
+            pass_name = self.PASS_ENTRY_ALIASES.get(pass_name, pass_name)
+
         # activate pass
         if pass_name in self._pass_dict:
             self.eval_pass_map(self._pass_dict[pass_name], keyframe)
@@ -215,10 +231,9 @@ class TSSBase(object):
         _default_cfg_path = os.path.join(_default_cfg_path,self.__class__.__name__+"_cfg.json")
         ############################################################################## end of compile default cfg path #
 
-        # load default cfg file ########################################################################################
+        # load default cfg file; parsed files are cached for the whole process ########################################
         if os.path.isfile(_default_cfg_path):
-            with open(_default_cfg_path, 'r') as f:
-                self._cfg = json.load(f)
+            self._cfg = CCfgCache.load(file_path=_default_cfg_path)
         ################################################################################# end of load default cfg file #
 
 
@@ -327,7 +342,10 @@ class TSSBase(object):
         """
 
         # def local var
-        _node_Found = False
+        _node_found = False
+
+        # pass maps have to be compiled again
+        self._compiled_pass_maps = {}
 
         # check if pass name exist already #############################################################################
         if pass_name in self._pass_dict:
@@ -345,7 +363,7 @@ class TSSBase(object):
             ########################################################################### end of go through node handles #
 
             # create new list entry ####################################################################################
-            if not _node_Found:
+            if not _node_found:
                 _pass_entry = {}
                 _pass_entry["nodeHandle"] = node_handle
                 _pass_entry[value_type] = [value]
@@ -371,6 +389,7 @@ class TSSBase(object):
         """
 
         self._pass_dict = pass_dict
+        self._compiled_pass_maps = {}
 
 
     def additional_pass_action(self,pass_name, pass_cfg, keyframe):
@@ -388,52 +407,80 @@ class TSSBase(object):
         pass
 
 
-    def eval_pass_map(self, pass_map, keyframe=-1):
-        """ go through pass_map and set defined values. Set keyframes if desired.
+    def _compile_pass_map(self, pass_map):
+        """ compile pass_map into flat list of socket entries; sockets, which are listed several times, are only set
+            to their last value
             DO NOT OVERWRITE!
         Args:
             pass_map:       sub dict of self._pass_dict [dict]
-            keyframe:       current frame number; if value > -1, this should enable also the setting of a keyframe [int]
         Returns:
-            None
+            compiled entries; [socket, pointer of socket, value, True if value is an array] [list]
         """
 
-        # local vars ###################################################################################################
-        _node_handle = None             # node handle [blender Object]
-        ############################################################################################ end of local vars #
-
-        # iterate through items in pass_map ############################################################################
-        for pass_map_value in pass_map:#.items():
-            # get node handle for setting params
+        _entries = {}
+        for pass_map_value in pass_map:
             _node_handle = pass_map_value['nodeHandle']
+            for value_type in ['inputs', 'outputs']:
+                for param in pass_map_value.get(value_type, []):
+                    _socket = getattr(_node_handle, value_type)[param[0]]
+
+                    # values are rounded to single precision, so that they compare equal to the values of the socket
+                    _is_array = isinstance(param[1], (list, tuple))
+                    if _is_array:
+                        _value = tuple(array.array('f', param[1]))
+                    elif isinstance(param[1], float):
+                        _value = array.array('f', [param[1]])[0]
+                    else:
+                        _value = param[1]
+
+                    _entries[_socket.as_pointer()] = [_socket, _socket.as_pointer(), _value, _is_array]
 
-            # set node inputs ##########################################################################################
-            if 'inputs' in pass_map_value:
-                for param in pass_map_value['inputs']:
-                    # set node input value
-                    _node_handle.inputs[param[0]].default_value = param[1]
+        return list(_entries.values())
+
+
+    def eval_pass_map(self, pass_map, keyframe=-1):
+        """ go through pass_map and set defined values. Set keyframes if desired. The pass_map is compiled once into a
+            flat list of sockets; only sockets, which differ from their current value, are set. With keyframes, every
+            socket gets a keyframe, when it is set the first time and whenever its value changes; since all keyframes
+            are constant, the skipped keyframes would not change the result.
+            DO NOT OVERWRITE!
+        Args:
+            pass_map:       sub dict of self._pass_dict [dict]
+            keyframe:       current frame number; if value > -1, this should enable also the setting of a keyframe [int]
+        Returns:
+            None
+        """
 
-                    # set keyframe if desired
-                    if keyframe > -1:
-                        _node_handle.inputs[param[0]].keyframe_insert('default_value', frame=keyframe)
-            #################################################################################### end of set node inputs#
+        # get compiled pass map ########################################################################################
+        _compiled_pass_map = self._compiled_pass_maps.get(id(pass_map))
+        if _compiled_pass_map is None or _compiled_pass_map[0] is not pass_map:
+            # the pass map is stored with its entries, so that its id is not reused
+            _compiled_pass_map = [pass_map, self._compile_pass_map(pass_map=pass_map)]
+            self._compiled_pass_maps[id(pass_map)] = _compiled_pass_map
+        ################################################################################# end of get compiled pass map #
 
-            # set node outputs #########################################################################################
-            if 'outputs' in pass_map_value:
-                for param in pass_map_value['outputs']:
-                    # set node output value
-                    _node_handle.outputs[param[0]].default_value = param[1]
+        # set changed sockets ##########################################################################################
+        for _socket, _pointer, _value, _is_array in _compiled_pass_map[1]:
+            _current_value = _socket.default_value
+            if _is_array:
+                _current_value = tuple(_current_value)
 
-                    # set keyframe if desired
-                    if keyframe > -1:
-                        _node_handle.outputs[param[0]].keyframe_insert('default_value', frame=keyframe)
-            ################################################################################## end of set node outputs #
+            if _current_value != _value:
+                _socket.default_value = _value
+            elif keyframe < 0 or _pointer in self._keyed_sockets:
+                continue
 
-        ##################################################################### end of iterate through items in pass_map #
+            # set keyframe if desired; keyframes are buffered and written at the end of the batch
+            if keyframe > -1:
+                CKeyframeBuffer.insert(data=_socket, data_path='default_value', frame=keyframe)
+                self._keyed_sockets.add(_pointer)
+        ################################################################################### end of set changed sockets #
 
 
     def _set_keyframe_interpolation(self, node_tree, interpolation='CONSTANT'):
-        """ set keyframe interpolation for given node tree
+        """ set keyframe interpolation for given node tree; only the last keyframe of each fcurve is set, since new
+            keyframes are appended and the previous ones were set by earlier calls. All keyframes of a batch are set to
+            constant at the end of the batch.
             DO NOT OVERWRITE!
         Args:
             node_tree:      node tree [blObject]
@@ -442,11 +489,11 @@ class TSSBase(object):
             None
         """
 
-        if node_tree is not None:
+        if node_tree is not None and node_tree.node_tree.animation_data is not None:
             _fcurves = node_tree.node_tree.animation_data.action.fcurves
             for fcurve in _fcurves:
-                for kf in fcurve.keyframe_points:
-                    kf.interpolation = interpolation
+                if len(fcurve.keyframe_points) > 0:
+                    fcurve.keyframe_points[-1].interpolation = interpolation
 
 
     # define color scheme ##############################################################################################
@@ -18,13 +18,42 @@ import src.handle.TSSRenderHandle as RenderHandle
 import src.handle.TSSEnvironmentEffectHandle as TSSEnvironmentEffectHandle
 import src.handle.TSSAssetHandle as TSSAssetHandle
 import src.handle.TSSRenderPostProcessingHandle as RenderPostProcessingHandle
+from src.tools.scene_reset import CSceneReset
+from src.tools.timing_module import CTimingModule
+from src.tools.deferred_render import CDeferredRender
+from src.tools.tar_shards import CTarShardWriter, pack_batch_folder
+from src.tools.cfg_cache import CCfgCache
+from src.tools.image_cache import CImageCache
+from src.tools.texture_mip_cache import CTextureMipCache
+from src.tools.node_group_library import CNodeGroupLibrary
+from src.tools.keyframe_buffer import CKeyframeBuffer
+from src.TSSBase import TSSBase
+from src.utilities.OAISYSLogger import OAISYSLogger
+from src.rendering.TSSRenderPass import TSSRenderPass
+from src.render_post_processing.TSSRenderPostProcessing import TSSRenderPostProcessing
 
 
 class TSS_OP_CStageSimulator():
     bl_idname = "example.func_2"
     bl_label = "create Stage"
 
-    def execute(self, cfg_path):
+    BATCH_COMPLETE_RECORD = CDeferredRender.BATCH_COMPLETE_RECORD
+
+    def execute(self, cfg_path, num_batches=None, output_id_offset=None, base_folder_path=None, resume=False,
+                stop_requested=None):
+        """ run simulation for cfg file
+        Args:
+            cfg_path:           path to cfg file [str]
+            num_batches:        overwrites numBatches of cfg, if not None [int]
+            output_id_offset:   overwrites outputIDOffset of cfg, if not None [int]
+            base_folder_path:   existing base output folder, which is used instead of creating a new timestamped
+                                folder, if not None [str]
+            resume:             if True, batches in base_folder_path which are marked as complete are skipped [bool]
+            stop_requested:     optional callable, which is checked before every batch; if it returns True, the
+                                simulation is stopped [callable]
+        Returns:
+            {'FINISHED'} or {'CANCELLED'}, if stopped by stop_requested
+        """
 
         self._print_welcome()
 
@@ -54,6 +83,8 @@ class TSS_OP_CStageSimulator():
 
         # retrieve sample information
         _num_batches = _simulation_setup_dict["numBatches"]
+        if num_batches is not None:
+            _num_batches = num_batches
         _num_samples_per_batch = _simulation_setup_dict["numSamplesPerBatch"]
 
         # set render images flag
@@ -61,6 +92,63 @@ class TSS_OP_CStageSimulator():
 
         # set save blender file flag
         _save_blender_files = _simulation_setup_dict["saveBlenderFiles"]
+
+        # set scene reset mode; "reopen": load start file for every batch, "inPlace": purge OAISYS data in place
+        _scene_reset_mode = "reopen"
+        if "sceneResetMode" in _simulation_setup_dict:
+            _scene_reset_mode = _simulation_setup_dict["sceneResetMode"]
+        _scene_reset = CSceneReset()
+
+        # set render mode; "still": every frame is rendered directly, "animation": all frames of a pass and sensor are
+        # rendered with one animation render, after all samples of the batch are keyframed, "deferred": the keyframed
+        # batch is saved with render jobs and rendered later by terrain_stage_simulator_2_render.py
+        _render_mode = "still"
+        if "renderMode" in _simulation_setup_dict:
+            _render_mode = _simulation_setup_dict["renderMode"]
+        if _render_mode not in ["still", "animation", "deferred"]:
+            raise Exception("Unknown renderMode " + str(_render_mode) + "!")
+
+        # set pass keyframes flag; if False, the pass values of environment effects and assets are set without
+        # keyframes, which is only possible, if every frame is rendered directly
+        _pass_keyframes = True
+        if "passKeyframes" in _simulation_setup_dict:
+            _pass_keyframes = _simulation_setup_dict["passKeyframes"]
+        if not _pass_keyframes and _render_mode != "still":
+            raise Exception("passKeyframes can only be disabled with renderMode still!")
+
+        # the swapped image of EnvHDRI with singleSlot can not be keyframed, i.e. all frames would show the last HDRI
+        for _effect_cfg in _env_setup_dict.get("ENVIRONMENT_EFFECTS", []):
+            if "EnvHDRI" == _effect_cfg["type"] and _effect_cfg["environmentEffectsParams"].get("singleSlot", False) \
+                    and _render_mode != "still":
+                raise Exception("singleSlot of EnvHDRI can only be used with renderMode still!")
+
+        # set profiling flag; if True, timings of all modules are written to the meta data of each batch
+        _profiling = False
+        if "profiling" in _simulation_setup_dict:
+            _profiling = _simulation_setup_dict["profiling"]
+
+        # set tar shard cfg; if set, the files of every sample are packed into tar shards in <batch>/shards
+        _tar_shards_cfg = None
+        if "tarShards" in _simulation_setup_dict:
+            _tar_shards_cfg = _simulation_setup_dict["tarShards"]
+
+        # set meta data logging; rows are buffered and written every flushInterval seconds and at the end of a batch,
+        # format "npz" writes one columnar file per batch instead of one csv file per identifier
+        if "metaDataLogging" in _simulation_setup_dict:
+            OAISYSLogger.configure(settings=_simulation_setup_dict["metaDataLogging"])
+
+        # set image cache; images are kept with sceneResetMode "inPlace" across batches, up to maxMemory bytes
+        if "imageCache" in _simulation_setup_dict:
+            CImageCache.configure(settings=_simulation_setup_dict["imageCache"])
+
+        # set texture mip cache; textures and HDRIs are loaded in the smallest resolution, which the sensors resolve
+        if "textureMipCache" in _simulation_setup_dict:
+            CTextureMipCache.configure(settings=_simulation_setup_dict["textureMipCache"],
+                                       sensor_cfgs=_sensor_setup_dict.get("SENSORS", []))
+
+        # set node group library; node groups of materials are built once and linked from the library afterwards
+        if "nodeGroupLibrary" in _simulation_setup_dict:
+            CNodeGroupLibrary.configure(settings=_simulation_setup_dict["nodeGroupLibrary"])
         ####################################################################### end of read in cfg and distribute data #
 
         # update output path
@@ -95,9 +183,26 @@ class TSS_OP_CStageSimulator():
         _sensor_handle = SensorHandle.TSSSensorHandle()
         ########################################################################## end of create all simulator classes #
 
+        # setup profiling ##############################################################################################
+        _timing = CTimingModule()
+        if _profiling:
+            # sub modules are registered via their base classes, once they are instantiated
+            for _profiled_class in [TSSBase, TSSRenderPass, TSSRenderPostProcessing, type(_render_handle),
+                                    type(_post_effects_handle), type(_env_handle), type(_asset_handle),
+                                    type(_sensor_handle)]:
+                CTimingModule.profile_class(_profiled_class)
+            _timing.enable()
+        else:
+            _timing.disable()
+        ####################################################################################### end of setup profiling #
+
         # create output structure ######################################################################################
         # create base folder
-        _base_folder_path = self._create_output_folder(base_path=_simulation_setup_dict['outputPath'])
+        if base_folder_path is None:
+            _base_folder_path = self._create_output_folder(base_path=_simulation_setup_dict['outputPath'])
+        else:
+            _base_folder_path = base_folder_path
+            pathlib.Path(_base_folder_path).mkdir(parents=True, exist_ok=True)
 
         # save cfg files
         self._cfg_parser.save_cfg(outputPath=_base_folder_path)
@@ -116,18 +221,50 @@ class TSS_OP_CStageSimulator():
         ###################################################################################### end of init all classes #
 
         _batch_ID_offset = _simulation_setup_dict["outputIDOffset"]
+        if output_id_offset is not None:
+            _batch_ID_offset = output_id_offset
 
         # iterate over all batches #####################################################################################
         for batch_ID in range(1, _num_batches + 1):
             self._prCyan("######################### NEXT BATCH #################################")
             sys.stdout.flush()
 
+            # stop simulation before next batch, if requested
+            if stop_requested is not None and stop_requested():
+                self._prCyan("Simulation stopped before batch " + str(batch_ID + _batch_ID_offset) + "!")
+                _timing.disable()
+                return {'CANCELLED'}
+
             # create new batch folder
             _batch_output_folder = self._create_batch_folder(base_path=_base_folder_path, batch_id= \
                 batch_ID + _batch_ID_offset)
 
-            # load start up file
-            bpy.ops.wm.open_mainfile(filepath=_start_file)
+            # skip batch if it was completed by a previous run
+            if resume and self._is_batch_complete(batch_folder_path=_batch_output_folder, render_mode=_render_mode):
+                self._prCyan("Batch " + str(batch_ID + _batch_ID_offset) + " is already complete, skipping it!")
+                _render_handle.skip_steps(num_steps=_num_samples_per_batch)
+                continue
+
+            _timing.start_batch(batch_id=batch_ID + _batch_ID_offset,
+                                log_folder_path=os.path.join(_batch_output_folder, "meta_data/profiling_data"))
+            _timing.start_sample(sample="setup")
+
+            _time_batch_setup_start = time.time()
+
+            # keyframes, which were buffered by a previous batch, which raised, reference removed data-blocks
+            CKeyframeBuffer.clear()
+
+            # load start up file or reset scene in place ###############################################################
+            if "inPlace" == _scene_reset_mode and _scene_reset.is_captured():
+                # decoded images of the image cache are kept for the next batch
+                _scene_reset.restore(keep_pointers=CImageCache.get_pointers())
+            else:
+                bpy.ops.wm.open_mainfile(filepath=_start_file)
+                CImageCache.invalidate()
+                if "inPlace" == _scene_reset_mode:
+                    _scene_reset.capture()
+            _time_scene_reset = time.time() - _time_batch_setup_start
+            ######################################################## end of load start up file or reset scene in place #
 
             # reset frame counter
             _frame = 1
@@ -152,6 +289,11 @@ class TSS_OP_CStageSimulator():
 
             #_sensor_handle._create_sensor_movement()
 
+            _timing.end_sample()
+
+            self._prCyan("Batch setup time (" + _scene_reset_mode + "): " + str(time.time() - _time_batch_setup_start) +
+                         " (scene reset: " + str(_time_scene_reset) + ")")
+
             # set metadata output folder path
             _sensor_handle.set_log_folder(log_folder_path=os.path.join(_batch_output_folder, "meta_data/sensor_data"))
             _render_handle.set_log_folder(log_folder_path=os.path.join(_batch_output_folder, "meta_data/render_data"))
@@ -160,10 +302,20 @@ class TSS_OP_CStageSimulator():
             _env_handle.set_log_folder(log_folder_path=os.path.join(_batch_output_folder, "meta_data/environment_data"))
             _asset_handle.set_log_folder(log_folder_path=os.path.join(_batch_output_folder, "meta_data/asset_data"))
 
+            # frames of each pass, sub render and sensor, which are rendered in animation or deferred mode
+            _animation_frames = {}
+
+            # create writer for tar shards of batch
+            _shard_writer = None
+            if _tar_shards_cfg is not None:
+                _shard_writer = CTarShardWriter(shard_folder_path=os.path.join(_batch_output_folder, "shards"),
+                                                max_shard_size=_tar_shards_cfg.get("maxShardSize", 1024**3))
+
             # iterate over all samples #################################################################################
             for sample in range(1, _num_samples_per_batch + 1):
 
                 _time_1 = time.time()
+                _timing.start_sample(sample=(batch_ID - 1) * _num_samples_per_batch + sample + _batch_ID_offset)
                 self._prCyan(
                     "Sample " + str((batch_ID - 1) * _num_samples_per_batch + sample + _batch_ID_offset) + " / " + \
                     str(_num_samples_per_batch * _num_batches + _batch_ID_offset))
@@ -174,11 +326,15 @@ class TSS_OP_CStageSimulator():
                 _asset_handle.step(keyframe=_frame)
                 _render_handle.step(keyframe=_frame)
 
+                # keyframe all object transforms; not all modules set keyframes for their objects
+                if _render_mode in ["animation", "deferred"]:
+                    self._keyframe_object_transforms(keyframe=_frame)
+
                 # get render pass list
                 _render_pass_list = _render_handle.get_render_pass_list()
 
                 # iterate over all render passes #######################################################################
-                for render_pass in _render_pass_list:
+                for pass_idx, render_pass in enumerate(_render_pass_list):
 
                     # activate render pass
                     render_pass.activate_pass(keyframe=_frame)
@@ -198,26 +354,34 @@ class TSS_OP_CStageSimulator():
                         # activate pass for env
                         _env_handle.activate_pass(pass_name=_render_pass_name,
                                                   pass_cfg=_pass_cfg,
-                                                  keyframe=_frame)
+                                                  keyframe=_frame if _pass_keyframes else -1)
 
                         # activate pass for assets
                         _asset_handle.activate_pass(pass_name=_render_pass_name,
                                                     pass_cfg=_pass_cfg,
-                                                    keyframe=_frame)
+                                                    keyframe=_frame if _pass_keyframes else -1)
 
                         # get list of all sensors
                         _sensor_list = _sensor_handle.get_sensor_list()
 
                         # iterate over sensors #########################################################################
-                        for sensor in _sensor_list:
+                        for sensor_idx, sensor in enumerate(_sensor_list):
                             # activate sensor
                             _sensor_pass_data = sensor.activate_pass(pass_name=_render_pass_name,
                                                                      pass_cfg=_pass_cfg,
                                                                      keyframe=_frame)
                             if _sensor_pass_data is not None:
 
-                                # render sub channel pass
-                                if _render_image:
+                                # render sub channel pass or store frame for animation render
+                                if _render_image and _render_mode in ["animation", "deferred"]:
+                                    _frames = _animation_frames.setdefault((pass_idx, sub_render_idx, sensor_idx),
+                                                                           {"sensorData": _sensor_pass_data,
+                                                                            "passCfg": _pass_cfg,
+                                                                            "keyframes": [],
+                                                                            "stepIndices": []})
+                                    _frames["keyframes"].append(_frame)
+                                    _frames["stepIndices"].append(render_pass.get_global_step_index())
+                                elif _render_image:
                                     render_pass.render(sensor_data=_sensor_pass_data,
                                                        sub_render_ID=sub_render_idx,
                                                        keyframe=_frame)
@@ -236,35 +400,195 @@ class TSS_OP_CStageSimulator():
                     _asset_handle.log_step(keyframe=_frame)
                     _render_handle.log_step(keyframe=_frame)
 
+                # pack rendered files of sample into tar shards
+                if _shard_writer is not None:
+                    self._pack_stored_files(shard_writer=_shard_writer,
+                                            batch_folder_path=_batch_output_folder,
+                                            stored_files=_render_handle.pop_stored_files())
+
+                _timing.end_sample()
                 _time_2 = time.time()
                 self._prCyan("Computation Time for Batch: " + str(_time_2 - _time_1))
             ########################################################################## end of iterate over all samples #
 
+            # write buffered keyframes of batch and set all keyframes to constant
+            CKeyframeBuffer.flush()
+            self._set_constant_interpolation()
+
+            # render keyframed batch
+            if _render_image and "animation" == _render_mode:
+                _timing.start_sample(sample="animation")
+                self._render_animation(render_pass_list=_render_handle.get_render_pass_list(),
+                                       sensor_list=_sensor_handle.get_sensor_list(),
+                                       animation_frames=_animation_frames)
+                _timing.end_sample()
+
+            # store render jobs of keyframed batch
+            _render_jobs = []
+            if _render_image and "deferred" == _render_mode:
+                _render_jobs = self._get_render_jobs(render_pass_list=_render_handle.get_render_pass_list(),
+                                                     sensor_list=_sensor_handle.get_sensor_list(),
+                                                     animation_frames=_animation_frames)
+
             # reset frame counter for blender file
             bpy.context.scene.frame_set(1)
 
-            # save file ################################################################################################
-            if _save_blender_files:
+            # save file; the blender file is always needed for deferred rendering ######################################
+            if _save_blender_files or "deferred" == _render_mode:
                 self._prCyan("SAVING BLENDER FILE!")
                 _current_batch_id_str = "{:04d}".format(batch_ID + _batch_ID_offset)
                 _blender_file_path = os.path.join(_batch_output_folder, "blender_file")
                 pathlib.Path(_blender_file_path).mkdir(parents=True, exist_ok=True)
                 _blender_file_path = os.path.join(_blender_file_path, "TSS_batch_" + _current_batch_id_str + '.blend')
                 bpy.ops.wm.save_as_mainfile(filepath=_blender_file_path)
+
+                if "deferred" == _render_mode:
+                    CDeferredRender.write_render_jobs(batch_folder_path=_batch_output_folder,
+                                                      blend_file_path=_blender_file_path,
+                                                      render_jobs=_render_jobs)
             ######################################################################################### end of save file #
 
+            # write buffered meta data of batch
+            OAISYSLogger.close_all(meta_data_path=os.path.join(_batch_output_folder, "meta_data"))
+
+            # pack remaining files of batch, e.g. meta data and files of animation renders, into tar shards
+            if _shard_writer is not None:
+                _shard_writer.close()
+                pack_batch_folder(batch_folder_path=_batch_output_folder,
+                                  max_shard_size=_tar_shards_cfg.get("maxShardSize", 1024**3),
+                                  remove_files=True)
+
+            # mark batch as complete; all renders, meta data and the blender file are written at this point. Deferred
+            # batches are only built; their batch complete record is written by the render workers (see
+            # CDeferredRender.render)
+            _record_name = self.BATCH_COMPLETE_RECORD
+            if "deferred" == _render_mode:
+                _record_name = CDeferredRender.BUILD_COMPLETE_RECORD
+            self._write_batch_complete_record(batch_folder_path=_batch_output_folder,
+                                              batch_id=batch_ID + _batch_ID_offset,
+                                              num_samples=_num_samples_per_batch,
+                                              record_name=_record_name)
+
             # reset modules ############################################################################################
+            _timing.start_sample(sample="reset")
             _sensor_handle.reset_module()
             _render_handle.reset_module()
             _env_handle.reset_module()
             _asset_handle.reset_module()
+            _timing.end_sample()
             ##################################################################################### end of reset modules #
 
+            # print and write timing table of batch
+            _timing.end_batch()
+            if _profiling:
+                self._prCyan(CCfgCache.get_summary())
+                self._prCyan(CImageCache.get_summary())
+                self._prCyan(CNodeGroupLibrary.get_summary())
+                self._prCyan(CKeyframeBuffer.get_summary())
+
         ############################################################################## end of iterate over all batches #
 
+        _timing.disable()
+
         # return
         return {'FINISHED'}
 
+    def _keyframe_object_transforms(self, keyframe):
+        """ set keyframes for location, rotation and scale of all objects of the scene
+        Args:
+            keyframe:           current frame number [int]
+        Returns:
+            None
+        """
+
+        for _object in bpy.context.scene.objects:
+            for data_path in ['location', 'rotation_euler', 'rotation_quaternion', 'scale']:
+                CKeyframeBuffer.insert(data=_object, data_path=data_path, frame=keyframe)
+
+    def _render_animation(self, render_pass_list, sensor_list, animation_frames):
+        """ render all stored frames of the batch; one animation render per pass, sub render and sensor
+        Args:
+            render_pass_list:   render passes [list]
+            sensor_list:        sensors [list]
+            animation_frames:   stored frames; (pass index, sub render index, sensor index) -> {"sensorData",
+                                "passCfg", "keyframes", "stepIndices"} [dict]
+        Returns:
+            None
+        """
+
+        for (pass_idx, sub_render_idx, sensor_idx), frames in animation_frames.items():
+            _render_pass = render_pass_list[pass_idx]
+
+            # render settings of passes are not keyframed, the ones of assets and environment effects are
+            _render_pass.activate_pass(keyframe=frames["keyframes"][0])
+            sensor_list[sensor_idx].activate_pass(pass_name=_render_pass.get_name(),
+                                                  pass_cfg=frames["passCfg"])
+
+            _render_pass.render_animation(sensor_data=frames["sensorData"],
+                                          sub_render_ID=sub_render_idx,
+                                          keyframes=frames["keyframes"],
+                                          step_indices=frames["stepIndices"])
+
+    def _get_render_jobs(self, render_pass_list, sensor_list, animation_frames):
+        """ get render jobs of all stored frames of the batch for deferred rendering; one job per pass, sub render and
+            sensor, passes with several renders (e.g. AOVPass with labelOutputMode 'ID') add one job per render
+        Args:
+            render_pass_list:   render passes [list]
+            sensor_list:        sensors [list]
+            animation_frames:   stored frames; (pass index, sub render index, sensor index) -> {"sensorData",
+                                "passCfg", "keyframes", "stepIndices"} [dict]
+        Returns:
+            render jobs [list]
+        """
+
+        _render_jobs = []
+        for (pass_idx, sub_render_idx, sensor_idx), frames in animation_frames.items():
+            _render_pass = render_pass_list[pass_idx]
+
+            # render settings of passes are not keyframed; they are stored with the job
+            _render_pass.activate_pass(keyframe=frames["keyframes"][0])
+            sensor_list[sensor_idx].activate_pass(pass_name=_render_pass.get_name(),
+                                                  pass_cfg=frames["passCfg"])
+
+            _render_jobs.extend(_render_pass.get_render_jobs(sensor_data=frames["sensorData"],
+                                                             sub_render_ID=sub_render_idx,
+                                                             keyframes=frames["keyframes"],
+                                                             step_indices=frames["stepIndices"]))
+
+        return _render_jobs
+
+    def _pack_stored_files(self, shard_writer, batch_folder_path, stored_files):
+        """ pack stored files into tar shards; the files are grouped into samples by their step index and removed
+        Args:
+            shard_writer:       writer of tar shards of batch [CTarShardWriter]
+            batch_folder_path:  path to batch folder [str]
+            stored_files:       stored files of render passes; [step index, path] [list]
+        Returns:
+            None
+        """
+
+        _samples = {}
+        for step_index, file_path in stored_files:
+            _name = os.path.relpath(file_path, batch_folder_path).replace(os.sep, "/")
+            _samples.setdefault(step_index, []).append([_name, file_path])
+
+        for step_index in sorted(_samples.keys()):
+            shard_writer.add_sample(sample_key="{:04d}".format(step_index), files=_samples[step_index],
+                                    remove_files=True)
+
+    def _set_constant_interpolation(self):
+        """ set interpolation of all keyframes to constant; keyframed values have to be kept until the next keyframe
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        for _action in bpy.data.actions:
+            for _fcurve in _action.fcurves:
+                _fcurve.keyframe_points.foreach_set("interpolation", [CKeyframeBuffer.CONSTANT_INTERPOLATION] *
+                                                    len(_fcurve.keyframe_points))
+
     def _create_output_folder(self, base_path):
         today = datetime.now()
         dateStampStr = today.strftime("%Y") + '-' + today.strftime("%m") + '-' + today.strftime("%d") + '-' + \
@@ -282,6 +606,37 @@ class TSS_OP_CStageSimulator():
 
         return _outputPath
 
+    def _write_batch_complete_record(self, batch_folder_path, batch_id, num_samples, record_name):
+        """ write completion record of batch atomically, see CDeferredRender.write_record
+        Args:
+            batch_folder_path:  path to batch folder [str]
+            batch_id:           id of batch [int]
+            num_samples:        number of samples in batch [int]
+            record_name:        file name of record, BATCH_COMPLETE_RECORD or CDeferredRender.BUILD_COMPLETE_RECORD [str]
+        Returns:
+            None
+        """
+
+        _record = {"batchID": batch_id,
+                   "numSamples": num_samples,
+                   "completedAt": datetime.now().isoformat()}
+        CDeferredRender.write_record(record_path=os.path.join(batch_folder_path, record_name), record=_record)
+
+    def _is_batch_complete(self, batch_folder_path, render_mode):
+        """ check if batch folder contains a completion record; deferred batches, which are built, but not rendered
+            yet, are not built again, since their render jobs are rendered by the render workers
+        Args:
+            batch_folder_path:  path to batch folder [str]
+            render_mode:        render mode of run [str]
+        Returns:
+            True if batch is complete [bool]
+        """
+
+        if os.path.isfile(os.path.join(batch_folder_path, self.BATCH_COMPLETE_RECORD)):
+            return True
+        return "deferred" == render_mode and \
+            os.path.isfile(os.path.join(batch_folder_path, CDeferredRender.BUILD_COMPLETE_RECORD))
+
     def _print_welcome(self):
         f = open(os.path.join(os.path.dirname(os.path.abspath(__file__)), \
                               "../oaisys_data/banner/welcome_banner_oaisys_small.txt"), "r")
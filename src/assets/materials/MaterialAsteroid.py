@@ -13,6 +13,11 @@ import copy as cp
 from pathlib import Path
 
 from src.assets.TSSMaterial import TSSMaterial
+from src.tools.cfg_cache import CCfgCache
+from src.tools.texture_index import CTextureIndex
+from src.tools.image_cache import CImageCache
+from src.tools.texture_mip_cache import CTextureMipCache
+from src.tools.node_group_library import CNodeGroupLibrary
 
 
 class MaterialAsteroid(TSSMaterial):
@@ -62,12 +67,12 @@ class MaterialAsteroid(TSSMaterial):
                     _current_path = os.path.dirname(__file__)
                     terrain_sample["templatePath"] = os.path.join(_current_path, "../../../", _rel_path)
 
-                with open(terrain_sample["templatePath"], 'r') as f:
-                    _terrain_sample_tmp = json.load(f)
-                    _terrain_sample_tmp.update(terrain_sample)
-                    terrain_sample = _terrain_sample_tmp
-                    del _terrain_sample_tmp["templatePath"]
-                    _cfg.append(_terrain_sample_tmp)
+                # templates are parsed once per process; the cache hands out copies
+                _terrain_sample_tmp = CCfgCache.load(file_path=terrain_sample["templatePath"])
+                _terrain_sample_tmp.update(terrain_sample)
+                terrain_sample = _terrain_sample_tmp
+                del _terrain_sample_tmp["templatePath"]
+                _cfg.append(_terrain_sample_tmp)
             else:
                 _cfg.append(terrain_sample)
 
@@ -317,23 +322,8 @@ class MaterialAsteroid(TSSMaterial):
             path to file [string]
         """
 
-        # search for file with prefix in it
-        _map_file = None
-        _map_file = [filename for filename in os.listdir(base_path) if prefix in filename]
-
-        # check if any file was found ##################################################################################
-        if _map_file == []:
-            # no file was found
-            _map_file = None
-
-        else:
-            # compose abs path
-            _map_file = [os.path.join(base_path, x) for x in _map_file] if return_complete_list else \
-                    os.path.join(base_path, _map_file[0])
-        ########################################################################## end of  check if any file was found #
-
-        # return found file
-        return _map_file
+        # search for file with prefix in it; the files of the texture folder are indexed once, see CTextureIndex
+        return CTextureIndex.find(set_path=base_path, prefix=prefix, return_complete_list=return_complete_list)
 
     def _create_materials(self, general_terrain_cfg, material_name, material_cfg_list, hard_label_borders,
                           noise_phase_shift_enabled=False, noise_phase_rate=0.0):
@@ -546,6 +536,9 @@ class MaterialAsteroid(TSSMaterial):
                 mosaicNoise = 0.0
             ############################################################################## end of get tiling parameter #
 
+            # get texture extent in meters; smaller mip levels are loaded, if the sensors can not resolve all texels
+            _texture_extent = material_cfg.get("textureExtent", general_terrain_cfg.get("textureExtent", None))
+
             # create texture for each channel ##########################################################################
             # create DIFFUSE texture channel ###########################################################################
             # load image and create basic shader #######################################################################
@@ -558,7 +551,8 @@ class MaterialAsteroid(TSSMaterial):
                     _img = self._texture_dict[_col_map_path]
                 else:
                     # load image
-                    _img = bpy.data.images.load(_col_map_path)
+                    _img = CImageCache.load(file_path=CTextureMipCache.get_path(file_path=_col_map_path,
+                                                                                texture_extent=_texture_extent))
                     self._texture_dict[_col_map_path] = _img
 
                 # create image shader node
@@ -718,13 +712,14 @@ class MaterialAsteroid(TSSMaterial):
                 if _rough_map_path in self._texture_dict:
                     _img = self._texture_dict[_rough_map_path]
                 else:
-                    _img = bpy.data.images.load(_rough_map_path)
+                    _img = CImageCache.load(file_path=CTextureMipCache.get_path(file_path=_rough_map_path,
+                                                                                texture_extent=_texture_extent),
+                                            colorspace='Non-Color')
                     self._texture_dict[_rough_map_path] = _img
 
                 # create image shader node #############################################################################
                 _roughness_image = _terrain_material.node_tree.nodes.new('ShaderNodeTexImage')
                 _roughness_image.image = _img
-                _roughness_image.image.colorspace_settings.name = 'Non-Color'
                 _roughness_image.location = (_node_offset[0] - 470, _node_offset[1] - 200)
                 ###################################################################### end of create image shader node #
 
@@ -739,13 +734,14 @@ class MaterialAsteroid(TSSMaterial):
                     if _gloss_map_path in self._texture_dict:
                         _img = self._texture_dict[_gloss_map_path]
                     else:
-                        _img = bpy.data.images.load(_gloss_map_path)
+                        _img = CImageCache.load(file_path=CTextureMipCache.get_path(file_path=_gloss_map_path,
+                                                                                    texture_extent=_texture_extent),
+                                                colorspace='Non-Color')
                         self._texture_dict[_gloss_map_path] = _img
 
                     # create image shader node #########################################################################
                     _glossy_image = _terrain_material.node_tree.nodes.new('ShaderNodeTexImage')
                     _glossy_image.image = _img
-                    _glossy_image.image.colorspace_settings.name = 'Non-Color'
                     _glossy_image.location = (_node_offset[0] - 470, _node_offset[1] - 200)
                     ################################################################## end of create image shader node #
 
@@ -770,13 +766,14 @@ class MaterialAsteroid(TSSMaterial):
                     if _spec_map_path in self._texture_dict:
                         _img = self._texture_dict[_spec_map_path]
                     else:
-                        _img = bpy.data.images.load(_spec_map_path)
+                        _img = CImageCache.load(file_path=CTextureMipCache.get_path(file_path=_spec_map_path,
+                                                                                    texture_extent=_texture_extent),
+                                                colorspace='Non-Color')
                         self._texture_dict[_spec_map_path] = _img
 
                     # create image shader node #########################################################################
                     _specular_image = _terrain_material.node_tree.nodes.new('ShaderNodeTexImage')
                     _specular_image.image = _img
-                    _specular_image.image.colorspace_settings.name = 'Non-Color'
                     _specular_image.location = (_node_offset[0] - 470, _node_offset[1] + 100)
                     ################################################################## end of create image shader node #
 
@@ -812,13 +809,14 @@ class MaterialAsteroid(TSSMaterial):
                 if _normal_map_path in self._texture_dict:
                     _img = self._texture_dict[_normal_map_path]
                 else:
-                    _img = bpy.data.images.load(_normal_map_path)
+                    _img = CImageCache.load(file_path=CTextureMipCache.get_path(file_path=_normal_map_path,
+                                                                                texture_extent=_texture_extent),
+                                            colorspace='Non-Color')
                     self._texture_dict[_normal_map_path] = _img
 
                 # create image shader node #############################################################################
                 _normal_image = _terrain_material.node_tree.nodes.new('ShaderNodeTexImage')
                 _normal_image.image = _img
-                _normal_image.image.colorspace_settings.name = 'Non-Color'
                 _normal_image.location = (_node_offset[0] - 470, _node_offset[1] - 500)
                 ###################################################################### end of create image shader node #
 
@@ -844,13 +842,14 @@ class MaterialAsteroid(TSSMaterial):
                 if _emission_map_path in self._texture_dict:
                     _img = self._texture_dict[_emission_map_path]
                 else:
-                    _img = bpy.data.images.load(_emission_map_path)
+                    _img = CImageCache.load(file_path=CTextureMipCache.get_path(file_path=_emission_map_path,
+                                                                                texture_extent=_texture_extent),
+                                            colorspace='Non-Color')
                     self._texture_dict[_emission_map_path] = _img
 
                 # create image shader node #############################################################################
                 _emission_image = _terrain_material.node_tree.nodes.new('ShaderNodeTexImage')
                 _emission_image.image = _img
-                _emission_image.image.colorspace_settings.name = 'Non-Color'
                 _emission_image.location = (_node_offset[0] - 470, _node_offset[1] - 500)
                 ###################################################################### end of create image shader node #
 
@@ -876,13 +875,14 @@ class MaterialAsteroid(TSSMaterial):
                 if _disp_map_path in self._texture_dict:
                     _img = self._texture_dict[_disp_map_path]
                 else:
-                    _img = bpy.data.images.load(_disp_map_path)
+                    _img = CImageCache.load(file_path=CTextureMipCache.get_path(file_path=_disp_map_path,
+                                                                                texture_extent=_texture_extent),
+                                            colorspace='Non-Color')
                     self._texture_dict[_disp_map_path] = _img
 
                 # create image shader node #############################################################################
                 _disp_image = _terrain_material.node_tree.nodes.new('ShaderNodeTexImage')
                 _disp_image.image = _img
-                _disp_image.image.colorspace_settings.name = 'Non-Color'
                 _disp_image.location = (_node_offset[0], _node_offset[1] - 700)
                 ###################################################################### end of create image shader node #
 
@@ -899,10 +899,9 @@ class MaterialAsteroid(TSSMaterial):
 
             if _disp_crater_map_path is not None:
                 ### add additional displacement
-                disp_map = bpy.data.images.load(_disp_crater_map_path)
+                disp_map = CImageCache.load(file_path=_disp_crater_map_path, colorspace='Non-Color')
                 add_disp_image = _terrain_material.node_tree.nodes.new('ShaderNodeTexImage')
                 add_disp_image.image = disp_map
-                add_disp_image.image.colorspace_settings.name = 'Non-Color'
                 add_disp_image.location = (_node_offset[0], _node_offset[1] - 600)
 
                 mul_node = _terrain_material.node_tree.nodes.new("ShaderNodeMath")
@@ -943,16 +942,17 @@ class MaterialAsteroid(TSSMaterial):
                     _y_x_scale_ratio = self._retrieve_parameter(cfg=material_cfg, key='scaleYXRatio')
                     if not _y_x_scale_ratio:
                         _y_x_scale_ratio = 1.0
+                    # the tiling group is built once per parameter set, see CNodeGroupLibrary
+                    _tiling_params = {"y_x_scale_ratio": _y_x_scale_ratio}
                     if not _scale_to_tile_val:
-                        _tiling_node_tree = self._create_voronoli_style_tiling_nodes(scale_to_tile_val= \
-                                                                                         _scale_to_tile_val,
-                                                                                     y_x_scale_ratio= \
-                                                                                         _y_x_scale_ratio)
-                    else:
-                        _tiling_node_tree = self._create_voronoli_style_tiling_nodes(y_x_scale_ratio=_y_x_scale_ratio)
+                        _tiling_params["scale_to_tile_val"] = _scale_to_tile_val
+                    _tiling_node_tree = CNodeGroupLibrary.get(build_function=self._create_voronoli_style_tiling_nodes,
+                                                              params=_tiling_params)
                     _node_group = _terrain_material.node_tree.nodes.new("ShaderNodeGroup")
                     _node_group.node_tree = _tiling_node_tree
                     _node_group.inputs[0].default_value = material_cfg['size']
+                    for socket_name in ['transMultiX', 'transMultiY', 'transMultiZ']:
+                        _node_group.inputs[socket_name].default_value = random.uniform(0.2, 3.0)
                     _node_group.location = (_node_offset[0] - 700, _node_offset[1])
 
                     if _col_map_path is not None:
@@ -1049,7 +1049,8 @@ class MaterialAsteroid(TSSMaterial):
             if not _tiling_mode_set:
                 # TODO change!
                 mat_config = self.load_nodegroup_config("uber_mapping")
-                node_group = self.create_nodegroup_from_config(mat_config)
+                node_group = CNodeGroupLibrary.get(build_function=self.create_nodegroup_from_config,
+                                                   params={"mat_config": mat_config})
 
                 _mapping_node = _terrain_material.node_tree.nodes.new(type='ShaderNodeGroup')
                 _mapping_group = node_group
@@ -1376,6 +1377,14 @@ class MaterialAsteroid(TSSMaterial):
         # labelDiffuseNode.inputs[1].default_value = 1.0  # set roughness to 1. no glossy!
         _terrain_material.node_tree.links.new(labelDiffuseNode.inputs[0], _latest_label_output.outputs[0])
 
+        # add label AOVs for single render mode (AOVPass); instance switches are off in the RGBDPass state, so the
+        # label output carries the semantic label, while all layers share the same instance label
+        self.create_label_aov_nodes(node_tree=_terrain_material,
+                                    semantic_output=_latest_label_output.outputs[0],
+                                    instance_output=_instance_switching_node_list[0].inputs[2].links[0].from_socket,
+                                    num_label_per_channel=self._num_labels_per_channel,
+                                    node_offset=[_node_offset[0] + 3700, -400])
+
         # create Pinciple Shade node and link it #############################################
         PBSDFNode = _terrain_material.node_tree.nodes.new('ShaderNodeBsdfPrincipled')
         PBSDFNode.location = (_node_offset[0] + 200, _node_offset[1])
@@ -1481,11 +1490,8 @@ class MaterialAsteroid(TSSMaterial):
         ####################################################################################### end of set semantic ID #
 
         if keyframe > -1:
-            # set interpolation to constant ############################################################################
-            _fcurves = self._node_tree.node_tree.animation_data.action.fcurves
-            for fcurve in _fcurves:
-                for kf in fcurve.keyframe_points:
-                    kf.interpolation = 'CONSTANT'
+            # set interpolation to constant
+            self._set_keyframe_interpolation(node_tree=self._node_tree, interpolation='CONSTANT')
 
     def getMaterials(self):
         return self._material_list
@@ -1508,6 +1514,9 @@ class MaterialAsteroid(TSSMaterial):
         _group_input = _tiling_group.nodes.new("NodeGroupInput")
         _group_input.location = (0, -600)
         _tiling_group.inputs.new('NodeSocketValue', 'scale')
+        _tiling_group.inputs.new('NodeSocketValue', 'transMultiX')
+        _tiling_group.inputs.new('NodeSocketValue', 'transMultiY')
+        _tiling_group.inputs.new('NodeSocketValue', 'transMultiZ')
 
         # outputs
         _group_outputs = _tiling_group.nodes.new("NodeGroupOutput")
@@ -1569,25 +1578,31 @@ class MaterialAsteroid(TSSMaterial):
         _tiling_translation_math_x_node = _tiling_group.nodes.new("ShaderNodeMath")
         _tiling_translation_math_x_node.location = (2400, -800)
         _tiling_translation_math_x_node.operation = 'MULTIPLY'
+        # multipliers < 0 are set per group node with the input transMultiX, so that the group can be reused
         if trans_multi_x_val < 0:
-            trans_multi_x_val = random.uniform(0.2, 3.0)
-        _tiling_translation_math_x_node.inputs[1].default_value = trans_multi_x_val
+            _tiling_group.links.new(_tiling_translation_math_x_node.inputs[1], _group_input.outputs['transMultiX'])
+        else:
+            _tiling_translation_math_x_node.inputs[1].default_value = trans_multi_x_val
 
         # [translation] multiply node y
         _tiling_translation_math_y_node = _tiling_group.nodes.new("ShaderNodeMath")
         _tiling_translation_math_y_node.location = (2400, -1000)
         _tiling_translation_math_y_node.operation = 'MULTIPLY'
+        # multipliers < 0 are set per group node with the input transMultiY, so that the group can be reused
         if trans_multi_y_val < 0:
-            trans_multi_y_val = random.uniform(0.2, 3.0)
-        _tiling_translation_math_y_node.inputs[1].default_value = trans_multi_y_val
+            _tiling_group.links.new(_tiling_translation_math_y_node.inputs[1], _group_input.outputs['transMultiY'])
+        else:
+            _tiling_translation_math_y_node.inputs[1].default_value = trans_multi_y_val
 
         # [translation] multiply node z
         _tiling_translation_math_z_node = _tiling_group.nodes.new("ShaderNodeMath")
         _tiling_translation_math_z_node.location = (2400, -1200)
         _tiling_translation_math_z_node.operation = 'MULTIPLY'
+        # multipliers < 0 are set per group node with the input transMultiZ, so that the group can be reused
         if trans_multi_z_val < 0:
-            trans_multi_z_val = random.uniform(0.2, 3.0)
-        _tiling_translation_math_z_node.inputs[1].default_value = trans_multi_z_val
+            _tiling_group.links.new(_tiling_translation_math_z_node.inputs[1], _group_input.outputs['transMultiZ'])
+        else:
+            _tiling_translation_math_z_node.inputs[1].default_value = trans_multi_z_val
 
         # [translation] separate node
         _tiling_translation_separate_node = _tiling_group.nodes.new("ShaderNodeSeparateXYZ")
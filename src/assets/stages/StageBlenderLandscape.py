@@ -12,6 +12,7 @@ import inspect
 import json
 
 from src.assets.TSSStage import TSSStage
+from src.tools.cfg_cache import CCfgCache
 
 
 class StageBlenderLandscape(TSSStage):
@@ -101,8 +102,7 @@ class StageBlenderLandscape(TSSStage):
 
             # load default cfg file ####################################################################################
             if os.path.isfile(_default_cfg_path):
-                with open(_default_cfg_path, 'r') as f:
-                    _landscape_params = json.load(f)
+                _landscape_params = CCfgCache.load(file_path=_default_cfg_path)
             ############################################################################# end of load default cfg file #
         else:
             _landscape_cfg["refresh"] = True
@@ -223,6 +223,13 @@ class StageBlenderObject(TSSStage):
             _diffuse_label_shader.location = (_global_Pos_GX + 2200, _global_Pos_GY + 300)
             material.node_tree.links.new(_diffuse_label_shader.inputs[0], _instance_switch_node.outputs[0])
 
+            # add label AOVs for single render mode (AOVPass)
+            self.create_label_aov_nodes(node_tree=material,
+                                        semantic_output=_label_node.outputs[0],
+                                        instance_output=_instance_switch_node.inputs[2].links[0].from_socket,
+                                        num_label_per_channel=self._num_labels_per_channel,
+                                        node_offset=[_global_Pos_GX + 2400, _global_Pos_GY - 100])
+
             # get current material output and add mix shader
             _material_output = material.node_tree.nodes["Material Output"]
             _material_output.location = (_global_Pos_GX + 2600, _global_Pos_GY + 300)
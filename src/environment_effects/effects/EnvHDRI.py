@@ -7,6 +7,9 @@ import math
 
 from src.TSSBase import TSSBase
 from src.environment_effects.TSSEnvironmentEffects import TSSEnvironmentEffects
+from src.tools.image_cache import CImageCache
+from src.tools.keyframe_buffer import CKeyframeBuffer
+from src.tools.texture_mip_cache import CTextureMipCache
 
 class EnvHDRI(TSSEnvironmentEffects):
     """docstring for EnvHDRI"""
@@ -29,6 +32,9 @@ class EnvHDRI(TSSEnvironmentEffects):
         self._semantic_switching_node = None
         self._semantic_pass_id = None
         self._instance_switching_node = None
+        self._single_slot = False                           # True, if one environment texture node is used for all
+                                                            # HDRIs [bool]
+        self._image_node = None                             # environment texture node of single slot mode [blObject]
         ############################################################################################ end of class vars #
 
 
@@ -56,6 +62,8 @@ class EnvHDRI(TSSEnvironmentEffects):
         self._semantic_switching_node = None
         self._semantic_pass_id = None
         self._instance_switching_node = None
+        self._single_slot = False
+        self._image_node = None
         ######################################################################################## end of reset all vars #
 
 
@@ -156,6 +164,12 @@ class EnvHDRI(TSSEnvironmentEffects):
             None
         """
 
+        # swap image of single slot ####################################################################################
+        if self._single_slot:
+            self._activate_single_slot_hdri(hdri_id=hdri_id, keyframe=keyframe)
+            return
+        ############################################################################# end of swap image of single slot #
+
         # create hdri ##################################################################################################
         # check if id with node is not already used
         if not hdri_id in self._hdri_in_use_dict:
@@ -193,6 +207,13 @@ class EnvHDRI(TSSEnvironmentEffects):
                                                     self._last_image_element.outputs[0])
         self._world_node_tree.node_tree.links.new(  self._semantic_switching_node.inputs[2],
                                                     self._last_label_element.outputs[0])
+
+        # link label AOVs for single render mode (AOVPass)
+        self.create_label_aov_nodes(node_tree=self._world_node_tree,
+                                    semantic_output=self._last_label_element.outputs[0],
+                                    instance_output=self._instance_switching_node.inputs[2].links[0].from_socket,
+                                    num_label_per_channel=15,
+                                    node_offset=[self._node_offset[0]+400,self._node_offset[1]-1500])
         ############################################################################# end of link nodes to global tree #
 
         # activate hdri ################################################################################################
@@ -208,16 +229,108 @@ class EnvHDRI(TSSEnvironmentEffects):
         # set keyframes if requested ###################################################################################
         if keyframe > -1:
             
-            # set keyframes for ids
-            self._image_ID_node.outputs[0].keyframe_insert('default_value', frame=keyframe)
-            self._label_ID_node.outputs[0].keyframe_insert('default_value', frame=keyframe)
-
-            # set interpolation to constant ############################################################################
-            _fcurves = self._world_node_tree.node_tree.animation_data.action.fcurves
-            for fcurve in _fcurves:
-                for kf in fcurve.keyframe_points:
-                    kf.interpolation = 'CONSTANT'
-            ##################################################################### end of set interpolation to constant #
+            # set keyframes for ids; buffered keyframes are written with constant interpolation
+            CKeyframeBuffer.insert(data=self._image_ID_node.outputs[0], data_path='default_value', frame=keyframe)
+            CKeyframeBuffer.insert(data=self._label_ID_node.outputs[0], data_path='default_value', frame=keyframe)
+        ############################################################################ end of set keyframes if requested #
+
+
+    def _create_single_slot_nodes(self, node_offset=[0,0]):
+        """ create nodes of single slot mode; one environment texture node, whose image is swapped in every step, and
+            one label lookup table for all HDRIs, which is indexed by HDRI index * number of label entries + semantic
+            pass ID
+        Args:
+            node_offset:                node offset for y and y [list] [int]
+        Returns:
+            None
+        """
+
+        _nodes = self._world_node_tree.node_tree.nodes
+        _links = self._world_node_tree.node_tree.links
+
+        # create environment texture node; the image is set in _activate_single_slot_hdri #############################
+        self._image_node = _nodes.new('ShaderNodeTexEnvironment')
+        self._image_node.location = (node_offset[0]-1200,node_offset[1]-200)
+        _links.new(self._semantic_switching_node.inputs[1], self._image_node.outputs[0])
+        ####################################################################### end of create environment texture node #
+
+        # create ID handles ############################################################################################
+        self._label_ID_node = _nodes.new("ShaderNodeValue")
+        self._label_ID_node.location = (node_offset[0]-2400,node_offset[1]-800)
+        self._label_ID_node.name = "label_step_ID"
+        self._label_ID_node.label = "label_step_ID"
+        self._label_ID_node.outputs[0].default_value = 0
+
+        self._semantic_pass_id = _nodes.get("semantic_pass_ID", None)
+        if self._semantic_pass_id is None:
+            self._semantic_pass_id = _nodes.new("ShaderNodeValue")
+            self._semantic_pass_id.location = (node_offset[0]-2400,node_offset[1]-1000)
+            self._semantic_pass_id.name = "semantic_pass_ID"
+            self._semantic_pass_id.label = "semantic_pass_ID"
+            self._semantic_pass_id.outputs[0].default_value = 1
+        ##################################################################################### end of create ID handles #
+
+        # create label lookup table of all HDRIs #######################################################################
+        # missing entries get the default color of the switching nodes (0.5 gray)
+        _num_entries = max(len(hdri["labelIDVec"]) for hdri in self._hdri_dict_list)
+        _label_list = []
+        for hdri in self._hdri_dict_list:
+            for entry_idx in range(_num_entries):
+                if entry_idx >= len(hdri["labelIDVec"]):
+                    _label_list.append([0.5,0.5,0.5])
+                elif isinstance(hdri["labelIDVec"][entry_idx], dict):
+                    _label_list.append(hdri["labelIDVec"][entry_idx])
+                else:
+                    _label_list.append(self._id_to_rgb(id_value=hdri["labelIDVec"][entry_idx],
+                                                       num_label_per_channel=15,
+                                                       step_label_classes=1./15))
+
+        _label_index_node = _nodes.new("ShaderNodeMath")
+        _label_index_node.location = (node_offset[0]-2200,node_offset[1]-900)
+        _label_index_node.operation = 'MULTIPLY_ADD'
+        _label_index_node.inputs[1].default_value = _num_entries
+        _links.new(_label_index_node.inputs[0], self._label_ID_node.outputs[0])
+        _links.new(_label_index_node.inputs[2], self._semantic_pass_id.outputs[0])
+
+        self._last_label_element, _ = self.create_switching_node(node_tree=self._world_node_tree,
+                                                                 label_list=_label_list,
+                                                                 env_mode=True,
+                                                                 node_offset=[node_offset[0]-1800,node_offset[1]-900],
+                                                                 label_ID_output=_label_index_node.outputs[0],
+                                                                 num_label_per_channel=15)
+        _links.new(self._semantic_switching_node.inputs[2], self._last_label_element.outputs[0])
+        ################################################################ end of create label lookup table of all HDRIs #
+
+        # link label AOVs for single render mode (AOVPass)
+        self.create_label_aov_nodes(node_tree=self._world_node_tree,
+                                    semantic_output=self._last_label_element.outputs[0],
+                                    instance_output=self._instance_switching_node.inputs[2].links[0].from_socket,
+                                    num_label_per_channel=15,
+                                    node_offset=[self._node_offset[0]+400,self._node_offset[1]-1500])
+
+
+    def _activate_single_slot_hdri(self, hdri_id, keyframe):
+        """ function to activate hdri in single slot mode; the image of the environment texture node is swapped, loaded
+            HDRIs are kept in CImageCache, which removes the least recently used ones, once imageCache.maxMemory is
+            exceeded. Images can not be keyframed, i.e. this mode only works with renderMode "still"
+        Args:
+            hdri_id:        id of hdri to be activated [int]
+            keyframe:       current frame number; if value > -1, this should enable also the setting of a keyframe [int]
+        Returns:
+            None
+        """
+
+        # swap image
+        self._image_node.image = CImageCache.load(file_path=CTextureMipCache.get_path(
+                                                        file_path=self._hdri_dict_list[hdri_id]["filePath"],
+                                                        environment=True))
+
+        # set label entry of hdri
+        self._label_ID_node.outputs[0].default_value = hdri_id
+
+        # set keyframes if requested ###################################################################################
+        if keyframe > -1:
+            CKeyframeBuffer.insert(data=self._label_ID_node.outputs[0], data_path='default_value', frame=keyframe)
         ############################################################################ end of set keyframes if requested #
 
 
@@ -260,7 +373,7 @@ class EnvHDRI(TSSEnvironmentEffects):
         _x_offset = (node_index+1)*_step_node_width + node_offset[0]
         _y_offset = (node_index+1)*_step_node_height + node_offset[1]
         _current_image_node = node_tree.node_tree.nodes.new('ShaderNodeTexEnvironment')
-        _img = bpy.data.images.load(image_path)
+        _img = CImageCache.load(file_path=CTextureMipCache.get_path(file_path=image_path, environment=True))
         _current_image_node.image = _img
         _current_image_node.location = (((node_index+1)*_step_node_width*2 + node_offset[0] - 800,
                                         (node_index+1)*_step_node_height + node_offset[1]))
@@ -409,14 +522,8 @@ class EnvHDRI(TSSEnvironmentEffects):
         if "SemanticPass" == pass_name:
             self._semantic_pass_id.outputs[0].default_value = pass_cfg["activationID"]+1
             if keyframe > -1:
-                self._semantic_pass_id.outputs[0].keyframe_insert('default_value', frame=keyframe)
-
-                # set interpolation to constant ############################################################################
-                _fcurves = self._world_node_tree.node_tree.animation_data.action.fcurves
-                for fcurve in _fcurves:
-                    for kf in fcurve.keyframe_points:
-                        kf.interpolation = 'CONSTANT'
-            ##################################################################### end of set interpolation to constant #
+                CKeyframeBuffer.insert(data=self._semantic_pass_id.outputs[0], data_path='default_value',
+                                       frame=keyframe)
         ####################################################################################### end of set semantic ID #
 
 
@@ -465,8 +572,14 @@ class EnvHDRI(TSSEnvironmentEffects):
 
         # update current last output
         _current_last_output = _instance_switching_node.outputs[0]
+        self._instance_switching_node = _instance_switching_node
         #################################################################################### end of set instance nodes #
 
+        # create single slot nodes; all HDRIs share one environment texture node
+        self._single_slot = self._cfg.get("singleSlot", False)
+        if self._single_slot:
+            self._create_single_slot_nodes(node_offset=self._node_offset)
+
         # Pass entries #################################################################################################
         # RGBDPass entries #############################################################################################
         self.add_pass_entry(pass_name="RGBDPass",
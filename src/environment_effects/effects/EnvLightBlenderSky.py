@@ -7,6 +7,7 @@ import math
 
 from src.TSSBase import TSSBase
 from src.environment_effects.TSSEnvironmentEffects import TSSEnvironmentEffects
+from src.tools.keyframe_buffer import CKeyframeBuffer
 
 class EnvLightBlenderSky(TSSEnvironmentEffects):
     """docstring for EnvLightBlenderSky"""
@@ -96,6 +97,13 @@ class EnvLightBlenderSky(TSSEnvironmentEffects):
         _current_last_output = _instance_switching_node.outputs[0]
         #################################################################################### end of set instance nodes #
 
+        # add label AOVs for single render mode (AOVPass)
+        self.create_label_aov_nodes(node_tree=self._world_node_tree,
+                                    semantic_output=_semantic_switching_node.inputs[2].links[0].from_socket,
+                                    instance_output=_instance_switching_node.inputs[2].links[0].from_socket,
+                                    num_label_per_channel=self._num_labels_per_channel,
+                                    node_offset=[self._node_offset[0]+400,self._node_offset[1]-1500])
+
         # Pass entries #################################################################################################
         # RGBDPass entries #############################################################################################
         self.add_pass_entry(pass_name="RGBDPass",
@@ -145,7 +153,7 @@ class EnvLightBlenderSky(TSSEnvironmentEffects):
         if "SemanticPass" == pass_name:
             self._label_ID_Node.outputs[0].default_value = pass_cfg["activationID"]+1
             if keyframe > -1:
-                self._label_ID_Node.outputs[0].keyframe_insert('default_value', frame=keyframe)
+                CKeyframeBuffer.insert(data=self._label_ID_Node.outputs[0], data_path='default_value', frame=keyframe)
         ####################################################################################### end of set semantic ID #
 
 
@@ -228,21 +236,10 @@ class EnvLightBlenderSky(TSSEnvironmentEffects):
         # set keyframe if requested ####################################################################################
         if keyframe > -1:
 
-            self._sky_node.keyframe_insert('sun_size', frame=keyframe)
-            self._sky_node.keyframe_insert('sun_intensity', frame=keyframe)
-            self._sky_node.keyframe_insert('sun_elevation', frame=keyframe)
-            self._sky_node.keyframe_insert('sun_rotation', frame=keyframe)
-            self._sky_node.keyframe_insert('altitude', frame=keyframe)
-            self._sky_node.keyframe_insert('air_density', frame=keyframe)
-            self._sky_node.keyframe_insert('dust_density', frame=keyframe)
-            self._sky_node.keyframe_insert('ozone_density', frame=keyframe)
-
-            # set interpolation to constant ############################################################################
-            _fcurves = self._world_node_tree.node_tree.animation_data.action.fcurves
-            for fcurve in _fcurves:
-                for kf in fcurve.keyframe_points:
-                    kf.interpolation = 'CONSTANT'
-            ##################################################################### end of set interpolation to constant #
+            # buffered keyframes are written with constant interpolation
+            for data_path in ['sun_size', 'sun_intensity', 'sun_elevation', 'sun_rotation', 'altitude', 'air_density',
+                              'dust_density', 'ozone_density']:
+                CKeyframeBuffer.insert(data=self._sky_node, data_path=data_path, frame=keyframe)
         ############################################################################# end of set keyframe if requested #
 
         # return choosen settings
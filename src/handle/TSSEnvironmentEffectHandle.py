@@ -12,6 +12,8 @@ import pathlib
 import importlib
 from datetime import datetime
 
+from src.tools.keyframe_buffer import CKeyframeBuffer
+
 class TSSEnvironmentEffectHandle(object):
     """docstring for TSSEnvironmentEffectHandle"""
     def __init__(self):
@@ -186,8 +188,9 @@ class TSSEnvironmentEffectHandle(object):
         ############################################################################## end of instance pass parameters #
 
         # set keyframes ################################################################################################
-        if keyframe: 
-            self._tree.node_tree.nodes["Background"].inputs[1].keyframe_insert('default_value', frame=keyframe)
+        if keyframe > -1:
+            CKeyframeBuffer.insert(data=self._tree.node_tree.nodes["Background"].inputs[1], data_path='default_value',
+                                   frame=keyframe)
 
         for effect_handle in self._effect_list:
             effect_handle.activate_pass( pass_name=pass_name,pass_cfg=pass_cfg,keyframe=keyframe)
@@ -216,15 +219,10 @@ class TSSEnvironmentEffectHandle(object):
                                                                                             self._background_strength)
 
             # set keframes #############################################################################################
-            if keyframe: 
-                self._tree.node_tree.nodes["Background"].inputs[1].keyframe_insert('default_value', frame=keyframe)
-
-                # set interpolation to constant ########################################################################
-                _fcurves = self._tree.node_tree.animation_data.action.fcurves
-                for fcurve in _fcurves:
-                    for kf in fcurve.keyframe_points:
-                        kf.interpolation = 'CONSTANT'
-                ################################################################# end of set interpolation to constant #
+            # buffered keyframes are written with constant interpolation
+            if keyframe > -1:
+                CKeyframeBuffer.insert(data=self._tree.node_tree.nodes["Background"].inputs[1],
+                                       data_path='default_value', frame=keyframe)
             ###################################################################################### end of set keframes #
         ############################################################################## end of step for handle function #
 
@@ -11,6 +11,8 @@ import pathlib
 import importlib
 from datetime import datetime
 
+from src.tools.frame_sink import CFrameSink
+
 class TSSRenderHandle(object):
     """docstring for TSSRenderHandle"""
     def __init__(self):
@@ -21,6 +23,7 @@ class TSSRenderHandle(object):
         self._outputPath = ""
         self._global_step_index = 1
         self._compositor_pass_list = {}
+        self._frame_sink = None                     # sink for passes with captureOutput [CFrameSink]
         ############################################################################################ end of class vars #
 
 
@@ -34,6 +37,11 @@ class TSSRenderHandle(object):
             del render_pass
         ################################################################################# end of reset all render_pass # 
 
+        # write remaining captured frames of batch
+        if self._frame_sink is not None:
+            self._frame_sink.close()
+            self._frame_sink = None
+
         self._compositor_pass_list = {}
         self._pass_list = []
 
@@ -72,6 +80,13 @@ class TSSRenderHandle(object):
 
                 # create pass
                 _render_pass.create()
+
+                # capture outputs of pass in memory instead of writing files
+                if render_pass["passParams"].get("captureOutput", False):
+                    if self._frame_sink is None:
+                        self._frame_sink = CFrameSink.create(output_path=self._outputPath,
+                                                             cfg=general_cfg.get("frameSink", {}))
+                    _render_pass.create_capture(frame_sink=self._frame_sink)
                 ############################################################### end of set pass params and create pass #
                 
                 # add pass to list
@@ -181,6 +196,32 @@ class TSSRenderHandle(object):
             render_pass.increase_global_step_index()
 
 
+    def skip_steps(self, num_steps):
+        """ advance global step index without stepping; used for batches, which are skipped, to keep file names
+            identical to an uninterrupted run
+        Args:
+            num_steps:      number of skipped steps [int]
+        Returns:
+            None
+        """
+
+        self._global_step_index += num_steps
+
+
+    def pop_stored_files(self):
+        """ get files, which were stored by all passes since the last call
+        Args:
+            None
+        Returns:
+            stored files [list]; [step index, path]
+        """
+
+        _stored_files = []
+        for render_pass in self._pass_list:
+            _stored_files.extend(render_pass.pop_stored_files())
+        return _stored_files
+
+
     def log_step(self, keyframe):
         """ log step function is called for every new sample in of the batch; should be overwritten by custom class
             OVERWRITE!
@@ -9,8 +9,9 @@ import importlib
 import os
 
 from src.TSSBase import TSSBase
+from src.tools.keyframe_buffer import CKeyframeBuffer
 
-from src.tools.trajectory.ObjectTrajectory import get_single_mesh_data, compute_center_of_mass, find_furthest_point
+from src.tools.trajectory.ObjectTrajectory import get_mass_properties
 import src.tools.trajectory.ObjectTrajectory as ot
 
 
@@ -478,10 +479,9 @@ class TSSSensorHandle(TSSBase):
         - target_list (list): List of pose samples for target position.
         """
 
-        vertices, faces = get_single_mesh_data(target_obj)
+        mass_properties = get_mass_properties(target_obj, density=1.0)
         origin = np.array([0, 0, 0])
-        center_of_mass = compute_center_of_mass(vertices, faces, density=1)
-        furthest_point, furthest_distance = find_furthest_point(vertices, center_of_mass)
+        furthest_point, furthest_distance = mass_properties["furthestPoint"], mass_properties["furthestDistance"]
         furthest_point = np.abs(furthest_point)
 
         print(f"Landing MODE? {landing_mode}")
@@ -873,41 +873,20 @@ class TSSSensorHandle(TSSBase):
 
             # set keyframes if requested ###################################################################################
             if keyframe >= 0:
-                # set keyframe for location and rotation of base sensor
-                self._sensor_base.keyframe_insert('location', frame=keyframe)
-                self._sensor_base.keyframe_insert('rotation_euler', frame=keyframe)
-                self._sensor_base.keyframe_insert('rotation_quaternion', frame=keyframe)
-                self._sensor_base_constraint.keyframe_insert('location', frame=keyframe)
-                self._sensor_base_constraint.keyframe_insert('rotation_euler', frame=keyframe)
-                self._sensor_base_constraint.keyframe_insert('rotation_quaternion', frame=keyframe)
+                # set keyframe for location and rotation of base sensor; keyframes are buffered and written at the end of
+                # the batch with constant interpolation
+                for data_path in ['location', 'rotation_euler', 'rotation_quaternion']:
+                    CKeyframeBuffer.insert(data=self._sensor_base, data_path=data_path, frame=keyframe)
+                    CKeyframeBuffer.insert(data=self._sensor_base_constraint, data_path=data_path, frame=keyframe)
 
                 # set keyframe for hover constraint
                 if self._hover_base_constraint is not None:
-                    self._hover_base_constraint.keyframe_insert('distance', frame=keyframe)
-
-                # set interpolation of all keyframes #######################################################################
-                _fcurves = self._sensor_base.animation_data.action.fcurves
-                for fcurve in _fcurves:
-                    for kf in fcurve.keyframe_points:
-                        kf.interpolation = 'CONSTANT'
-
-                _fcurves = self._sensor_base_constraint.animation_data.action.fcurves
-                for fcurve in _fcurves:
-                    for kf in fcurve.keyframe_points:
-                        kf.interpolation = 'CONSTANT'
-                # set interpolation of all keyframes########################################################################
+                    CKeyframeBuffer.insert(data=self._hover_base_constraint, data_path='distance', frame=keyframe)
 
                 # set keyframe for target ##################################################################################
                 if self._target_object_active:
-                    self._target_object.keyframe_insert('location', frame=keyframe)
-                    self._target_object.keyframe_insert('rotation_quaternion', frame=keyframe)
-
-                    # set interpolation of all keyframes ###################################################################
-                    _fcurves = self._target_object.animation_data.action.fcurves
-                    for fcurve in _fcurves:
-                        for kf in fcurve.keyframe_points:
-                            kf.interpolation = 'CONSTANT'
-                    # set interpolation of all keyframes####################################################################
+                    CKeyframeBuffer.insert(data=self._target_object, data_path='location', frame=keyframe)
+                    CKeyframeBuffer.insert(data=self._target_object, data_path='rotation_quaternion', frame=keyframe)
                 ########################################################################### end of set keyframe for target #
             ############################################################################ end of set keyframes if requested #
 
@@ -5,9 +5,38 @@ import bpy
 import numpy as np
 import csv
 import random
+import os
+import sys
+import time
+
+from src.tools.deferred_render import CDeferredRender
 
 class TSSRenderPass(object):
     """docstring for TSSRenderPass"""
+
+    # render engines, which can be selected per pass with the cfg entry renderEngine
+    RENDER_ENGINES = ['CYCLES', 'BLENDER_EEVEE']
+
+    # cycles light path settings of passes with the cfg entry minimalLightPaths
+    MINIMAL_LIGHT_PATH_SETTINGS = {"diffuse_bounces": 0,
+                                   "glossy_bounces": 0,
+                                   "transmission_bounces": 0,
+                                   "volume_bounces": 0,
+                                   "caustics_reflective": False,
+                                   "caustics_refractive": False}
+
+    # output format settings of cfg entries like depthFormat; cfg key -> blender image format setting
+    OUTPUT_FORMAT_SETTINGS = {"fileFormat": "file_format",       # e.g. PNG, OPEN_EXR, TIFF
+                              "colorDepth": "color_depth",       # PNG: '8', '16'; OPEN_EXR: '16' (half), '32' (full)
+                              "colorMode": "color_mode",         # BW, RGB, RGBA
+                              "compression": "compression",      # PNG compression level [0,100]
+                              "exrCodec": "exr_codec"}           # e.g. NONE, ZIP, PIZ, DWAA
+
+    # file extensions, which are written by blender for the file formats
+    FILE_EXTENSIONS = {"PNG": ".png", "OPEN_EXR": ".exr", "TIFF": ".tif", "JPEG": ".jpg", "BMP": ".bmp"}
+
+    _default_light_path_settings = None     # light path settings of scene before a pass changed them [dict]
+
     def __init__(self,pass_name):
         super(TSSRenderPass, self).__init__()
         # class vars ###################################################################################################
@@ -21,6 +50,11 @@ class TSSRenderPass(object):
         self._global_step_index = 0                 # global index [uint]
         self._local_step_index = 0                  # global index [uint]
         self._compositor_pass_list = {}
+        self._output_slots = {}                     # file slots of output nodes; slot name -> [node, index] [dict]
+        self._frame_sink = None                     # sink for captured frames; if set, no files are written [object]
+        self._capture_viewer_node = None            # viewer node, which holds captured channels [blObject]
+        self._capture_layout = []                   # captured channels; [slot name, first channel, num channels] [list]
+        self._stored_files = []                     # files, which were stored since last pop; [step index, path] [list]
         ############################################################################################ end of class vars #
 
     def reset_module(self):
@@ -36,6 +70,15 @@ class TSSRenderPass(object):
         self._node_offset = [0,0]
         self._output_node = None
         self._compositor_pass_list = {}
+        self._output_slots = {}
+        self._frame_sink = None
+        self._capture_viewer_node = None
+        self._capture_layout = []
+        self._stored_files = []
+
+        # restore light path settings; the scene can be reused by the next batch
+        self._restore_default_light_paths()
+        TSSRenderPass._default_light_path_settings = None
 
         self.reset()
 
@@ -52,7 +95,8 @@ class TSSRenderPass(object):
 
 
     def _set_scene_keyframe_interpolation(self, interpolation='CONSTANT'):
-        """ set keyframe interpolation for scene
+        """ set keyframe interpolation for scene; only the last keyframe of each fcurve is set, since new keyframes are
+            appended and the previous ones were set by earlier calls
             DO NOT OVERWRITE!
         Args:
             interpolation:  interploation type [string]
@@ -62,8 +106,8 @@ class TSSRenderPass(object):
 
         _fcurves = bpy.context.scene.animation_data.action.fcurves
         for fcurve in _fcurves:
-            for kf in fcurve.keyframe_points:
-                kf.interpolation = interpolation
+            if len(fcurve.keyframe_points) > 0:
+                fcurve.keyframe_points[-1].interpolation = interpolation
 
 
     def _set_render_samples(self, num_samples, keyframe):
@@ -77,6 +121,7 @@ class TSSRenderPass(object):
         """
 
         bpy.context.scene.cycles.samples = num_samples
+        bpy.context.scene.eevee.taa_render_samples = num_samples
 
         '''
         if keyframe > -1:
@@ -96,6 +141,7 @@ class TSSRenderPass(object):
         """
 
         bpy.context.scene.cycles.pixel_filter_type = 'BLACKMAN_HARRIS'
+        bpy.context.scene.render.filter_size = 1.5
 
         '''
         if keyframe > -1:
@@ -113,6 +159,7 @@ class TSSRenderPass(object):
         """
 
         bpy.context.scene.cycles.pixel_filter_type = 'BOX'
+        bpy.context.scene.render.filter_size = 0.0
 
         '''
         if keyframe > -1:
@@ -120,6 +167,93 @@ class TSSRenderPass(object):
         '''
 
 
+    def _restore_default_light_paths(self):
+        """ restore light path settings of scene, which were changed by passes with minimalLightPaths
+            DO NOT OVERWRITE!
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        if TSSRenderPass._default_light_path_settings is not None:
+            for setting, value in TSSRenderPass._default_light_path_settings.items():
+                setattr(bpy.context.scene.cycles, setting, value)
+
+
+    def _set_render_engine(self, keyframe, reference=False):
+        """ set render engine and light paths of pass; every pass has to call this function first in activate_pass,
+            since the previous pass may have used another engine
+            DO NOT OVERWRITE!
+        Args:
+            keyframe:       current frame number; if value > -1, this should enable also the setting of a keyframe [int]
+            reference:      if True, the engine of the general render cfg with full light paths is set, which is used
+                            to validate the pass [bool]
+        Returns:
+            None
+        """
+
+        # get render engine of pass ####################################################################################
+        _render_engine = self._general_cfg["renderEngine"]
+        if "renderEngine" in self._cfg and not reference:
+            _render_engine = self._cfg["renderEngine"]
+        if _render_engine not in self.RENDER_ENGINES:
+            raise Exception("Render engine " + str(_render_engine) + " of " + self._pass_name + " is not supported! " +
+                            "Label colors are shader outputs, which are only rendered by " + str(self.RENDER_ENGINES))
+        bpy.context.scene.render.engine = _render_engine
+        ############################################################################# end of get render engine of pass #
+
+        # set light paths ##############################################################################################
+        if TSSRenderPass._default_light_path_settings is None:
+            TSSRenderPass._default_light_path_settings = {setting: getattr(bpy.context.scene.cycles, setting)
+                                                          for setting in self.MINIMAL_LIGHT_PATH_SETTINGS}
+
+        if self._cfg.get("minimalLightPaths", False) and not reference:
+            for setting, value in self.MINIMAL_LIGHT_PATH_SETTINGS.items():
+                setattr(bpy.context.scene.cycles, setting, value)
+        else:
+            self._restore_default_light_paths()
+        ####################################################################################### end of set light paths #
+
+
+    def _validate_render_engine(self, rendered_file_path, reference_file_path, keyframe):
+        """ render pass again with the engine of the general render cfg and full light paths and compare the result
+            pixel for pixel with the rendered image; the reference image is deleted afterwards
+            DO NOT OVERWRITE!
+        Args:
+            rendered_file_path:     path of image, which was rendered with the settings of the pass [str]
+            reference_file_path:    path, to which the output node writes the reference image [str]
+            keyframe:               current frame number [int]
+        Returns:
+            None
+        """
+
+        # render reference image #######################################################################################
+        self._set_render_engine(keyframe=keyframe, reference=True)
+        _render_time = self._render_image()
+        self._set_render_engine(keyframe=keyframe)
+        ################################################################################ end of render reference image #
+
+        # compare images ###############################################################################################
+        _pixels = []
+        for file_path in [rendered_file_path, reference_file_path]:
+            _image = bpy.data.images.load(file_path)
+            _image_pixels = np.empty(len(_image.pixels), dtype=np.float32)
+            _image.pixels.foreach_get(_image_pixels)
+            _pixels.append(_image_pixels.reshape(-1,_image.channels))
+            bpy.data.images.remove(_image)
+        os.remove(reference_file_path)
+
+        _num_mismatches = int(np.count_nonzero(np.any(_pixels[0] != _pixels[1], axis=1)))
+        self._print_msg("Validation (" + self._pass_name + "): " + str(_num_mismatches) + " of " +
+                        str(_pixels[0].shape[0]) + " pixels differ from reference render; reference render time: " +
+                        str(_render_time))
+        if _num_mismatches > 0:
+            raise Exception("Validation of render engine of " + self._pass_name + " failed: " + rendered_file_path +
+                            " differs from reference render in " + str(_num_mismatches) + " pixels!")
+        ######################################################################################## end of compare images #
+
+
     def _set_max_bounces(self, num_bounces, keyframe):
         """ set number of maximum light bounces for cycles
             DO NOT OVERWRITE!
@@ -282,6 +416,17 @@ class TSSRenderPass(object):
         self._global_step_index = 0
 
 
+    def get_global_step_index(self):
+        """ get global step index
+            DO NOT OVERWRITE!
+        Args:
+            None
+        Returns:
+            global step index [int]
+        """
+        return self._global_step_index
+
+
     def set_global_step_index(self,index):
         """ set global step index
             DO NOT OVERWRITE!
@@ -366,4 +511,518 @@ class TSSRenderPass(object):
             None
         """
 
-        pass
\ No newline at end of file
+        pass
+
+
+    def _get_output_files(self, sensor_data):
+        """ get files, which are written by the output nodes of the pass for the sensor
+            OVERWRITE!
+        Args:
+            sensor_data:            sensor data [dict]
+        Returns:
+            output files [dict]; file slot name -> [output name, file extension]
+        """
+
+        return {}
+
+
+    def _switch_outputs(self, sensor_data, active):
+        """ switch output nodes of pass on or off and set render settings of sensor
+            OVERWRITE!
+        Args:
+            sensor_data:            sensor data [dict]
+            active:                 if True, outputs are switched on [bool]
+        Returns:
+            None
+        """
+
+        pass
+
+
+    def _new_output_slot(self, output_node, slot_name):
+        """ add file slot to output node; the path of the slot is set to the final file name before rendering (see
+            _set_output_slot_paths)
+            DO NOT OVERWRITE!
+        Args:
+            output_node:            file output node [blObject]
+            slot_name:              name of file slot, as used in _get_output_files [str]
+        Returns:
+            None
+        """
+
+        output_node.file_slots.new(slot_name)
+        self._output_slots[slot_name] = [output_node, len(output_node.file_slots)-1]
+
+
+    def _get_capture_channels(self):
+        """ get sockets, which are captured instead of written to files; at most 4 channels in total
+            OVERWRITE!
+        Args:
+            None
+        Returns:
+            captured sockets [list]; [file slot name, socket, number of channels (1 or 3)]
+        """
+
+        raise Exception(self._pass_name + " does not support captureOutput!")
+
+
+    def create_capture(self, frame_sink):
+        """ create nodes, which capture the outputs of the pass in memory; the channels are packed into the RGBA image
+            of a viewer node, which is read after every render and handed to the frame sink. The file output nodes of
+            the pass are muted
+            DO NOT OVERWRITE!
+        Args:
+            frame_sink:             sink for captured frames, see src/tools/frame_sink.py [object]
+        Returns:
+            None
+        """
+
+        self._frame_sink = frame_sink
+
+        _combine_node = self._node_tree.nodes.new(type="CompositorNodeCombRGBA")
+        _combine_node.label = self._pass_name + '_capture_combine'
+        _combine_node.location = (self._node_offset[0]+2800,self._node_offset[1]-300)
+
+        self._capture_layout = []
+        _num_channels = 0
+        for slot_name, socket, num_channels in self._get_capture_channels():
+            if _num_channels + num_channels > 4:
+                raise Exception(self._pass_name + ": captured channels do not fit into one RGBA image!")
+
+            if 1 == num_channels:
+                self._node_tree.links.new(socket, _combine_node.inputs[_num_channels])
+            else:
+                _separate_node = self._node_tree.nodes.new(type="CompositorNodeSepRGBA")
+                _separate_node.label = self._pass_name + '_capture_' + slot_name
+                _separate_node.location = (self._node_offset[0]+2600,
+                                           self._node_offset[1]-300-200*len(self._capture_layout))
+                self._node_tree.links.new(socket, _separate_node.inputs[0])
+                for channel_idx in range(0, num_channels):
+                    self._node_tree.links.new(_separate_node.outputs[channel_idx],
+                                              _combine_node.inputs[_num_channels+channel_idx])
+
+            self._capture_layout.append([slot_name, _num_channels, num_channels])
+            _num_channels += num_channels
+
+        self._capture_viewer_node = self._node_tree.nodes.new(type="CompositorNodeViewer")
+        self._capture_viewer_node.label = self._pass_name + '_capture_viewer'
+        self._capture_viewer_node.use_alpha = True
+        self._capture_viewer_node.location = (self._node_offset[0]+3000,self._node_offset[1]-300)
+        self._node_tree.links.new(_combine_node.outputs[0], self._capture_viewer_node.inputs[0])
+
+        for output_node, _ in self._output_slots.values():
+            output_node.mute = True
+
+
+    def _capture_output_frames(self, sensor_data, sub_render_ID, step_index):
+        """ read captured channels of the last render from the viewer image and hand them to the frame sink
+            DO NOT OVERWRITE!
+        Args:
+            sensor_data:            sensor data [dict]
+            sub_render_ID:          sub render ID [int]
+            step_index:             global step index of the frames [int]
+        Returns:
+            None
+        """
+
+        _image = bpy.data.images['Viewer Node']
+        _width, _height = _image.size
+        _pixels = np.empty(_width*_height*4, dtype=np.float32)
+        _image.pixels.foreach_get(_pixels)
+        # blender stores images bottom-up
+        _pixels = np.flipud(_pixels.reshape(_height, _width, 4))
+
+        _output_files = self._get_output_files(sensor_data=sensor_data)
+        for slot_name, first_channel, num_channels in self._capture_layout:
+            if slot_name not in _output_files:
+                continue
+            _frame = _pixels[:,:,first_channel:first_channel+num_channels]
+            if 1 == num_channels:
+                _frame = _frame[:,:,0]
+            self._frame_sink.write(sensor_name=sensor_data["name"],
+                                   output_name=_output_files[slot_name][0],
+                                   sub_render_ID=sub_render_ID,
+                                   step_index=step_index,
+                                   frame=np.ascontiguousarray(_frame))
+
+
+    def _store_outputs(self, sensor_data, sub_render_ID, keyframe, step_index):
+        """ store outputs of the last render; captured frames are handed to the frame sink, files of the output nodes
+            are renamed to their final name
+            DO NOT OVERWRITE!
+        Args:
+            sensor_data:            sensor data [dict]
+            sub_render_ID:          sub render ID [int]
+            keyframe:               frame number, with which the files were written [int]
+            step_index:             global step index of the outputs [int]
+        Returns:
+            renamed files [list]; [path written by output node, final path]; empty for captured outputs
+        """
+
+        if self._frame_sink is not None:
+            self._capture_output_frames(sensor_data=sensor_data, sub_render_ID=sub_render_ID, step_index=step_index)
+            return []
+
+        _renamed_files = self._rename_output_files(sensor_data=sensor_data,
+                                                   sub_render_ID=sub_render_ID,
+                                                   keyframe=keyframe,
+                                                   step_index=step_index)
+        self._stored_files.extend([step_index, final_file_name] for _, final_file_name in _renamed_files)
+
+        return _renamed_files
+
+
+    def pop_stored_files(self):
+        """ get files, which were stored by the pass since the last call
+            DO NOT OVERWRITE!
+        Args:
+            None
+        Returns:
+            stored files [list]; [step index, path]
+        """
+
+        _stored_files = self._stored_files
+        self._stored_files = []
+        return _stored_files
+
+
+    def _set_output_format(self, output_node, format_cfg, raw_data=False):
+        """ set image format of output node; settings, which are not in format_cfg, are kept
+            DO NOT OVERWRITE!
+        Args:
+            output_node:            file output node [blObject]
+            format_cfg:             format cfg, see OUTPUT_FORMAT_SETTINGS [dict]
+            raw_data:               if True, the node writes data, like depth or labels, and not images [bool]
+        Returns:
+            None
+        """
+
+        for cfg_key, setting in self.OUTPUT_FORMAT_SETTINGS.items():
+            if cfg_key in format_cfg:
+                setattr(output_node.format, setting, str(format_cfg[cfg_key]) if "colorDepth" == cfg_key
+                                                     else format_cfg[cfg_key])
+
+        # 16 bit PNG data must not pass the view transform of the scene; images keep the view transform
+        if raw_data and "PNG" == output_node.format.file_format and '16' == output_node.format.color_depth and \
+           hasattr(output_node.format, "color_management"):
+            output_node.format.color_management = 'OVERRIDE'
+            output_node.format.view_settings.view_transform = 'Raw'
+
+
+    def _get_file_extension(self, output_node):
+        """ get file extension of files of output node
+            DO NOT OVERWRITE!
+        Args:
+            output_node:            file output node [blObject]
+        Returns:
+            file extension [str]
+        """
+
+        return self.FILE_EXTENSIONS[output_node.format.file_format]
+
+
+    def _create_depth_scale_node(self, input_socket, format_cfg, label, node_offset=[0,0]):
+        """ create node, which scales depth for integer file formats; a stored value v corresponds to the depth
+            v / depthScale, e.g. depthScale 1000 stores millimeters in 16 bit PNGs. For float formats no node is created
+            DO NOT OVERWRITE!
+        Args:
+            input_socket:           depth socket [blObject]
+            format_cfg:             format cfg of depth, see OUTPUT_FORMAT_SETTINGS and depthScale [dict]
+            label:                  label of node [str]
+            node_offset:            offset position for nodes [list]
+        Returns:
+            scaled depth socket [blObject]
+        """
+
+        _file_format = format_cfg.get("fileFormat", "OPEN_EXR")
+        if _file_format in ["OPEN_EXR", "HDR"]:
+            return input_socket
+
+        # integer formats store values in [0,1]
+        _max_value = 65535 if '16' == str(format_cfg.get("colorDepth", '8')) else 255
+        _scale_node = self._node_tree.nodes.new(type="CompositorNodeMath")
+        _scale_node.label = label
+        _scale_node.operation = 'MULTIPLY'
+        _scale_node.inputs[1].default_value = format_cfg.get("depthScale", 1.0) / _max_value
+        _scale_node.location = (node_offset[0],node_offset[1])
+        self._node_tree.links.new(input_socket, _scale_node.inputs[0])
+
+        return _scale_node.outputs[0]
+
+
+    def _set_output_slot_paths(self, sensor_data, sub_render_ID):
+        """ set paths of file slots, so that the output nodes write directly into the sensor folder
+            DO NOT OVERWRITE!
+        Args:
+            sensor_data:            sensor data [dict]
+            sub_render_ID:          sub render ID [int]
+        Returns:
+            None
+        """
+
+        for slot_name, (output_name, file_extension) in self._get_output_files(sensor_data=sensor_data).items():
+            _output_node, _slot_index = self._output_slots[slot_name]
+            _output_node.file_slots[_slot_index].path = TSSRenderPass.get_output_slot_path(
+                                                                                    sensor_name=sensor_data["name"],
+                                                                                    output_name=output_name,
+                                                                                    sub_render_ID=sub_render_ID)
+
+
+    def _render_image(self, animation=False):
+        """ render image or animation; blender output is redirected to blender_render.log
+            DO NOT OVERWRITE!
+        Args:
+            animation:              if True, the frame range of the scene is rendered [bool]
+        Returns:
+            render time [float]
+        """
+
+        # only the active viewer node is executed
+        if self._capture_viewer_node is not None:
+            self._node_tree.nodes.active = self._capture_viewer_node
+
+        return TSSRenderPass.render_scene(animation=animation)
+
+    @staticmethod
+    def render_scene(animation=False):
+        """ render current scene; blender output is redirected to blender_render.log. Also used for deferred renderings
+            (see CDeferredRender.render)
+            DO NOT OVERWRITE!
+        Args:
+            animation:              if True, the frame range of the scene is rendered [bool]
+        Returns:
+            render time [float]
+        """
+
+        logfile = 'blender_render.log'
+        open(logfile, 'a').close()
+        old = os.dup(1)
+        sys.stdout.flush()
+        os.close(1)
+        os.open(logfile, os.O_WRONLY)
+        _time_1 = time.time()
+        if animation:
+            bpy.ops.render.render(animation = True)
+        else:
+            bpy.ops.render.render(write_still = True)
+        _time_2 = time.time()
+        os.close(1)
+        os.dup(old)
+        os.close(old)
+        sys.stdout.write('\r')
+
+        return _time_2-_time_1
+
+    @staticmethod
+    def get_evenly_spaced_ranges(keyframes):
+        """ split keyframes into ranges, which are evenly spaced, i.e. which can be rendered with one animation render
+            DO NOT OVERWRITE!
+        Args:
+            keyframes:              frame numbers in ascending order [list]
+        Returns:
+            ranges [list]; [first index, last index + 1] per range
+        """
+
+        _ranges = []
+        _first_index = 0
+        while _first_index < len(keyframes):
+            _last_index = _first_index + 1
+            if _last_index < len(keyframes):
+                _frame_step = keyframes[_last_index] - keyframes[_first_index]
+                while _last_index < len(keyframes) and \
+                        keyframes[_last_index] - keyframes[_last_index - 1] == _frame_step:
+                    _last_index += 1
+            _ranges.append([_first_index, _last_index])
+            _first_index = _last_index
+
+        return _ranges
+
+
+    def _rename_output_files(self, sensor_data, sub_render_ID, keyframe, step_index):
+        """ rename files of output nodes to their final name
+            DO NOT OVERWRITE!
+        Args:
+            sensor_data:            sensor data [dict]
+            sub_render_ID:          sub render ID [int]
+            keyframe:               frame number, with which the files were written [int]
+            step_index:             global step index of the files [int]
+        Returns:
+            renamed files [list]; [path written by output node, final path]
+        """
+
+        return TSSRenderPass.rename_output_files(output_path=self._general_cfg["outputPath"],
+                                                 sensor_name=sensor_data["name"],
+                                                 output_files=self._get_output_files(sensor_data=sensor_data),
+                                                 sub_render_ID=sub_render_ID,
+                                                 keyframe=keyframe,
+                                                 step_index=step_index)
+
+
+    @staticmethod
+    def get_output_slot_path(sensor_name, output_name, sub_render_ID):
+        """ get path of file slot relative to output path; the output node appends the frame number and the file
+            extension, see rename_output_files
+            DO NOT OVERWRITE!
+        Args:
+            sensor_name:            name of sensor [str]
+            output_name:            output name of file, see _get_output_files [str]
+            sub_render_ID:          sub render ID [int]
+        Returns:
+            path of file slot [str]
+        """
+
+        return sensor_name+"/"+output_name+"_"+"{:02d}".format(sub_render_ID)+"_frame"
+
+
+    @staticmethod
+    def get_output_file_path(output_path, sensor_name, output_name, file_extension, sub_render_ID, step_index):
+        """ get final path of output file
+            DO NOT OVERWRITE!
+        Args:
+            output_path:            output path of batch [str]
+            sensor_name:            name of sensor [str]
+            output_name:            output name of file, see _get_output_files [str]
+            file_extension:         file extension [str]
+            sub_render_ID:          sub render ID [int]
+            step_index:             global step index of the file [int]
+        Returns:
+            final path of output file [str]
+        """
+
+        return (output_path+"/"+sensor_name+"/"+"{:04d}".format(step_index)+output_name+"_"+
+                "{:02d}".format(sub_render_ID)+file_extension)
+
+
+    @staticmethod
+    def rename_output_files(output_path, sensor_name, output_files, sub_render_ID, keyframe, step_index):
+        """ rename files of output nodes to their final name; the output nodes write into the sensor folder already, but
+            always append the frame number to the file name. Also used for deferred renderings (see
+            src/tools/deferred_render.py)
+            DO NOT OVERWRITE!
+        Args:
+            output_path:            output path of batch, to which the output nodes write [str]
+            sensor_name:            name of sensor [str]
+            output_files:           output files [dict]; file slot name -> [output name, file extension]
+            sub_render_ID:          sub render ID [int]
+            keyframe:               frame number, with which the files were written [int]
+            step_index:             global step index of the files [int]
+        Returns:
+            renamed files [list]; [path written by output node, final path]
+        """
+
+        _renamed_files = []
+        for output_name, file_extension in output_files.values():
+            _output_file_name = (output_path+"/"+TSSRenderPass.get_output_slot_path(sensor_name=sensor_name,
+                                                                                    output_name=output_name,
+                                                                                    sub_render_ID=sub_render_ID)+
+                                 "{:04d}".format(keyframe)+file_extension)
+            _final_file_name = TSSRenderPass.get_output_file_path(output_path=output_path,
+                                                                  sensor_name=sensor_name,
+                                                                  output_name=output_name,
+                                                                  file_extension=file_extension,
+                                                                  sub_render_ID=sub_render_ID,
+                                                                  step_index=step_index)
+            # single rename within the sensor folder
+            os.replace(_output_file_name,_final_file_name)
+            _renamed_files.append([_output_file_name,_final_file_name])
+
+        return _renamed_files
+
+
+    def get_render_job(self, sensor_data, sub_render_ID, keyframes, step_indices):
+        """ get job for deferred rendering of keyframes; the render settings of the pass and sensor are taken from the
+            scene, so the pass and sensor have to be activated before
+            DO NOT OVERWRITE!
+        Args:
+            sensor_data:            sensor data [dict]
+            sub_render_ID:          sub render ID [int]
+            keyframes:              frame numbers, which are rendered; have to be evenly spaced [list]
+            step_indices:           global step index for each keyframe [list]
+        Returns:
+            render job [dict]
+        """
+
+        if self._frame_sink is not None:
+            raise Exception(self._pass_name + ": captureOutput is not supported for deferred renders!")
+
+        self._set_output_slot_paths(sensor_data=sensor_data, sub_render_ID=sub_render_ID)
+        self._switch_outputs(sensor_data=sensor_data, active=True)
+        _scene_settings = CDeferredRender.capture_scene_settings()
+        self._switch_outputs(sensor_data=sensor_data, active=False)
+
+        return {"passName": self._pass_name,
+                "sensorName": sensor_data["name"],
+                "subRenderID": sub_render_ID,
+                "outputFiles": self._get_output_files(sensor_data=sensor_data),
+                "keyframes": list(keyframes),
+                "stepIndices": list(step_indices),
+                "sceneSettings": _scene_settings}
+
+
+    def get_render_jobs(self, sensor_data, sub_render_ID, keyframes, step_indices):
+        """ get jobs for deferred rendering of keyframes; passes, which render their outputs with several renders, return
+            one job per render
+            OVERWRITE!
+        Args:
+            sensor_data:            sensor data [dict]
+            sub_render_ID:          sub render ID [int]
+            keyframes:              frame numbers, which are rendered; have to be evenly spaced [list]
+            step_indices:           global step index for each keyframe [list]
+        Returns:
+            render jobs [list]
+        """
+
+        return [self.get_render_job(sensor_data=sensor_data,
+                                    sub_render_ID=sub_render_ID,
+                                    keyframes=keyframes,
+                                    step_indices=step_indices)]
+
+
+    def render_animation(self, sensor_data, sub_render_ID, keyframes, step_indices):
+        """ render all keyframes of the pass for one sensor with a single animation render; render data, like the BVH
+            and loaded images, is kept between the frames
+            DO NOT OVERWRITE!
+        Args:
+            sensor_data:            sensor data [dict]
+            sub_render_ID:          sub render ID [int]
+            keyframes:              frame numbers, which are rendered; have to be evenly spaced [list]
+            step_indices:           global step index for each keyframe [list]
+        Returns:
+            None
+        """
+
+        # set frame range ##############################################################################################
+        if len(self.get_evenly_spaced_ranges(keyframes=keyframes)) > 1:
+            raise Exception("Keyframes of " + self._pass_name + " are not evenly spaced: " + str(keyframes))
+        _frame_step = 1
+        if len(keyframes) > 1:
+            _frame_step = keyframes[1] - keyframes[0]
+
+        _scene = bpy.context.scene
+        _frame_settings = [_scene.frame_start, _scene.frame_end, _scene.frame_step, _scene.render.use_persistent_data]
+        _scene.frame_start = keyframes[0]
+        _scene.frame_end = keyframes[-1]
+        _scene.frame_step = _frame_step
+        _scene.render.use_persistent_data = True
+        ####################################################################################### end of set frame range #
+
+        # the viewer image only holds the last frame
+        if self._frame_sink is not None:
+            raise Exception(self._pass_name + ": captureOutput is not supported for animation renders!")
+
+        # render animation
+        self._set_output_slot_paths(sensor_data=sensor_data, sub_render_ID=sub_render_ID)
+        self._switch_outputs(sensor_data=sensor_data, active=True)
+        _render_time = self._render_image(animation=True)
+        self._print_msg("Render time (" + self._pass_name + ", " + str(len(keyframes)) + " frames): " +
+                        str(_render_time))
+
+        for keyframe, step_index in zip(keyframes, step_indices):
+            self._rename_output_files(sensor_data=sensor_data,
+                                      sub_render_ID=sub_render_ID,
+                                      keyframe=keyframe,
+                                      step_index=step_index)
+        self._switch_outputs(sensor_data=sensor_data, active=False)
+
+        # restore frame range
+        _scene.frame_start, _scene.frame_end, _scene.frame_step, _scene.render.use_persistent_data = _frame_settings
\ No newline at end of file
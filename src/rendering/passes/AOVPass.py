@@ -0,0 +1,420 @@
+# blender imports
+import bpy
+
+# utility imports
+import numpy as np
+import os
+import shutil
+import pathlib
+import sys
+import time
+
+from src.rendering.TSSRenderPass import TSSRenderPass
+from src.tools.NodeTools import NodeTools
+
+class AOVPass(TSSRenderPass):
+    """ render pass, which writes rgb, pinhole depth, semantic and instance labels with a single render
+
+        The scene is rendered in the RGBDPass state. Depth is taken from the Z render pass and the labels from the
+        shader AOVs, which are created by all assets and environment effects (see NodeTools.create_label_aov_nodes).
+        Output files are named like the ones of RGBDPass, SemanticPass and InstancePass. Since the label colors are
+        sampled with the rgb settings, pixels at object borders can contain mixed label colors, if renderSamples > 1
+        and anti aliasing is active.
+        With labelOutputMode 'ID', the label IDs are written as single channel images instead of the label colors. IDs
+        can not be mixed, so they are written by a separate label render with one sample and without anti aliasing,
+        like SemanticPass and InstancePass do; rgb and depth keep the settings of the pass.
+    """
+    def __init__(self,pass_name):
+        super(AOVPass, self).__init__(pass_name=pass_name)
+        # class vars ###################################################################################################
+        self._rgb_output_node = None
+        self._depth_output_node = None
+        self._label_output_node = None
+        self._rgb_switch_node = None
+        self._depth_switch_node = None
+        self._label_switch_nodes = {}
+        self._label_output_mode = 'COLOR'
+        self._label_render = None           # outputs of current render; None: all outputs, False: rgb and depth,
+                                            # True: label IDs [bool]
+        ############################################################################################ end of class vars #
+
+
+    def reset(self):
+        self._rgb_output_node = None
+        self._depth_output_node = None
+        self._label_output_node = None
+        self._rgb_switch_node = None
+        self._depth_switch_node = None
+        self._label_switch_nodes = {}
+        self._label_output_mode = 'COLOR'
+        self._label_render = None
+
+
+    def _get_label_renders(self):
+        """ get renders of pass; with labelOutputMode 'ID', the label IDs are rendered separately
+        Args:
+            None
+        Returns:
+            renders [list]; None: all outputs, False: rgb and depth, True: label IDs
+        """
+
+        if 'ID' == self._label_output_mode:
+            return [False, True]
+        return [None]
+
+
+    def _get_label_aov_names(self):
+        """ get names of label AOVs, which are written in current label output mode
+        Args:
+            None
+        Returns:
+            semantic AOV name [str], instance AOV name [str]
+        """
+
+        if 'ID' == self._label_output_mode:
+            return NodeTools.SEMANTIC_ID_AOV_NAME, NodeTools.INSTANCE_ID_AOV_NAME
+        return NodeTools.SEMANTIC_AOV_NAME, NodeTools.INSTANCE_AOV_NAME
+
+
+    def _create_output_node(self, name, slot_names, file_format, node_offset=[0,0]):
+        """ create file output node
+        Args:
+            name:                                   name of node [str]
+            slot_names:                             names of file slots [list]
+            file_format:                            blender file format [str]
+            node_offset:                            offset position for nodes [list]
+        Returns:
+            output node [blObject]
+        """
+
+        _output_node = self._node_tree.nodes.new(type="CompositorNodeOutputFile")
+        _output_node.name = name
+        _output_node.label = name
+        _output_node.location = (node_offset[0],node_offset[1])
+        _output_node.format.file_format = file_format
+        _output_node.base_path = self._general_cfg["outputPath"]
+        _output_node.file_slots.clear()
+        for slot_name in slot_names:
+            self._new_output_slot(output_node=_output_node, slot_name=slot_name)
+        _output_node.format.compression = 0
+
+        return _output_node
+
+
+    def _create_switch_node(self, label, input_socket, node_offset=[0,0]):
+        """ create switch node; output is only passed through during rendering of this pass
+        Args:
+            label:                                  label of node [str]
+            input_socket:                           socket which is passed through [blObject]
+            node_offset:                            offset position for nodes [list]
+        Returns:
+            switch node [blObject]
+        """
+
+        _switch_node = self._node_tree.nodes.new(type="CompositorNodeSwitch")
+        _switch_node.label = label
+        _switch_node.check = False
+        _switch_node.location = (node_offset[0],node_offset[1])
+        self._node_tree.links.new(input_socket, _switch_node.inputs[1])
+
+        return _switch_node
+
+
+    def create(self):
+        """ create function of AOV pass
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        # get label output mode; 'COLOR' writes the label colors, 'ID' the label IDs
+        if "labelOutputMode" in self._cfg:
+            self._label_output_mode = self._cfg["labelOutputMode"]
+        if self._label_output_mode not in ['COLOR', 'ID']:
+            raise Exception("AOVPass: unknown labelOutputMode " + str(self._label_output_mode))
+        _semantic_aov_name, _instance_aov_name = self._get_label_aov_names()
+
+        # register shader AOVs and depth in view layer #################################################################
+        _view_layer = bpy.context.scene.view_layers["View Layer"]
+        for aov_name in [_semantic_aov_name, _instance_aov_name]:
+            if aov_name not in _view_layer.aovs:
+                _aov = _view_layer.aovs.add()
+                _aov.name = aov_name
+                _aov.type = 'VALUE' if 'ID' == self._label_output_mode else 'COLOR'
+        _view_layer.use_pass_z = True
+        ########################################################## end of register shader AOVs and depth in view layer #
+
+        # create rgb nodes #############################################################################################
+        self._rgb_switch_node = self._create_switch_node(label='aov_rgb_switch',
+                                                         input_socket=self._compositor_pass_list["combined_rgb"],
+                                                         node_offset=[self._node_offset[0]+2000,self._node_offset[1]])
+        self._rgb_output_node = self._create_output_node(name='TSSCompositorNodeOutputFileAOVImage',
+                                                         slot_names=['aov_rgbimage'],
+                                                         file_format='PNG',
+                                                         node_offset=[self._node_offset[0]+2500,self._node_offset[1]])
+        self._set_output_format(output_node=self._rgb_output_node, format_cfg=self._cfg.get("imageFormat", {}))
+        self._node_tree.links.new(self._rgb_switch_node.outputs[0], self._rgb_output_node.inputs['aov_rgbimage'])
+        ###################################################################################### end of create rgb nodes #
+
+        # create depth nodes ###########################################################################################
+        self._depth_switch_node = self._create_switch_node(label='aov_depth_switch',
+                                                           input_socket=self._render_layers_node.outputs['Depth'],
+                                                           node_offset=[self._node_offset[0]+2000,
+                                                                        self._node_offset[1]+300])
+        # integer formats store the depth scaled by depthScale in one channel
+        _depth_format = self._cfg.get("depthFormat", {})
+        self._depth_output_node = self._create_output_node(name='TSSCompositorNodeOutputFileAOVDepth',
+                                                           slot_names=['aov_pinhole'],
+                                                           file_format=_depth_format.get("fileFormat", 'OPEN_EXR'),
+                                                           node_offset=[self._node_offset[0]+2500,
+                                                                        self._node_offset[1]+300])
+        if 'OPEN_EXR' != self._depth_output_node.format.file_format:
+            self._depth_output_node.format.color_mode = 'BW'
+        self._set_output_format(output_node=self._depth_output_node, format_cfg=_depth_format, raw_data=True)
+        _depth_output = self._create_depth_scale_node(input_socket=self._depth_switch_node.outputs[0],
+                                                      format_cfg=_depth_format,
+                                                      label='aov_depth_scale',
+                                                      node_offset=[self._node_offset[0]+2250,
+                                                                   self._node_offset[1]+300])
+        self._node_tree.links.new(_depth_output, self._depth_output_node.inputs['aov_pinhole'])
+        #################################################################################### end of create depth nodes #
+
+        # create label nodes ###########################################################################################
+        # labels are not passed through the view transform for OPEN_EXR; PNG labels get a 'Raw' view transform of their
+        # own, so that the scene and thereby the rgb image keep 'Filmic'
+        _label_file_format = 'OPEN_EXR'
+        if "labelFileType" in self._cfg:
+            _label_file_format = self._cfg["labelFileType"]
+        self._label_output_node = self._create_output_node(name='TSSCompositorNodeOutputFileAOVLabel',
+                                                           slot_names=['aov_semantic', 'aov_instance'],
+                                                           file_format=_label_file_format,
+                                                           node_offset=[self._node_offset[0]+2500,
+                                                                        self._node_offset[1]+600])
+        if 'OPEN_EXR' == _label_file_format:
+            self._label_output_node.format.color_depth = '32'
+        self._label_output_node.format.color_management = 'OVERRIDE'
+        self._label_output_node.format.view_settings.view_transform = 'Raw'
+        if 'ID' == self._label_output_mode:
+            # IDs are stored in one channel; 16 bit PNGs hold IDs up to 65535
+            self._label_output_node.format.color_mode = 'BW'
+            if 'PNG' == _label_file_format:
+                self._label_output_node.format.color_depth = '16'
+        # codec and compression of labels; the file format is set with labelFileType
+        self._set_output_format(output_node=self._label_output_node,
+                                format_cfg={key: value for key, value in self._cfg.get("labelFormat", {}).items()
+                                            if key in ["compression", "exrCodec"]},
+                                raw_data=True)
+
+        for label_idx, (aov_name, slot_name) in enumerate([(_semantic_aov_name, 'aov_semantic'),
+                                                            (_instance_aov_name, 'aov_instance')]):
+            _aov_output = self._render_layers_node.outputs.get(aov_name, None)
+            if _aov_output is None:
+                raise Exception("AOVPass: render layers node has no output for AOV " + aov_name)
+
+            _switch_node = self._create_switch_node(label='aov_' + aov_name + '_switch',
+                                                    input_socket=_aov_output,
+                                                    node_offset=[self._node_offset[0]+2000,
+                                                                 self._node_offset[1]+600+label_idx*200])
+            _label_output = _switch_node.outputs[0]
+
+            # PNG stores values in [0,1]; scale IDs, so that they are stored as integer pixel values
+            if 'ID' == self._label_output_mode and 'PNG' == _label_file_format:
+                _scale_node = self._node_tree.nodes.new(type="CompositorNodeMath")
+                _scale_node.label = 'aov_' + aov_name + '_scale'
+                _scale_node.operation = 'DIVIDE'
+                _scale_node.inputs[1].default_value = 65535
+                _scale_node.location = (self._node_offset[0]+2250,self._node_offset[1]+600+label_idx*200)
+                self._node_tree.links.new(_label_output, _scale_node.inputs[0])
+                _label_output = _scale_node.outputs[0]
+
+            self._node_tree.links.new(_label_output, self._label_output_node.inputs[slot_name])
+            self._label_switch_nodes[aov_name] = _switch_node
+        #################################################################################### end of create label nodes #
+
+
+    def activate_pass(self, keyframe = -1):
+        """ active pass function
+        Args:
+            keyframe:                               current frame number; if value > -1, this should enable also the
+                                                    setting of a keyframe [int]
+        Returns:
+            None
+        """
+
+        # set params ###################################################################################################
+        # set render engine of pass; the previous pass may have used another engine
+        self._set_render_engine(keyframe=keyframe)
+
+        bpy.context.scene.render.image_settings.color_mode = 'RGB'
+        bpy.context.scene.render.film_transparent = False
+
+        self._set_render_settings(keyframe=keyframe)
+        ############################################################################################ end of set params #
+
+
+    def _set_render_settings(self, keyframe=-1):
+        """ set color management, anti aliasing, samples and bounces of current render (see _label_render)
+        Args:
+            keyframe:                               current frame number; if value > -1, this should enable also the
+                                                    setting of a keyframe [int]
+        Returns:
+            None
+        """
+
+        # label IDs must not be mixed; every pixel has to hold the ID of exactly one object
+        if self._label_render:
+            bpy.context.scene.view_settings.view_transform = 'Raw'
+            self._switch_Off_AA(keyframe=keyframe)
+            self._set_render_samples(num_samples=1, keyframe=keyframe)
+            self._set_max_bounces(num_bounces=1, keyframe=keyframe)
+            return
+
+        # set color managment; the label output node overrides the view transform with 'Raw'
+        bpy.context.scene.view_settings.view_transform = 'Filmic'
+
+        self._switch_On_AA(keyframe=keyframe)
+        self._set_render_samples(num_samples=self._cfg['renderSamples'], keyframe=keyframe)
+        self._set_max_bounces(num_bounces=self._cfg['lightPathesMaxBounces'], keyframe=keyframe)
+
+
+    def deactivate_pass(self, pass_name, pass_cfg, keyframe = -1):
+        """ deactive pass function
+        Args:
+            pass_name:                              name of pass which is suppose to be deactivated [str]
+            pass_cfg:                               cfg of pass to be deactivated [dict]
+            keyframe:                               current frame number; if value > -1, this should enable also the
+                                                    setting of a keyframe [int]
+        Returns:
+            None
+        """
+
+        pass
+
+
+    def _get_output_files(self, sensor_data):
+        """ get files, which are written by the output nodes of the pass for the sensor
+        Args:
+            sensor_data:            sensor data [dict]
+        Returns:
+            output files [dict]; file slot name -> [output name, file extension]
+        """
+
+        _sensor_name = sensor_data["name"]
+        _label_suffix = "_id" if 'ID' == self._label_output_mode else "_label"
+        _output_files = {'aov_rgbimage': [_sensor_name + "_rgb", self._get_file_extension(self._rgb_output_node)],
+                         'aov_semantic': [_sensor_name + "_semantic" + _label_suffix,
+                                          self._get_file_extension(self._label_output_node)],
+                         'aov_instance': [_sensor_name + "_instance" + _label_suffix,
+                                          self._get_file_extension(self._label_output_node)]}
+        if sensor_data["DepthEnabled"]:
+            _output_files['aov_pinhole'] = [_sensor_name + "_pinhole_depth",
+                                            self._get_file_extension(self._depth_output_node)]
+
+        # only the outputs of the current render are written
+        if self._label_render is not None:
+            _output_files = {slot_name: output_file for slot_name, output_file in _output_files.items()
+                             if (slot_name in ['aov_semantic', 'aov_instance']) == self._label_render}
+
+        return _output_files
+
+
+    def _switch_outputs(self, sensor_data, active):
+        """ switch output nodes of pass on or off and set render settings of sensor
+        Args:
+            sensor_data:            sensor data [dict]
+            active:                 if True, outputs are switched on [bool]
+        Returns:
+            None
+        """
+
+        if active:
+            bpy.context.scene.render.resolution_x = sensor_data["imageResolution"][0]
+            bpy.context.scene.render.resolution_y = sensor_data["imageResolution"][1]
+        _image_active = active and self._label_render is not True
+        _label_active = active and self._label_render is not False
+        self._rgb_switch_node.check = _image_active
+        self._depth_switch_node.check = _image_active and sensor_data["DepthEnabled"]
+        for switch_node in self._label_switch_nodes.values():
+            switch_node.check = _label_active
+
+
+    def render(self,sensor_data=None,sub_render_ID=0,keyframe=-1):
+        """ execute rendering function
+        Args:
+            sensor_data:            sensor data [dict]
+            sub_render_ID:          sub render ID [int]
+            keyframe:               current frame number [int]
+        Returns:
+            None
+        """
+
+        for label_render in self._get_label_renders():
+            self._label_render = label_render
+            if label_render is not None:
+                self._set_render_settings(keyframe=keyframe)
+
+            self._set_output_slot_paths(sensor_data=sensor_data, sub_render_ID=sub_render_ID)
+            self._switch_outputs(sensor_data=sensor_data, active=True)
+
+            # render image
+            _render_time = self._render_image()
+            self._print_msg("Render time (AOV Pass" + (", labels" if label_render else "") + "): " +
+                            str(_render_time))
+
+            # rename output files to step index or hand captured frames to frame sink
+            self._store_outputs(sensor_data=sensor_data,
+                                sub_render_ID=sub_render_ID,
+                                keyframe=keyframe,
+                                step_index=self._global_step_index)
+
+            self._switch_outputs(sensor_data=sensor_data, active=False)
+        self._label_render = None
+
+
+    def render_animation(self, sensor_data, sub_render_ID, keyframes, step_indices):
+        """ render all keyframes of the pass for one sensor; with labelOutputMode 'ID', the label IDs are rendered with
+            a second animation render
+        Args:
+            sensor_data:            sensor data [dict]
+            sub_render_ID:          sub render ID [int]
+            keyframes:              frame numbers, which are rendered; have to be evenly spaced [list]
+            step_indices:           global step index for each keyframe [list]
+        Returns:
+            None
+        """
+
+        for label_render in self._get_label_renders():
+            self._label_render = label_render
+            if label_render is not None:
+                self._set_render_settings()
+            super(AOVPass, self).render_animation(sensor_data=sensor_data,
+                                                  sub_render_ID=sub_render_ID,
+                                                  keyframes=keyframes,
+                                                  step_indices=step_indices)
+        self._label_render = None
+
+
+    def get_render_jobs(self, sensor_data, sub_render_ID, keyframes, step_indices):
+        """ get jobs for deferred rendering of keyframes; with labelOutputMode 'ID', the label IDs get their own job
+        Args:
+            sensor_data:            sensor data [dict]
+            sub_render_ID:          sub render ID [int]
+            keyframes:              frame numbers, which are rendered; have to be evenly spaced [list]
+            step_indices:           global step index for each keyframe [list]
+        Returns:
+            render jobs [list]
+        """
+
+        _render_jobs = []
+        for label_render in self._get_label_renders():
+            self._label_render = label_render
+            if label_render is not None:
+                self._set_render_settings()
+            _render_jobs.append(self.get_render_job(sensor_data=sensor_data,
+                                                    sub_render_ID=sub_render_ID,
+                                                    keyframes=keyframes,
+                                                    step_indices=step_indices))
+        self._label_render = None
+
+        return _render_jobs
@@ -142,7 +142,8 @@ class RGBDPass(TSSRenderPass):
         self._image_output_node.name = 'TSSCompositorNodeOutputFileImage'
         self._image_output_node.location = (node_offset[0]+2500,node_offset[1])
         self._image_output_node.base_path = self._general_cfg["outputPath"]
-        self._image_output_node.file_slots.new("rgbimage")
+        self._new_output_slot(output_node=self._image_output_node, slot_name="rgbimage")
+        self._set_output_format(output_node=self._image_output_node, format_cfg=self._cfg.get("imageFormat", {}))
 
 
         # switch node
@@ -181,12 +182,23 @@ class RGBDPass(TSSRenderPass):
         #self._pinhole_depth_output_node.format.tiff_codec = 'NONE'
 
         self._pinhole_depth_output_node.base_path = self._general_cfg["outputPath"]
-        self._pinhole_depth_output_node.file_slots.new('pinhole')
+        self._new_output_slot(output_node=self._pinhole_depth_output_node, slot_name='pinhole')
         bpy.context.scene.view_layers["View Layer"].use_pass_z = True
         self._pinhole_depth_output_node.format.compression = 0
+
+        # set depth format; integer formats store the depth scaled by depthScale in one channel
+        _depth_format = self._cfg.get("depthFormat", {})
+        if _depth_format.get("fileFormat", "OPEN_EXR") not in ["OPEN_EXR", "HDR"]:
+            self._pinhole_depth_output_node.format.file_format = _depth_format["fileFormat"]
+            self._pinhole_depth_output_node.format.color_mode = 'BW'
+        self._set_output_format(output_node=self._pinhole_depth_output_node, format_cfg=_depth_format, raw_data=True)
+        _depth_output = self._create_depth_scale_node(input_socket=self._pinhole_switch_node.outputs[0],
+                                                      format_cfg=_depth_format,
+                                                      label='depth_scale',
+                                                      node_offset=[node_offset[0]+2400,node_offset[1]+300])
         
         self._node_tree.links.new(
-                self._pinhole_switch_node.outputs[0],
+                _depth_output,
                 self._pinhole_depth_output_node.inputs['pinhole'])
 
 
@@ -390,6 +402,9 @@ class RGBDPass(TSSRenderPass):
         """
 
         # set params ###################################################################################################
+        # set render engine of pass; the previous pass may have used another engine
+        self._set_render_engine(keyframe=keyframe)
+
         # set color managment to filmic
         bpy.context.scene.view_settings.view_transform = 'Filmic'
         bpy.context.scene.render.image_settings.color_mode = 'RGB'
@@ -416,6 +431,60 @@ class RGBDPass(TSSRenderPass):
         pass
 
 
+    def _get_capture_channels(self):
+        """ get sockets, which are captured instead of written to files
+        Args:
+            None
+        Returns:
+            captured sockets [list]; [file slot name, socket, number of channels]
+        """
+
+        return [["rgbimage", self._rgb_switch_node.outputs[0], 3],
+                ["pinhole", self._pinhole_switch_node.outputs[0], 1]]
+
+
+    def _get_output_files(self, sensor_data):
+        """ get files, which are written by the output nodes of the pass for the sensor
+        Args:
+            sensor_data:            sensor data [dict]
+        Returns:
+            output files [dict]; file slot name -> [output name, file extension]
+        """
+
+        _sensor_name = sensor_data["name"]
+        _output_files = {"rgbimage": [_sensor_name + "_rgb", self._get_file_extension(self._image_output_node)]}
+        if sensor_data["DepthEnabled"]:
+            _output_files["pinhole"] = [_sensor_name + "_pinhole_depth",
+                                        self._get_file_extension(self._pinhole_depth_output_node)]
+        return _output_files
+
+
+    def _switch_outputs(self, sensor_data, active):
+        """ switch output nodes of pass on or off and set render settings of sensor
+        Args:
+            sensor_data:            sensor data [dict]
+            active:                 if True, outputs are switched on [bool]
+        Returns:
+            None
+        """
+
+        if active:
+            # update render settings ###################################################################################
+            self._camera_resolution_x.outputs[0].default_value = sensor_data["imageResolution"][0]
+            self._camera_resolution_y.outputs[0].default_value = sensor_data["imageResolution"][1]
+            bpy.context.scene.render.resolution_x = sensor_data["imageResolution"][0]
+            bpy.context.scene.render.resolution_y = sensor_data["imageResolution"][1]
+            if sensor_data["DepthEnabled"]:
+                self._pinhole_switch_node.check = True
+                #self._depth_switch_node.check = True NOTE: depth not supported anymore
+            self._rgb_switch_node.check = True
+            ############################################################################ end of update render settings #
+        else:
+            self._pinhole_switch_node.check = False
+            #self._depth_switch_node.check = False  NOTE: depth not supported anymore
+            self._rgb_switch_node.check = False
+
+
     def render(self,sensor_data=None,sub_render_ID=0,keyframe=-1):
         """ execute rendering function
             OVERWRITE!
@@ -425,77 +494,17 @@ class RGBDPass(TSSRenderPass):
             None
         """
 
-        # assemble file name ###########################################################################################
-        _sensor_name = sensor_data["name"]
-        _rgb_output_name = _sensor_name + "_rgb"
-        _p_depth_output_name = _sensor_name + "_pinhole_depth"
-        _e_depth_output_name = _sensor_name + "_euclidean_depth"
-        #################################################################################### end of assemble file name #
-
-        # update render settings #######################################################################################
-        self._camera_resolution_x.outputs[0].default_value = sensor_data["imageResolution"][0]
-        self._camera_resolution_y.outputs[0].default_value = sensor_data["imageResolution"][1]
-        bpy.context.scene.render.resolution_x = sensor_data["imageResolution"][0]
-        bpy.context.scene.render.resolution_y = sensor_data["imageResolution"][1]
-        if sensor_data["DepthEnabled"]:
-            self._pinhole_switch_node.check = True
-            #self._depth_switch_node.check = True NOTE: depth not supported anymore
-        self._rgb_switch_node.check = True
-        ################################################################################ end of update render settings #
-
-        # update filename
+        self._set_output_slot_paths(sensor_data=sensor_data, sub_render_ID=sub_render_ID)
+        self._switch_outputs(sensor_data=sensor_data, active=True)
 
         # render image
-        logfile = 'blender_render.log'
-        open(logfile, 'a').close()
-        old = os.dup(1)
-        sys.stdout.flush()
-        os.close(1)
-        os.open(logfile, os.O_WRONLY)
-        _time_1 = time.time()
-        bpy.ops.render.render(write_still = True)
-        _time_2 = time.time()
-        os.close(1)
-        os.dup(old)
-        os.close(old)
-        sys.stdout.write('\r')
-        self._print_msg("Render time (RGBD Pass): " + str(_time_2-_time_1))
-
-
-        # rename output name ###########################################################################################
-        _current_frame_number = "{:04d}".format(keyframe)
-        _new_frame_number = "{:04d}".format(self._global_step_index)
-        _sub_render_ID_str = "{:02d}".format(sub_render_ID)
-        _base_path = self._general_cfg["outputPath"]
-        _sensor_path = os.path.join(_base_path,_sensor_name)
-
-        # shift file ###################################################################################################
-        # check if folder is available
-        if not os.path.exists(_sensor_path):
-            pathlib.Path(_sensor_path).mkdir(parents=True, exist_ok=True)
-        ############################################################################################ end of shift file #
-
-        # rename rgb output name #######################################################################################
-        _old_file_name = _base_path+"/rgbimage"+_current_frame_number+".png"
-        _new_file_name = _base_path+"/"+_new_frame_number+_rgb_output_name+"_"+_sub_render_ID_str+".png"
-        _moved_file_name = _sensor_path+"/"+_new_frame_number+_rgb_output_name+"_"+_sub_render_ID_str+".png"
-        os.rename(_old_file_name,_new_file_name)
-        shutil.move(_new_file_name,_moved_file_name)
-        ################################################################################ end of rename rgb output name #
+        _render_time = self._render_image()
+        self._print_msg("Render time (RGBD Pass): " + str(_render_time))
 
-        
-        if sensor_data["DepthEnabled"]:
-            # rename pinhole depth output name #########################################################################
-            #_file_extension = ".tif"
-            _file_extension = ".exr"
-            _old_file_name = _base_path+"/pinhole"+_current_frame_number+_file_extension
-            _new_file_name = _base_path+"/"+_new_frame_number+_p_depth_output_name+"_"+_sub_render_ID_str+_file_extension
-            _moved_file_name = _sensor_path+"/"+_new_frame_number+_p_depth_output_name+"_"+_sub_render_ID_str+_file_extension
-            os.rename(_old_file_name,_new_file_name)
-            shutil.move(_new_file_name,_moved_file_name)
-            ######################################################################## end of rename pinhole output name #
-        #################################################################################### end of rename output name #
+        # rename output files to step index or hand captured frames to frame sink
+        self._store_outputs(sensor_data=sensor_data,
+                            sub_render_ID=sub_render_ID,
+                            keyframe=keyframe,
+                            step_index=self._global_step_index)
 
-        self._pinhole_switch_node.check = False
-        #self._depth_switch_node.check = False  NOTE: depth not supported anymore
-        self._rgb_switch_node.check = False
\ No newline at end of file
+        self._switch_outputs(sensor_data=sensor_data, active=False)
\ No newline at end of file
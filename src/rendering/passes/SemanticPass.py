@@ -48,8 +48,10 @@ class SemanticPass(TSSRenderPass):
         else:
             self._output_node.format.file_format = "PNG"
         self._output_node.base_path = self._general_cfg["outputPath"]
-        self._output_node.file_slots.new('semantic')
+        self._new_output_slot(output_node=self._output_node, slot_name='semantic')
         self._output_node.format.compression = 0
+        self._set_output_format(output_node=self._output_node, format_cfg=self._cfg.get("imageFormat", {}),
+                                raw_data=True)
         #################################################################################### end of create output node #
 
         # activate render layers which are needed for semantics ########################################################
@@ -87,6 +89,9 @@ class SemanticPass(TSSRenderPass):
             None
         """
 
+        # set render engine of pass; the previous pass may have used another engine
+        self._set_render_engine(keyframe=keyframe)
+
         # set color managment to raw; we want the unprocessed color data
         bpy.context.scene.view_settings.view_transform = 'Raw'
 
@@ -116,6 +121,43 @@ class SemanticPass(TSSRenderPass):
 
         pass
 
+    def _get_capture_channels(self):
+        """ get sockets, which are captured instead of written to files
+        Args:
+            None
+        Returns:
+            captured sockets [list]; [file slot name, socket, number of channels]
+        """
+
+        return [["semantic", self._label_switch_node.outputs[0], 3]]
+
+
+    def _get_output_files(self, sensor_data):
+        """ get files, which are written by the output nodes of the pass for the sensor
+        Args:
+            sensor_data:            sensor data [dict]
+        Returns:
+            output files [dict]; file slot name -> [output name, file extension]
+        """
+
+        return {"semantic": [sensor_data["name"] + "_semantic_label", self._get_file_extension(self._output_node)]}
+
+
+    def _switch_outputs(self, sensor_data, active):
+        """ switch output nodes of pass on or off and set render settings of sensor
+        Args:
+            sensor_data:            sensor data [dict]
+            active:                 if True, outputs are switched on [bool]
+        Returns:
+            None
+        """
+
+        if active:
+            bpy.context.scene.render.resolution_x = sensor_data["imageResolution"][0]
+            bpy.context.scene.render.resolution_y = sensor_data["imageResolution"][1]
+        self._label_switch_node.check = active
+
+
     def render(self,sensor_data=None,sub_render_ID=0,keyframe=-1):
         """ execute rendering function
             OVERWRITE!
@@ -125,49 +167,24 @@ class SemanticPass(TSSRenderPass):
             None
         """
 
-        # rename output name
-        _sensor_name = sensor_data["name"]
-        _semantic_output_name = _sensor_name + "_semantic_label"
-        self._label_switch_node.check = True
+        self._set_output_slot_paths(sensor_data=sensor_data, sub_render_ID=sub_render_ID)
+        self._switch_outputs(sensor_data=sensor_data, active=True)
 
         # render image
-        logfile = 'blender_render.log'
-        open(logfile, 'a').close()
-        old = os.dup(1)
-        sys.stdout.flush()
-        os.close(1)
-        os.open(logfile, os.O_WRONLY)
-        _time_1 = time.time()
-        bpy.ops.render.render(write_still = True)
-        _time_2 = time.time()
-        os.close(1)
-        os.dup(old)
-        os.close(old)
-        sys.stdout.write('\r')
-        self._print_msg("Render time (Semantic pass): " + str(_time_2-_time_1))
-
-        # rename output name ###########################################################################################
-        _current_frame_number = "{:04d}".format(keyframe)
-        _new_frame_number = "{:04d}".format(self._global_step_index)
-        _sub_render_ID_str = "{:02d}".format(sub_render_ID)
-        _base_path = self._general_cfg["outputPath"]
-        _sensor_path = os.path.join(_base_path,_sensor_name)
-
-        # shift file ###################################################################################################
-        # check if folder is available
-        if not os.path.exists(_sensor_path):
-            pathlib.Path(_sensor_path).mkdir(parents=True, exist_ok=True)
-        ############################################################################################ end of shift file #
-
-        # rename rgb output name #######################################################################################
-        _old_file_name = _base_path+"/semantic"+_current_frame_number+".png"
-        _new_file_name = _base_path+"/"+_new_frame_number+_semantic_output_name+"_"+_sub_render_ID_str+".png"
-        _moved_file_name = _sensor_path+"/"+_new_frame_number+_semantic_output_name+"_"+_sub_render_ID_str+".png"
-        os.rename(_old_file_name,_new_file_name)
-        shutil.move(_new_file_name,_moved_file_name)
-        ################################################################################ end of rename rgb output name #
-        
-        
-        #################################################################################### end of rename output name #
-        
-        self._label_switch_node.check = False
\ No newline at end of file
+        _render_time = self._render_image()
+        self._print_msg("Render time (Semantic pass): " + str(_render_time))
+
+        # rename output files to step index or hand captured frames to frame sink
+        _renamed_files = self._store_outputs(sensor_data=sensor_data,
+                                             sub_render_ID=sub_render_ID,
+                                             keyframe=keyframe,
+                                             step_index=self._global_step_index)
+
+        # compare label image with reference render of general render engine
+        if self._cfg.get("validateRenderEngine", False):
+            for output_file_name, final_file_name in _renamed_files:
+                self._validate_render_engine(rendered_file_path=final_file_name,
+                                             reference_file_path=output_file_name,
+                                             keyframe=keyframe)
+
+        self._switch_outputs(sensor_data=sensor_data, active=False)
\ No newline at end of file
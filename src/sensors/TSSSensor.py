@@ -105,6 +105,10 @@ class TSSSensor(TSSBase):
 
     def activate_pass(self, pass_name, pass_cfg, keyframe = -1):
 
+        # use render pass settings of aliased pass, if pass is not configured for sensor
+        if pass_name not in self._cfg["renderPasses"]:
+            pass_name = self.PASS_ENTRY_ALIASES.get(pass_name, pass_name)
+
         if pass_name in self._cfg["renderPasses"]:
             # get activation slot and current activation ID
             _activation_slot = self._cfg["renderPasses"][pass_name]["activationSlot"]
@@ -4,24 +4,43 @@ import bpy
 # utility imports
 import numpy as np
 import csv
+import hashlib
 import random
 import importlib
 
+from src.tools.image_cache import CImageCache
+
 class NodeTools(object):
     """docstring for NodeTools"""
+
+    # names of shader AOVs, which are written by the AOVPass
+    SEMANTIC_AOV_NAME = "semantic_label"
+    INSTANCE_AOV_NAME = "instance_label"
+    SEMANTIC_ID_AOV_NAME = "semantic_id"
+    INSTANCE_ID_AOV_NAME = "instance_id"
+
     def __init__(self):
         super(NodeTools, self).__init__()
         # class vars ###################################################################################################
         ############################################################################################ end of class vars #
 
-    def create_switching_node(self, node_tree, label_list, env_mode=False, uv_map=None, node_offset=[0,0]):
-        """ create switching nodes pipeline
+    def create_switching_node(self, node_tree, label_list, env_mode=False, uv_map=None, node_offset=[0,0],
+                              label_ID_output=None, num_label_per_channel=15, step_label_classes=None):
+        """ create switching nodes pipeline; the RGB labels are stored in a lookup table image, which is indexed by the
+            label ID, so that the cost of the switch does not depend on the number of labels. Only labels, which are
+            given as label maps (dicts), are switched with a compare and mix node each.
         Args:
             node_tree:                              node tree handle [blObject]
-            label_list:                             label ID list; contains RGB labels [list] [R,G,B]
+            label_list:                             label ID list; contains RGB labels [list] [R,G,B] or label
+                                                    maps [dict]
             node_offset:                            node offset for y and y [list] [int]
+            label_ID_output:                        output socket of label ID; if None, the value node
+                                                    semantic_pass_ID is used [blObject]
+            num_label_per_channel:                  number of labels per RGB channel, with which label maps are
+                                                    encoded; has to match the decoding of the label AOVs [int]
+            step_label_classes:                     stepping size per channel; usually 1/num_label_per_channel [float]
         Returns:
-            handle to last node [blObject], handle to assign switch [blObject]
+            handle to last node [blObject], handle to assign switch [blObject]; None, if label_ID_output is given
         """
 
         # define local variables #######################################################################################
@@ -33,38 +52,45 @@ class NodeTools(object):
         ################################################################################ end of define local variables #
 
         # create labelID handle ########################################################################################
-        _label_ID_Node = node_tree.node_tree.nodes.get("semantic_pass_ID", None)
-        if _label_ID_Node is None:
+        _label_ID_Node = None
+        if label_ID_output is None:
+            _label_ID_Node = node_tree.node_tree.nodes.get("semantic_pass_ID", None)
+        if label_ID_output is None and _label_ID_Node is None:
             _label_ID_Node = node_tree.node_tree.nodes.new("ShaderNodeValue")
             _label_ID_Node.location = ((node_offset[0]-1000,node_offset[1]))
             _label_ID_Node.name = "semantic_pass_ID"
             _label_ID_Node.label = "semantic_pass_ID"
             _label_ID_Node.outputs[0].default_value = 1
+        if label_ID_output is None:
+            label_ID_output = _label_ID_Node.outputs[0]
         ################################################################################# end of create labelID handle #
 
-        # create label nodes ###########################################################################################
+        # create lookup table of RGB labels
+        _prev_mix_node = self._create_label_lookup_node(node_tree=node_tree,
+                                                        label_list=label_list,
+                                                        label_ID_output=label_ID_output,
+                                                        node_offset=[node_offset[0], node_offset[1]+400])
+        _current_mix_shader_node = _prev_mix_node
+
+        # create label map nodes #######################################################################################
         for labelIdx, label in enumerate(label_list):
 
+            if not isinstance(label, dict):
+                continue
+
             label_ID = labelIdx + 1
             _mapping_name = "mapping"
-            if isinstance(label, dict):
-                _x_offset = label_ID*_step_node_width + node_offset[0]
-                _y_offset = (_num_labels-label_ID)*_step_node_height + node_offset[1]
-                _current_color_node = self.create_label_remap_node( node_tree=node_tree,
-                                                                    label_map=label,
-                                                                    group_name=_mapping_name,
-                                                                    env_mode=env_mode,
-                                                                    num_label_per_channel=15.0,
-                                                                    node_offset=[_x_offset,_y_offset])
-                if uv_map is not None:
-                    node_tree.node_tree.links.new(_current_color_node.inputs[0], uv_map)
-            else:
-                # create color node ####################################################################################
-                _current_color_node = node_tree.node_tree.nodes.new("ShaderNodeRGB")
-                _current_color_node.location = ((label_ID*_step_node_width + node_offset[0],
-                                                (_num_labels-label_ID)*_step_node_height + node_offset[1]))
-                _current_color_node.outputs[0].default_value = (label[0],label[1],label[2], 1)
-                ############################################################################# end of create color node #
+            _x_offset = label_ID*_step_node_width + node_offset[0]
+            _y_offset = (_num_labels-label_ID)*_step_node_height + node_offset[1]
+            _current_color_node = self.create_label_remap_node( node_tree=node_tree,
+                                                                label_map=label,
+                                                                group_name=_mapping_name,
+                                                                env_mode=env_mode,
+                                                                num_label_per_channel=num_label_per_channel,
+                                                                step_label_classes=step_label_classes,
+                                                                node_offset=[_x_offset,_y_offset])
+            if uv_map is not None:
+                node_tree.node_tree.links.new(_current_color_node.inputs[0], uv_map)
 
             # create new mix node ######################################################################################
             _current_mix_shader_node = node_tree.node_tree.nodes.new("ShaderNodeMixRGB")
@@ -84,25 +110,160 @@ class NodeTools(object):
 
             # link nodes togther #######################################################################################
             node_tree.node_tree.links.new(_current_mix_shader_node.inputs[0], _current_compare_node.outputs[0])
-            if _prev_mix_node is not None:
-                node_tree.node_tree.links.new(_current_mix_shader_node.inputs[1], _prev_mix_node.outputs[0])
+            node_tree.node_tree.links.new(_current_mix_shader_node.inputs[1], _prev_mix_node.outputs[0])
             node_tree.node_tree.links.new(_current_mix_shader_node.inputs[2], _current_color_node.outputs[0])
             
-            node_tree.node_tree.links.new(_current_compare_node.inputs[1], _label_ID_Node.outputs[0])
+            node_tree.node_tree.links.new(_current_compare_node.inputs[1], label_ID_output)
             ################################################################################ end of link nodes togther #
 
             # update _prev_mix_node
             _prev_mix_node = _current_mix_shader_node
-        #################################################################################### end of create label nodes #
+        ################################################################################ end of create label map nodes #
 
-        # return last mix shader node
+        # return last node
         return _current_mix_shader_node, _label_ID_Node
 
 
+    def _create_label_lookup_node(self, node_tree, label_list, label_ID_output, node_offset=[0,0]):
+        """ create lookup table image node of RGB labels; pixel i of the table holds the color of label ID i. The first
+            and the last pixel hold the default color of a mix node (0.5 gray), which is returned for IDs without label,
+            like for the former compare and mix chain. The image is named by the hash of its pixels, so that all node
+            trees with the same labels share one table
+        Args:
+            node_tree:                              node tree handle [blObject]
+            label_list:                             label ID list; contains RGB labels [list] [R,G,B]; label maps
+                                                    [dict] get the default color [list]
+            label_ID_output:                        output socket of label ID [blObject]
+            node_offset:                            node offset for y and y [list] [int]
+        Returns:
+            image node of lookup table [blObject]
+        """
+
+        # create lookup table image ####################################################################################
+        _num_pixels = len(label_list) + 2
+        _pixels = np.full((_num_pixels, 4), 0.5, dtype=np.float32)
+        _pixels[:, 3] = 1.0
+        for labelIdx, label in enumerate(label_list):
+            if not isinstance(label, dict):
+                _pixels[labelIdx + 1, :3] = label[:3]
+
+        _image_name = "label_lookup_table_" + hashlib.sha1(_pixels.tobytes()).hexdigest()[:16]
+        _lookup_image = bpy.data.images.get(_image_name)
+        if _lookup_image is not None:
+            # reuse existing table only, if its pixels were not changed
+            _existing_pixels = np.empty(_pixels.size, dtype=np.float32)
+            if tuple(_lookup_image.size) == (_num_pixels, 1):
+                _lookup_image.pixels.foreach_get(_existing_pixels)
+            if tuple(_lookup_image.size) != (_num_pixels, 1) or not np.array_equal(_existing_pixels, _pixels.ravel()):
+                _lookup_image.name = _image_name + "_outdated"
+                _lookup_image = None
+
+        if _lookup_image is None:
+            _lookup_image = bpy.data.images.new(_image_name, width=_num_pixels, height=1, alpha=True,
+                                                float_buffer=True)
+            _lookup_image.colorspace_settings.name = 'Non-Color'
+            _lookup_image.pixels.foreach_set(_pixels.ravel())
+            # the table is packed, so that it is stored in saved blender files
+            _lookup_image.file_format = 'OPEN_EXR'
+            _lookup_image.pack()
+        ############################################################################# end of create lookup table image #
+
+        # create lookup nodes; u = (ID + 0.5) / num pixels hits the center of pixel ID #################################
+        _lookup_u_node = node_tree.node_tree.nodes.new("ShaderNodeMath")
+        _lookup_u_node.location = (node_offset[0]-600,node_offset[1])
+        _lookup_u_node.operation = 'MULTIPLY_ADD'
+        _lookup_u_node.inputs[1].default_value = 1.0 / _num_pixels
+        _lookup_u_node.inputs[2].default_value = 0.5 / _num_pixels
+
+        _lookup_vector_node = node_tree.node_tree.nodes.new("ShaderNodeCombineXYZ")
+        _lookup_vector_node.location = (node_offset[0]-400,node_offset[1])
+        _lookup_vector_node.inputs[1].default_value = 0.5
+
+        _lookup_node = node_tree.node_tree.nodes.new("ShaderNodeTexImage")
+        _lookup_node.location = (node_offset[0]-200,node_offset[1])
+        _lookup_node.label = "label_lookup_table"
+        _lookup_node.image = _lookup_image
+        _lookup_node.interpolation = 'Closest'
+        _lookup_node.extension = 'EXTEND'
+
+        node_tree.node_tree.links.new(_lookup_u_node.inputs[0], label_ID_output)
+        node_tree.node_tree.links.new(_lookup_vector_node.inputs[0], _lookup_u_node.outputs[0])
+        node_tree.node_tree.links.new(_lookup_node.inputs[0], _lookup_vector_node.outputs[0])
+        ########################################################################################## end of lookup nodes #
+
+        return _lookup_node
+
+
     def create_pbr_texture_nodes(self):
         pass
 
 
+    def create_label_aov_nodes(self,
+                               node_tree,
+                               semantic_output,
+                               instance_output,
+                               num_label_per_channel,
+                               instance_id_output=None,
+                               node_offset=[0,0]):
+        """ create shader AOV outputs for semantic and instance labels; AOVs are only evaluated by cycles, if they are
+            registered in the view layer (see AOVPass). Besides the label colors, the label IDs are written to the
+            value AOVs semantic_id and instance_id.
+        Args:
+            node_tree:                              node tree handle [blObject]
+            semantic_output:                        output socket of semantic label color [blObject]
+            instance_output:                        output socket of instance label color [blObject]
+            num_label_per_channel:                  number of labels per RGB channel of the label colors; used to
+                                                    decode the label IDs [int]
+            instance_id_output:                     output socket of instance ID value; if None, the instance ID is
+                                                    decoded from instance_output [blObject]
+            node_offset:                            node offset for y and y [list] [int]
+        Returns:
+            None
+        """
+
+        for aov_idx, (aov_name, label_output) in enumerate([(self.SEMANTIC_AOV_NAME, semantic_output),
+                                                             (self.INSTANCE_AOV_NAME, instance_output)]):
+            # reuse existing AOV output; world node trees are shared by all environment effects
+            _aov_node = node_tree.node_tree.nodes.get(aov_name + "_aov", None)
+            if _aov_node is None:
+                _aov_node = node_tree.node_tree.nodes.new("ShaderNodeOutputAOV")
+                _aov_node.name = aov_name + "_aov"
+                _aov_node.label = aov_name + "_aov"
+                _aov_node.aov_name = aov_name
+                _aov_node.location = (node_offset[0],node_offset[1]-aov_idx*200)
+
+            node_tree.node_tree.links.new(_aov_node.inputs["Color"], label_output)
+
+        for aov_idx, (aov_name, label_output, id_output) in enumerate([
+                                                    (self.SEMANTIC_ID_AOV_NAME, semantic_output, None),
+                                                    (self.INSTANCE_ID_AOV_NAME, instance_output, instance_id_output)]):
+            _aov_node = node_tree.node_tree.nodes.get(aov_name + "_aov", None)
+            if _aov_node is None:
+                _aov_node = node_tree.node_tree.nodes.new("ShaderNodeOutputAOV")
+                _aov_node.name = aov_name + "_aov"
+                _aov_node.label = aov_name + "_aov"
+                _aov_node.aov_name = aov_name
+                _aov_node.location = (node_offset[0],node_offset[1]-(aov_idx+2)*200)
+
+            # IDs, which are available as value, are written directly; otherwise the label color is decoded
+            if id_output is None:
+                _decode_name = aov_name + "_decode_" + str(num_label_per_channel)
+                _decode_input_node = node_tree.node_tree.nodes.get(_decode_name + "_input", None)
+                _decode_output_node = node_tree.node_tree.nodes.get(_decode_name + "_output", None)
+                if _decode_input_node is None or _decode_output_node is None:
+                    _decode_input_node, _decode_output_node = self._create_rgb_to_id_node_tree(
+                                                        node_tree=node_tree,
+                                                        num_label_per_channel=num_label_per_channel,
+                                                        node_offset=[node_offset[0]-1000,
+                                                                     node_offset[1]-(aov_idx+2)*200])
+                    _decode_input_node.name = _decode_name + "_input"
+                    _decode_output_node.name = _decode_name + "_output"
+                node_tree.node_tree.links.new(_decode_input_node.inputs[0], label_output)
+                id_output = _decode_output_node.outputs[0]
+
+            node_tree.node_tree.links.new(_aov_node.inputs["Value"], id_output)
+
+
     def _id_to_rgb(self, id_value, num_label_per_channel, step_label_classes):
         # calc RGB value for label level ###########################################################################
         # TODO: add formula here!
@@ -222,7 +383,9 @@ class NodeTools(object):
                                                                 label_list=_label_vec,
                                                                 env_mode=env_mode,
                                                                 uv_map=uv_map,
-                                                                node_offset=[node_offset[0]-3000, node_offset[1]+0])
+                                                                node_offset=[node_offset[0]-3000, node_offset[1]+0],
+                                                                num_label_per_channel=num_label_per_channel,
+                                                                step_label_classes=step_label_classes)
 
         # create label switching node ##################################################################################
         _label_active_node = node_tree.node_tree.nodes.new("ShaderNodeMixRGB")
@@ -314,6 +477,54 @@ class NodeTools(object):
         pass
 
 
+    def _create_rgb_to_id_node_tree(self, node_tree, num_label_per_channel, node_offset=[0,0]):
+        """ create nodes, which decode a label color of _id_to_rgb back to its ID:
+            ID = round(R*n)*n*n + round(G*n)*n + round(B*n)
+        Args:
+            node_tree:                              node tree handle [blObject]
+            num_label_per_channel:                  number of labels per RGB channel [int]
+            node_offset:                            node offset for y and y [list] [int]
+        Returns:
+            input node, which takes the label color [blObject], output node, which returns the ID [blObject]
+        """
+
+        _separate_node = node_tree.node_tree.nodes.new('ShaderNodeSeparateRGB')
+        _separate_node.label = "label_color_separate_node"
+        _separate_node.location = (node_offset[0],node_offset[1])
+
+        # scale channels to label levels and remove interpolation noise
+        _round_node_list = []
+        for channel_idx in range(3):
+            _mult_node = node_tree.node_tree.nodes.new('ShaderNodeMath')
+            _mult_node.label = "label_level_mult_node_" + str(channel_idx+1)
+            _mult_node.operation = 'MULTIPLY'
+            _mult_node.location = (200+node_offset[0],node_offset[1]-channel_idx*200)
+            _mult_node.inputs[1].default_value = num_label_per_channel
+
+            _round_node = node_tree.node_tree.nodes.new('ShaderNodeMath')
+            _round_node.label = "label_level_round_node_" + str(channel_idx+1)
+            _round_node.operation = 'ROUND'
+            _round_node.location = (400+node_offset[0],node_offset[1]-channel_idx*200)
+
+            node_tree.node_tree.links.new(_mult_node.inputs[0], _separate_node.outputs[channel_idx])
+            node_tree.node_tree.links.new(_round_node.inputs[0], _mult_node.outputs[0])
+            _round_node_list.append(_round_node)
+
+        # combine label levels to ID
+        _last_output = _round_node_list[0].outputs[0]
+        for channel_idx in range(1,3):
+            _multiply_add_node = node_tree.node_tree.nodes.new('ShaderNodeMath')
+            _multiply_add_node.label = "label_level_multiply_add_node_" + str(channel_idx)
+            _multiply_add_node.operation = 'MULTIPLY_ADD'
+            _multiply_add_node.location = (400+channel_idx*200+node_offset[0],node_offset[1])
+            _multiply_add_node.inputs[1].default_value = num_label_per_channel
+            node_tree.node_tree.links.new(_multiply_add_node.inputs[0], _last_output)
+            node_tree.node_tree.links.new(_multiply_add_node.inputs[2], _round_node_list[channel_idx].outputs[0])
+            _last_output = _multiply_add_node.outputs[0]
+
+        return _separate_node, _multiply_add_node
+
+
     def _create_id_to_rgb_node_tree(self,
                                     node_tree,
                                     num_label_per_channel,
@@ -487,8 +698,7 @@ class NodeTools(object):
             _mapping_image = _sub_tree.nodes.new('ShaderNodeTexImage')
         _mapping_image.label = "mapping_texture"
         _mapping_image.location = (-500,-500)
-        _mapping_image.image = bpy.data.images.load(label_map["filePath"])
-        _mapping_image.image.colorspace_settings.name = 'Non-Color'
+        _mapping_image.image = CImageCache.load(file_path=label_map["filePath"], colorspace='Non-Color')
         _mapping_image.interpolation = 'Closest'
         _sub_tree.links.new(_mapping_image.inputs[0], _group_input.outputs[0])
         ################################################################################### end of build up node logic #
@@ -0,0 +1,89 @@
+# system imports
+import json
+import os
+
+# NOTE: this module is imported by TSSBase; it must not import blender modules
+
+
+class CCfgCache():
+    """ process-wide cache of parsed json cfg files, e.g. default cfgs of modules and templates of assets
+
+        Files are parsed once per process and only re-read, if their modification time changes. The cached cfgs are
+        never handed out; every load returns a copy, which the caller may modify freely. The number of cache hits and
+        misses is counted over the whole process (see get_stats).
+    """
+
+    _entries = {}                   # cached cfgs; abs path -> [mtime, cfg] [dict]
+    _hits = 0                       # number of loads, which were served from the cache [int]
+    _misses = 0                     # number of loads, which read the file [int]
+
+    def __init__(self):
+        super(CCfgCache, self).__init__()
+
+    @staticmethod
+    def _copy(value):
+        """ copy parsed json value; faster than copy.deepcopy, since only dicts and lists have to be copied
+        Args:
+            value:          parsed json value [dict, list, str, float, int, bool or None]
+        Returns:
+            copy of value [dict, list, str, float, int, bool or None]
+        """
+
+        if isinstance(value, dict):
+            return {key: CCfgCache._copy(entry) for key, entry in value.items()}
+        if isinstance(value, list):
+            return [CCfgCache._copy(entry) for entry in value]
+        return value
+
+    @classmethod
+    def load(cls, file_path):
+        """ load json cfg file
+        Args:
+            file_path:      path of json file [str]
+        Returns:
+            copy of cfg [dict]
+        """
+
+        _file_path = os.path.abspath(file_path)
+        _mtime = os.path.getmtime(_file_path)
+
+        _entry = cls._entries.get(_file_path)
+        if _entry is not None and _entry[0] == _mtime:
+            cls._hits += 1
+        else:
+            cls._misses += 1
+            with open(_file_path, 'r') as f:
+                _entry = [_mtime, json.load(f)]
+            cls._entries[_file_path] = _entry
+
+        return cls._copy(_entry[1])
+
+    @classmethod
+    def clear(cls):
+        """ remove all cached cfgs and reset counters
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        cls._entries = {}
+        cls._hits = 0
+        cls._misses = 0
+
+    @classmethod
+    def get_stats(cls):
+        """ get cache statistics
+        Args:
+            None
+        Returns:
+            statistics [dict]; hits, misses and number of cached files
+        """
+
+        return {"hits": cls._hits, "misses": cls._misses, "files": len(cls._entries)}
+
+    @classmethod
+    def get_summary(cls):
+        _stats = cls.get_stats()
+        return "cfg cache: {} hits, {} misses, {} cached files".format(_stats["hits"], _stats["misses"],
+                                                                      _stats["files"])
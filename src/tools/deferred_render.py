@@ -0,0 +1,303 @@
+# blender imports
+import bpy
+
+# system imports
+import functools
+import glob
+import json
+import math
+import os
+import sys
+from datetime import datetime
+
+
+class CDeferredRender():
+    """ renders batches, which were built with renderMode "deferred"
+
+        In the build phase, TSS_simulation keyframes all samples of a batch, saves the .blend file and writes one render
+        job per pass, sub render and sensor to <batch>/render_jobs.json. A job contains the keyframes, the global step
+        indices, the output files and the scene settings (render settings, camera, compositor switches, file slot paths), which were
+        active when the pass was rendered.
+        In the render phase, any number of worker processes open the saved .blend file, split every job into evenly
+        spaced frame ranges and render their share of the ranges with animation renders. The files are renamed with the
+        same scheme as in a direct rendering (see TSSRenderPass.rename_output_files).
+        The build phase only writes <batch>/build_complete.json. The batch_complete.json record, which is checked by
+        --resume, is written by the worker, which finds all ranges of the batch rendered.
+    """
+
+    RENDER_JOBS_FILE = "render_jobs.json"
+    BUILD_COMPLETE_RECORD = "build_complete.json"
+    BATCH_COMPLETE_RECORD = "batch_complete.json"
+
+    # scene settings, which are changed by render passes and sensors
+    SCENE_SETTINGS = ["render.engine",
+                      "render.resolution_x",
+                      "render.resolution_y",
+                      "render.film_transparent",
+                      "render.filter_size",
+                      "render.image_settings.color_mode",
+                      "view_settings.view_transform",
+                      "cycles.samples",
+                      "cycles.max_bounces",
+                      "cycles.pixel_filter_type",
+                      "cycles.diffuse_bounces",
+                      "cycles.glossy_bounces",
+                      "cycles.transmission_bounces",
+                      "cycles.volume_bounces",
+                      "cycles.caustics_reflective",
+                      "cycles.caustics_refractive",
+                      "eevee.taa_render_samples"]
+
+    def __init__(self):
+        super(CDeferredRender, self).__init__()
+
+    @staticmethod
+    def capture_scene_settings():
+        """ capture current scene settings, which are needed to render a pass
+        Args:
+            None
+        Returns:
+            scene settings [dict]
+        """
+
+        _scene = bpy.context.scene
+        _settings = {}
+        for setting in CDeferredRender.SCENE_SETTINGS:
+            _path, _name = setting.rsplit('.', 1)
+            _settings[setting] = getattr(functools.reduce(getattr, _path.split('.'), _scene), _name)
+
+        _camera = _scene.camera.name if _scene.camera is not None else None
+        _switches = {}
+        _values = {}
+        _slot_paths = {}
+        for node in _scene.node_tree.nodes:
+            if 'CompositorNodeSwitch' == node.bl_idname:
+                _switches[node.name] = node.check
+            elif 'CompositorNodeValue' == node.bl_idname:
+                _values[node.name] = node.outputs[0].default_value
+            elif 'CompositorNodeOutputFile' == node.bl_idname:
+                _slot_paths[node.name] = [slot.path for slot in node.file_slots]
+
+        return {"settings": _settings, "camera": _camera, "switches": _switches, "values": _values,
+                "slotPaths": _slot_paths}
+
+    @staticmethod
+    def apply_scene_settings(scene_settings, output_path):
+        """ apply captured scene settings
+        Args:
+            scene_settings:     scene settings of capture_scene_settings [dict]
+            output_path:        folder, to which all file output nodes write [str]
+        Returns:
+            None
+        """
+
+        _scene = bpy.context.scene
+        for setting, value in scene_settings["settings"].items():
+            _path, _name = setting.rsplit('.', 1)
+            setattr(functools.reduce(getattr, _path.split('.'), _scene), _name, value)
+
+        if scene_settings["camera"] is not None:
+            _scene.camera = bpy.data.objects[scene_settings["camera"]]
+            _scene.cycles.dicing_camera = _scene.camera
+
+        for node_name, check in scene_settings["switches"].items():
+            _scene.node_tree.nodes[node_name].check = check
+        for node_name, value in scene_settings["values"].items():
+            _scene.node_tree.nodes[node_name].outputs[0].default_value = value
+        for node_name, slot_paths in scene_settings["slotPaths"].items():
+            for slot, slot_path in zip(_scene.node_tree.nodes[node_name].file_slots, slot_paths):
+                slot.path = slot_path
+
+        # the batch folder may have been moved since the build phase
+        for node in _scene.node_tree.nodes:
+            if 'CompositorNodeOutputFile' == node.bl_idname:
+                node.base_path = output_path
+
+    @staticmethod
+    def write_render_jobs(batch_folder_path, blend_file_path, render_jobs):
+        """ write render jobs of batch
+        Args:
+            batch_folder_path:  folder of batch [str]
+            blend_file_path:    path of saved .blend file of batch [str]
+            render_jobs:        render jobs, see TSSRenderPass.get_render_job [list]
+        Returns:
+            None
+        """
+
+        with open(os.path.join(batch_folder_path, CDeferredRender.RENDER_JOBS_FILE), 'w') as f:
+            json.dump({"blendFile": os.path.relpath(blend_file_path, batch_folder_path),
+                       "jobs": render_jobs}, f, indent=1)
+
+    @staticmethod
+    def write_record(record_path, record):
+        """ write record atomically; the record is written to a temporary file first and then renamed, so that a crash
+            can never leave a partial record behind
+        Args:
+            record_path:        path of record [str]
+            record:             content of record [dict]
+        Returns:
+            None
+        """
+
+        _tmp_record_path = record_path + ".tmp"
+        with open(_tmp_record_path, 'w') as f:
+            json.dump(record, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(_tmp_record_path, record_path)
+
+    def _get_work_items(self, batch_folder_paths, num_workers, frames_per_chunk):
+        """ split jobs of all batches into frame ranges; ranges are split further, so that their keyframes are evenly
+            spaced. Batches, which are complete already, are skipped.
+        Args:
+            batch_folder_paths: folders of batches [list]
+            num_workers:        number of worker processes [int]
+            frames_per_chunk:   number of frames per range; if < 1, every job is split into num_workers ranges [int]
+        Returns:
+            work items [list]; [batch folder, blend file, job, first index, last index + 1]
+        """
+
+        from src.rendering.TSSRenderPass import TSSRenderPass    # TSSRenderPass imports this module
+
+        _work_items = []
+        for batch_folder_path in batch_folder_paths:
+            if os.path.exists(os.path.join(batch_folder_path, self.BATCH_COMPLETE_RECORD)):
+                continue
+            with open(os.path.join(batch_folder_path, self.RENDER_JOBS_FILE), 'r') as f:
+                _render_jobs = json.load(f)
+            _blend_file_path = os.path.join(batch_folder_path, _render_jobs["blendFile"])
+
+            for job in _render_jobs["jobs"]:
+                _num_frames = len(job["keyframes"])
+                _chunk = frames_per_chunk
+                if _chunk < 1:
+                    _chunk = int(math.ceil(_num_frames / float(num_workers)))
+                for first_chunk_index in range(0, _num_frames, _chunk):
+                    _last_chunk_index = min(first_chunk_index + _chunk, _num_frames)
+                    _keyframes = job["keyframes"][first_chunk_index:_last_chunk_index]
+                    for first_index, last_index in TSSRenderPass.get_evenly_spaced_ranges(keyframes=_keyframes):
+                        _work_items.append([batch_folder_path, _blend_file_path, job,
+                                            first_chunk_index + first_index, first_chunk_index + last_index])
+
+        return _work_items
+
+    def _is_rendered(self, batch_folder_path, job, first_index, last_index):
+        """ check if all final files of a frame range exist
+        Args:
+            batch_folder_path:  folder of batch [str]
+            job:                render job [dict]
+            first_index:        first keyframe index of range [int]
+            last_index:         last keyframe index of range + 1 [int]
+        Returns:
+            True, if all files exist [bool]
+        """
+
+        from src.rendering.TSSRenderPass import TSSRenderPass    # TSSRenderPass imports this module
+
+        for step_index in job["stepIndices"][first_index:last_index]:
+            for output_name, file_extension in job["outputFiles"].values():
+                if not os.path.exists(TSSRenderPass.get_output_file_path(output_path=batch_folder_path,
+                                                                         sensor_name=job["sensorName"],
+                                                                         output_name=output_name,
+                                                                         file_extension=file_extension,
+                                                                         sub_render_ID=job["subRenderID"],
+                                                                         step_index=step_index)):
+                    return False
+        return True
+
+    def render(self, batch_folder_paths, worker_id=0, num_workers=1, frames_per_chunk=0):
+        """ render share of worker of all frame ranges; ranges, which are already rendered, are skipped
+        Args:
+            batch_folder_paths: folders of batches, which contain render_jobs.json [list]
+            worker_id:          id of this worker, 0 <= worker_id < num_workers [int]
+            num_workers:        number of worker processes [int]
+            frames_per_chunk:   number of frames per range; if < 1, every job is split into num_workers ranges [int]
+        Returns:
+            None
+        """
+
+        from src.rendering.TSSRenderPass import TSSRenderPass    # TSSRenderPass imports this module
+
+        _all_work_items = self._get_work_items(batch_folder_paths=batch_folder_paths,
+                                               num_workers=num_workers,
+                                               frames_per_chunk=frames_per_chunk)
+        _work_items = _all_work_items[worker_id::num_workers]
+        print("OAISYS render worker " + str(worker_id) + ": " + str(len(_work_items)) + " frame ranges")
+
+        _current_blend_file_path = None
+        for batch_folder_path, blend_file_path, job, first_index, last_index in _work_items:
+            if self._is_rendered(batch_folder_path=batch_folder_path, job=job, first_index=first_index,
+                                 last_index=last_index):
+                continue
+
+            # open file of batch; persistent render data is kept while the file is not changed
+            if blend_file_path != _current_blend_file_path:
+                bpy.ops.wm.open_mainfile(filepath=blend_file_path)
+                _current_blend_file_path = blend_file_path
+
+            # set frame range ##########################################################################################
+            _keyframes = job["keyframes"][first_index:last_index]
+            _scene = bpy.context.scene
+            _scene.frame_start = _keyframes[0]
+            _scene.frame_end = _keyframes[-1]
+            _scene.frame_step = _keyframes[1] - _keyframes[0] if len(_keyframes) > 1 else 1
+            _scene.render.use_persistent_data = True
+            ################################################################################### end of set frame range #
+
+            self.apply_scene_settings(scene_settings=job["sceneSettings"], output_path=batch_folder_path)
+
+            # render frame range
+            _render_time = TSSRenderPass.render_scene(animation=True)
+            print("OAISYS render worker " + str(worker_id) + ": " + job["passName"] + " of " + job["sensorName"] +
+                  ", frames " + str(_keyframes[0]) + "-" + str(_keyframes[-1]) + ": " + str(_render_time))
+            sys.stdout.flush()
+
+            for keyframe, step_index in zip(_keyframes, job["stepIndices"][first_index:last_index]):
+                TSSRenderPass.rename_output_files(output_path=batch_folder_path,
+                                                  sensor_name=job["sensorName"],
+                                                  output_files=job["outputFiles"],
+                                                  sub_render_ID=job["subRenderID"],
+                                                  keyframe=keyframe,
+                                                  step_index=step_index)
+
+        self._write_batch_complete_records(batch_folder_paths=batch_folder_paths, work_items=_all_work_items)
+
+    def _write_batch_complete_records(self, batch_folder_paths, work_items):
+        """ write completion record of every batch, whose frame ranges are all rendered; the ranges of other workers
+            may still be rendering, in which case the last worker writes the record
+        Args:
+            batch_folder_paths: folders of batches, which contain render_jobs.json [list]
+            work_items:         work items of all workers, see _get_work_items [list]
+        Returns:
+            None
+        """
+
+        _batch_rendered = {batch_folder_path: True for batch_folder_path in batch_folder_paths
+                           if not os.path.exists(os.path.join(batch_folder_path, self.BATCH_COMPLETE_RECORD))}
+        for batch_folder_path, _, job, first_index, last_index in work_items:
+            _batch_rendered[batch_folder_path] = _batch_rendered[batch_folder_path] and \
+                self._is_rendered(batch_folder_path=batch_folder_path, job=job, first_index=first_index,
+                                  last_index=last_index)
+
+        for batch_folder_path, rendered in _batch_rendered.items():
+            _build_record_path = os.path.join(batch_folder_path, self.BUILD_COMPLETE_RECORD)
+            if not rendered or not os.path.exists(_build_record_path):
+                continue
+            with open(_build_record_path, 'r') as f:
+                _record = json.load(f)
+            _record["renderedAt"] = datetime.now().isoformat()
+            self.write_record(record_path=os.path.join(batch_folder_path, self.BATCH_COMPLETE_RECORD), record=_record)
+
+    @staticmethod
+    def find_batch_folders(base_folder_path):
+        """ find all batch folders with render jobs in base folder
+        Args:
+            base_folder_path:   base output folder of OAISYS run, or a single batch folder [str]
+        Returns:
+            batch folders [list]
+        """
+
+        if os.path.exists(os.path.join(base_folder_path, CDeferredRender.RENDER_JOBS_FILE)):
+            return [base_folder_path]
+        return sorted(os.path.dirname(path) for path in
+                      glob.glob(os.path.join(base_folder_path, "batch_*", CDeferredRender.RENDER_JOBS_FILE)))
@@ -0,0 +1,101 @@
+# system imports
+import importlib
+import os
+import pathlib
+
+# utility imports
+import numpy as np
+
+
+class CFrameSink():
+    """ base class of sinks for frames, which are captured in memory by render passes with captureOutput
+
+        Frames are float32 arrays of shape [height, width] or [height, width, 3] in top-down row order. Colors are
+        linear, i.e. the view transform of the scene is not applied. Custom sinks derive from this class and are
+        selected with frameSink.type in RENDER_SETUP GENERAL, either by class name in this module or by full module
+        path, e.g. "my_package.my_module.CMySink".
+    """
+
+    def __init__(self, output_path, cfg):
+        super(CFrameSink, self).__init__()
+        self._output_path = output_path         # output path of batch [str]
+        self._cfg = cfg                         # cfg of sink [dict]
+
+    def write(self, sensor_name, output_name, sub_render_ID, step_index, frame):
+        """ write captured frame
+            OVERWRITE!
+        Args:
+            sensor_name:        name of sensor [str]
+            output_name:        output name of frame, e.g. <sensor>_rgb [str]
+            sub_render_ID:      sub render ID [int]
+            step_index:         global step index of frame [int]
+            frame:              captured frame [np.array]
+        Returns:
+            None
+        """
+
+        pass
+
+    def close(self):
+        """ flush and close sink; called at the end of every batch
+            OVERWRITE!
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        pass
+
+    @staticmethod
+    def create(output_path, cfg):
+        """ create sink of cfg
+        Args:
+            output_path:        output path of batch [str]
+            cfg:                cfg of sink; type is the class name of the sink [dict]
+        Returns:
+            sink [CFrameSink]
+        """
+
+        _type = cfg.get("type", "CNpyFrameSink")
+        if "." in _type:
+            _module_name, _class_name = _type.rsplit(".", 1)
+            _class = getattr(importlib.import_module(_module_name), _class_name)
+        else:
+            _class = globals()[_type]
+
+        return _class(output_path=output_path, cfg=cfg)
+
+
+class CNpyFrameSink(CFrameSink):
+    """ writes every frame as .npy file; files are named like the image files, e.g. <sensor>/0001<sensor>_rgb_00.npy """
+
+    def write(self, sensor_name, output_name, sub_render_ID, step_index, frame):
+        _sensor_path = os.path.join(self._output_path, sensor_name)
+        pathlib.Path(_sensor_path).mkdir(parents=True, exist_ok=True)
+        np.save(os.path.join(_sensor_path, "{:04d}".format(step_index) + output_name + "_" +
+                             "{:02d}".format(sub_render_ID) + ".npy"), frame)
+
+
+class CHDF5FrameSink(CFrameSink):
+    """ writes all frames of a batch to <batch>/frames.hdf5; datasets are named
+        <sensor>/<step index>/<output name>_<sub render ID>. Requires h5py; cfg entry compression (e.g. "gzip" or
+        "lzf") is passed to h5py
+    """
+
+    def __init__(self, output_path, cfg):
+        super(CHDF5FrameSink, self).__init__(output_path=output_path, cfg=cfg)
+
+        try:
+            import h5py
+        except ImportError:
+            raise Exception("CHDF5FrameSink requires h5py, which is not installed in the python of blender!")
+
+        self._file = h5py.File(os.path.join(self._output_path, cfg.get("fileName", "frames.hdf5")), 'w')
+
+    def write(self, sensor_name, output_name, sub_render_ID, step_index, frame):
+        _name = sensor_name + "/" + "{:04d}".format(step_index) + "/" + output_name + "_" + "{:02d}".format(sub_render_ID)
+        self._file.create_dataset(_name, data=frame, compression=self._cfg.get("compression", None))
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,192 @@
+# blender imports
+import bpy
+
+# system imports
+import collections
+import os
+import time
+
+
+class CImageCache():
+    """ process-wide cache of image data-blocks, e.g. the texture maps of materials and the HDRIs of the environment
+
+        Images are loaded once per file and kept alive with a fake user, so that they survive the removal of the
+        materials and nodes, which use them. With sceneResetMode "inPlace", the cached images are not purged between
+        batches (see CSceneReset.restore), i.e. decoded images are reused by all following batches. With "reopen", the
+        start file frees all images, so that images are only shared within a batch.
+        The estimated memory of all cached images is capped by maxMemory; least recently used images, which are not in
+        use anymore, are removed first.
+    """
+
+    DEFAULT_SETTINGS = {"maxMemory": 4*1024**3}
+
+    _entries = collections.OrderedDict()    # cached images in LRU order; (abs path, colorspace) -> entry [OrderedDict]
+    _settings = dict(DEFAULT_SETTINGS)      # cache settings; maxMemory in bytes [dict]
+    _memory = 0                             # estimated memory of all cached images in bytes [int]
+    _stats = {"hits": 0, "misses": 0, "evictions": 0, "loadTime": 0.0, "savedTime": 0.0}   # statistics [dict]
+
+    def __init__(self):
+        super(CImageCache, self).__init__()
+
+    @classmethod
+    def configure(cls, settings):
+        """ set cache settings
+        Args:
+            settings:               settings; maxMemory in bytes [dict]
+        Returns:
+            None
+        """
+
+        cls._settings = {**cls._settings, **settings}
+
+    @classmethod
+    def reset_settings(cls):
+        """ restore default settings and statistics, e.g. before the next job of a worker; cached images are kept
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        cls._settings = dict(cls.DEFAULT_SETTINGS)
+        cls._stats = {"hits": 0, "misses": 0, "evictions": 0, "loadTime": 0.0, "savedTime": 0.0}
+
+    @staticmethod
+    def _get_image_memory(image):
+        """ estimate memory of decoded image
+        Args:
+            image:                  image [bpy.types.Image]
+        Returns:
+            memory in bytes [int]
+        """
+
+        _bytes_per_channel = 4 if image.is_float else 1
+        return image.size[0] * image.size[1] * image.channels * _bytes_per_channel
+
+    @classmethod
+    def _get_image(cls, entry):
+        """ get image of cache entry, if it still exists
+        Args:
+            entry:                  cache entry [dict]
+        Returns:
+            image [bpy.types.Image] or None
+        """
+
+        _image = bpy.data.images.get(entry["name"])
+        if _image is None or _image.as_pointer() != entry["pointer"]:
+            return None
+        return _image
+
+    @classmethod
+    def load(cls, file_path, colorspace=None):
+        """ load image or get it from cache; cached images must not be modified by the caller
+        Args:
+            file_path:              path of image file [str]
+            colorspace:             colorspace of image, e.g. 'Non-Color'; if None, the default of blender is used. It
+                                    is set before the image is decoded, changing it afterwards decodes the image
+                                    again [str]
+        Returns:
+            image [bpy.types.Image]
+        """
+
+        _key = (os.path.abspath(file_path), colorspace)
+        _mtime = os.path.getmtime(_key[0])
+
+        _entry = cls._entries.get(_key)
+        if _entry is not None:
+            _image = cls._get_image(_entry)
+            if _image is not None and _entry["mtime"] == _mtime:
+                cls._entries.move_to_end(_key)
+                cls._stats["hits"] += 1
+                cls._stats["savedTime"] += _entry["loadTime"]
+                return _image
+            cls._remove_entry(key=_key)
+
+        # load image; the size is queried, so that the image is decoded now and the load time is measured
+        _time_1 = time.perf_counter()
+        _image = bpy.data.images.load(_key[0], check_existing=False)
+        if colorspace is not None:
+            _image.colorspace_settings.name = colorspace
+        _memory = cls._get_image_memory(_image)
+        _time_2 = time.perf_counter()
+        _image.use_fake_user = True
+
+        cls._entries[_key] = {"name": _image.name, "pointer": _image.as_pointer(), "mtime": _mtime,
+                              "memory": _memory, "loadTime": _time_2 - _time_1}
+        cls._memory += _memory
+        cls._stats["misses"] += 1
+        cls._stats["loadTime"] += _time_2 - _time_1
+
+        cls._evict()
+
+        return _image
+
+    @classmethod
+    def _remove_entry(cls, key):
+        """ remove entry from cache and its image from blender, if it still exists
+        Args:
+            key:                    key of entry; (abs path of image file, colorspace) [tuple]
+        Returns:
+            None
+        """
+
+        _entry = cls._entries.pop(key)
+        cls._memory -= _entry["memory"]
+        _image = cls._get_image(_entry)
+        if _image is not None:
+            bpy.data.images.remove(_image)
+
+    @classmethod
+    def _evict(cls):
+        """ remove least recently used images, which are not in use, until memory is below maxMemory
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        for key in list(cls._entries.keys()):
+            if cls._memory <= cls._settings["maxMemory"]:
+                break
+
+            _image = cls._get_image(cls._entries[key])
+
+            # the fake user is the only user of images, which are not used anymore
+            if _image is None or _image.users <= 1:
+                cls._remove_entry(key=key)
+                cls._stats["evictions"] += 1
+
+    @classmethod
+    def invalidate(cls):
+        """ forget all cached images, e.g. after a new blender file was opened, which freed all images
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        cls._entries = collections.OrderedDict()
+        cls._memory = 0
+
+    @classmethod
+    def get_pointers(cls):
+        """ get pointers of all cached images, which are kept by CSceneReset
+        Args:
+            None
+        Returns:
+            pointers [set]
+        """
+
+        return {entry["pointer"] for entry in cls._entries.values()}
+
+    @classmethod
+    def get_stats(cls):
+        return {**cls._stats, "images": len(cls._entries), "memory": cls._memory}
+
+    @classmethod
+    def get_summary(cls):
+        _stats = cls.get_stats()
+        return "image cache: {} hits, {} misses, {} evictions, {} images ({:.1f} MB), load time {:.2f} sec, " \
+               "saved load time {:.2f} sec".format(_stats["hits"], _stats["misses"], _stats["evictions"],
+                                                   _stats["images"], _stats["memory"] / 1024.0**2,
+                                                   _stats["loadTime"], _stats["savedTime"])
@@ -0,0 +1,137 @@
+# NOTE: this module is imported by TSSBase; it must not import blender modules
+
+
+class CKeyframeBuffer():
+    """ process-wide buffer of keyframes, e.g. the poses of the sensors and objects and the pass values of sockets
+
+        Instead of inserting every keyframe with keyframe_insert and setting the interpolation of all keyframe points of
+        the fcurve afterwards, the values are buffered during the batch. flush writes all buffered keyframes with one
+        keyframe_points.add and one foreach_set per fcurve; all written keyframes are constant. Buffered values are not
+        part of the animation until the buffer is flushed, i.e. the buffer has to be flushed at the end of each batch,
+        before the batch is rendered as animation or saved, and before any buffered data-block is removed.
+    """
+
+    CONSTANT_INTERPOLATION = 0      # enum value of 'CONSTANT' interpolation of keyframe points [int]
+
+    _entries = {}                   # buffered keyframes; (pointer of data-block, data path) -> entry [dict]
+    _stats = {"buffered": 0, "written": 0, "fcurves": 0}   # statistics [dict]
+
+    def __init__(self):
+        super(CKeyframeBuffer, self).__init__()
+
+    @classmethod
+    def insert(cls, data, data_path, frame):
+        """ buffer keyframe with the current value of property; replaces keyframe insert of data
+        Args:
+            data:           struct, which holds the property, e.g. object or node socket [bpy_struct]
+            data_path:      path to property relative to data, e.g. 'location' or 'default_value' [str]
+            frame:          frame of keyframe [int]
+        Returns:
+            None
+        """
+
+        _id_data = data.id_data
+        _data_path = data.path_from_id(data_path)
+        _key = (_id_data.as_pointer(), _data_path)
+
+        _value = getattr(data, data_path)
+        _value = tuple(_value) if hasattr(_value, '__len__') else (_value,)
+
+        _entry = cls._entries.get(_key)
+        if _entry is None:
+            _entry = {"idData": _id_data, "dataPath": _data_path, "keys": {}}
+            cls._entries[_key] = _entry
+
+        # later values of the same frame replace earlier ones, like keyframe_insert does
+        _entry["keys"][float(frame)] = _value
+        cls._stats["buffered"] += 1
+
+    @classmethod
+    def _get_fcurve(cls, id_data, data_path, index, frame):
+        """ get fcurve of property; if it does not exist yet, a keyframe is inserted, so that blender creates the
+            action and fcurve
+        Args:
+            id_data:        data-block, which holds the animation [bpy.types.ID]
+            data_path:      path to property relative to id_data [str]
+            index:          array index of property [int]
+            frame:          frame of inserted keyframe [float]
+        Returns:
+            fcurve [bpy.types.FCurve]
+        """
+
+        if id_data.animation_data is not None and id_data.animation_data.action is not None:
+            _fcurve = id_data.animation_data.action.fcurves.find(data_path, index=index)
+            if _fcurve is not None:
+                return _fcurve
+
+        id_data.keyframe_insert(data_path, index=index, frame=frame)
+        return id_data.animation_data.action.fcurves.find(data_path, index=index)
+
+    @classmethod
+    def flush(cls):
+        """ write all buffered keyframes to their fcurves and clear buffer; existing keyframes of the same frames are
+            replaced
+        Args:
+            None
+        Returns:
+            number of written keyframes [int]
+        """
+
+        _num_written = 0
+        for entry in cls._entries.values():
+            _frames = sorted(entry["keys"].keys())
+            for index in range(len(entry["keys"][_frames[0]])):
+                _fcurve = cls._get_fcurve(id_data=entry["idData"], data_path=entry["dataPath"], index=index,
+                                          frame=_frames[0])
+                _keyframe_points = _fcurve.keyframe_points
+
+                # read existing keyframes ##############################################################################
+                _num_points = len(_keyframe_points)
+                _co = [0.0] * (2 * _num_points)
+                _keyframe_points.foreach_get("co", _co)
+                _point_indices = {_co[2 * point_idx]: point_idx for point_idx in range(_num_points)}
+                ####################################################################### end of read existing keyframes #
+
+                # add keyframes of new frames ##########################################################################
+                _new_frames = [frame for frame in _frames if frame not in _point_indices]
+                if _new_frames:
+                    _keyframe_points.add(len(_new_frames))
+                    for new_idx, frame in enumerate(_new_frames):
+                        _point_indices[frame] = _num_points + new_idx
+                    _co.extend([0.0] * (2 * len(_new_frames)))
+                    _num_points += len(_new_frames)
+                ################################################################### end of add keyframes of new frames #
+
+                # write values and interpolation of all keyframes ######################################################
+                for frame in _frames:
+                    _point_idx = _point_indices[frame]
+                    _co[2 * _point_idx] = frame
+                    _co[2 * _point_idx + 1] = entry["keys"][frame][index]
+                _keyframe_points.foreach_set("co", _co)
+                _keyframe_points.foreach_set("interpolation", [cls.CONSTANT_INTERPOLATION] * _num_points)
+                _fcurve.update()
+                ############################################### end of write values and interpolation of all keyframes #
+
+                _num_written += len(_frames)
+                cls._stats["fcurves"] += 1
+
+        cls._stats["written"] += _num_written
+        cls._entries = {}
+
+        return _num_written
+
+    @classmethod
+    def clear(cls):
+        """ discard all buffered keyframes
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        cls._entries = {}
+
+    @classmethod
+    def get_summary(cls):
+        return "keyframe buffer: {} buffered, {} written keyframes in {} fcurve writes".format(
+                                                cls._stats["buffered"], cls._stats["written"], cls._stats["fcurves"])
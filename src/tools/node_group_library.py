@@ -0,0 +1,127 @@
+# blender imports
+import bpy
+
+# system imports
+import hashlib
+import inspect
+import json
+import os
+
+
+class CNodeGroupLibrary():
+    """ library of prebuilt node groups, e.g. the tiling and mapping groups of the terrain and asteroid materials
+
+        Every node group is identified by a key, which is the hash of the build function (name and source code), its
+        parameters and LIBRARY_VERSION. A node group is only built once per key:
+            - within a process, the group is reused by all materials, which request the same key
+            - if a library folder is set (nodeGroupLibrary.path in SIMULATION_SETUP), every built group is compiled to
+              <path>/v<LIBRARY_VERSION>_blender<version>/<key>.blend and linked from there in all following batches
+              and runs; the materials only set the inputs of the group nodes
+        Changing the build function or its parameters results in a new key, i.e. outdated groups are never used.
+        Linked groups are referenced by the saved .blend files of the batches, so the library has to be accessible,
+        wherever these files are opened (e.g. by the workers of the "deferred" render mode).
+    """
+
+    LIBRARY_VERSION = 1
+
+    _library_path = None            # versioned library folder; None, if groups are not stored [str]
+    _stats = {"built": 0, "linked": 0, "reused": 0}     # statistics [dict]
+
+    def __init__(self):
+        super(CNodeGroupLibrary, self).__init__()
+
+    @classmethod
+    def configure(cls, settings):
+        """ set library folder
+        Args:
+            settings:           settings; path of library [dict]
+        Returns:
+            None
+        """
+
+        _path = settings["path"]
+        if not os.path.isabs(_path):
+            _path = os.path.join(os.path.dirname(__file__), "../../", _path)
+        _blender_version = "{}.{}".format(*bpy.app.version[:2])
+        cls._library_path = os.path.join(os.path.abspath(_path), "v" + str(cls.LIBRARY_VERSION) + "_blender" +
+                                         _blender_version)
+        os.makedirs(cls._library_path, exist_ok=True)
+
+    @classmethod
+    def reset_settings(cls):
+        """ unset library folder and reset statistics, e.g. before the next job of a worker
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        cls._library_path = None
+        cls._stats = {"built": 0, "linked": 0, "reused": 0}
+
+    @classmethod
+    def get_key(cls, build_function, params):
+        """ get key of node group
+        Args:
+            build_function:     function, which builds the node group [function]
+            params:             json serializable parameters of build function [dict]
+        Returns:
+            key [str]
+        """
+
+        _hash = hashlib.sha1()
+        _hash.update(str(cls.LIBRARY_VERSION).encode())
+        _hash.update(build_function.__qualname__.encode())
+        _hash.update(inspect.getsource(build_function).encode())
+        _hash.update(json.dumps(params, sort_keys=True).encode())
+        return "oaisys_" + build_function.__name__.strip("_") + "_" + _hash.hexdigest()[:16]
+
+    @classmethod
+    def get(cls, build_function, params):
+        """ get node group; the group is reused, linked from the library or built and stored in the library
+        Args:
+            build_function:     function, which builds the node group with params as keyword arguments and returns
+                                it [function]
+            params:             json serializable parameters of build function [dict]
+        Returns:
+            node group [bpy.types.NodeTree]
+        """
+
+        _key = cls.get_key(build_function=build_function, params=params)
+
+        # reuse node group of previous material ########################################################################
+        if _key in bpy.data.node_groups:
+            cls._stats["reused"] += 1
+            return bpy.data.node_groups[_key]
+        ################################################################# end of reuse node group of previous material #
+
+        # link node group from library #################################################################################
+        if cls._library_path is not None:
+            _file_path = os.path.join(cls._library_path, _key + ".blend")
+            if os.path.isfile(_file_path):
+                with bpy.data.libraries.load(_file_path, link=True) as (data_from, data_to):
+                    data_to.node_groups = [name for name in data_from.node_groups if name == _key]
+                if data_to.node_groups:
+                    cls._stats["linked"] += 1
+                    return data_to.node_groups[0]
+        ########################################################################## end of link node group from library #
+
+        # build node group #############################################################################################
+        _node_group = build_function(**params)
+        _node_group.name = _key
+        cls._stats["built"] += 1
+
+        if cls._library_path is not None:
+            # write to temporary file first, since other processes may link the group at the same time
+            _file_path = os.path.join(cls._library_path, _key + ".blend")
+            _tmp_file_path = _file_path + "." + str(os.getpid()) + ".tmp"
+            bpy.data.libraries.write(_tmp_file_path, {_node_group}, fake_user=True)
+            os.replace(_tmp_file_path, _file_path)
+        ###################################################################################### end of build node group #
+
+        return _node_group
+
+    @classmethod
+    def get_summary(cls):
+        return "node group library: {} built, {} linked, {} reused".format(cls._stats["built"], cls._stats["linked"],
+                                                                            cls._stats["reused"])
@@ -0,0 +1,186 @@
+# blender imports
+import bpy
+
+# system imports
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# utility imports
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+from src.rendering.TSSRenderPass import TSSRenderPass
+
+
+class COutputFormatBenchmark():
+    """ benchmark for output formats of render passes (cfg entries imageFormat, depthFormat and labelFormat)
+
+        Rendered images, e.g. all outputs of a sensor of a batch, are written with every format and the file size and
+        write time are reported per sample. Images are grouped into samples by their leading step index, like the files
+        of the tar shards; images without step index count as one sample each. Run with:
+            blender --background --python src/tools/output_format_benchmark.py -- --images <batch>/<sensor>/*
+    """
+
+    # formats, which are compared by default; see TSSRenderPass.OUTPUT_FORMAT_SETTINGS
+    DEFAULT_FORMATS = {"exr_full_none": {"fileFormat": "OPEN_EXR", "colorDepth": "32", "exrCodec": "NONE"},
+                       "exr_full_zip": {"fileFormat": "OPEN_EXR", "colorDepth": "32", "exrCodec": "ZIP"},
+                       "exr_full_piz": {"fileFormat": "OPEN_EXR", "colorDepth": "32", "exrCodec": "PIZ"},
+                       "exr_half_zip": {"fileFormat": "OPEN_EXR", "colorDepth": "16", "exrCodec": "ZIP"},
+                       "exr_half_piz": {"fileFormat": "OPEN_EXR", "colorDepth": "16", "exrCodec": "PIZ"},
+                       "exr_half_dwaa": {"fileFormat": "OPEN_EXR", "colorDepth": "16", "exrCodec": "DWAA"},
+                       "png_8_c0": {"fileFormat": "PNG", "colorDepth": "8", "compression": 0},
+                       "png_8_c15": {"fileFormat": "PNG", "colorDepth": "8", "compression": 15},
+                       "png_8_c90": {"fileFormat": "PNG", "colorDepth": "8", "compression": 90},
+                       "png_16_bw_mm": {"fileFormat": "PNG", "colorDepth": "16", "colorMode": "BW", "compression": 15,
+                                        "depthScale": 1000.0}}
+
+    def __init__(self):
+        super(COutputFormatBenchmark, self).__init__()
+
+    def _load_pixels(self, image_path):
+        """ load pixels of image
+        Args:
+            image_path:     path of image [str]
+        Returns:
+            pixels [np.array]; flat RGBA pixels, width [int], height [int]
+        """
+
+        _image = bpy.data.images.load(image_path)
+        _pixels = np.empty(len(_image.pixels), dtype=np.float32)
+        _image.pixels.foreach_get(_pixels)
+        _width, _height = _image.size
+        if _image.channels != 4:
+            _rgba = np.ones((_width * _height, 4), dtype=np.float32)
+            _rgba[:, :_image.channels] = _pixels.reshape(-1, _image.channels)
+            _pixels = _rgba.ravel()
+        bpy.data.images.remove(_image)
+
+        return _pixels, _width, _height
+
+    def _set_image_settings(self, format_cfg):
+        """ set output image settings of scene
+        Args:
+            format_cfg:     format cfg [dict]
+        Returns:
+            None
+        """
+
+        _image_settings = bpy.context.scene.render.image_settings
+        for cfg_key, setting in TSSRenderPass.OUTPUT_FORMAT_SETTINGS.items():
+            if cfg_key in format_cfg:
+                setattr(_image_settings, setting, str(format_cfg[cfg_key]) if "colorDepth" == cfg_key
+                                                  else format_cfg[cfg_key])
+
+    def _get_sample_key(self, image_path):
+        """ get key of sample of image; leading step index of file name, see TSSRenderPass.get_output_file_path
+        Args:
+            image_path:     path of image [str]
+        Returns:
+            sample key [str]
+        """
+
+        _file_name = os.path.basename(image_path)
+        if _file_name[:4].isdigit():
+            return _file_name[:4]
+        return image_path
+
+    def run(self, image_paths, formats=None, output_path=None):
+        """ write all images with all formats
+        Args:
+            image_paths:    paths of rendered images [list]
+            formats:        formats to compare; name -> format cfg; if None, DEFAULT_FORMATS are used [dict]
+            output_path:    folder for written images; if None, a temporary folder is used [str]
+        Returns:
+            results [dict]; name -> {"bytesPerSample", "writeTimePerSample", "format"}
+        """
+
+        if formats is None:
+            formats = self.DEFAULT_FORMATS
+        if output_path is None:
+            output_path = tempfile.mkdtemp(prefix="oaisys_format_benchmark_")
+
+        # data is written unprocessed
+        bpy.context.scene.view_settings.view_transform = 'Raw'
+
+        _results = {}
+        for image_idx, image_path in enumerate(image_paths):
+            _pixels, _width, _height = self._load_pixels(image_path)
+            _image = bpy.data.images.new("oaisys_format_benchmark", width=_width, height=_height, alpha=True,
+                                         float_buffer=True)
+
+            for format_name, format_cfg in formats.items():
+                self._set_image_settings(format_cfg)
+
+                # integer formats store the data scaled by depthScale, see TSSRenderPass._create_depth_scale_node
+                _scaled_pixels = _pixels
+                if "depthScale" in format_cfg and format_cfg["fileFormat"] not in ["OPEN_EXR", "HDR"]:
+                    _max_value = 65535 if '16' == str(format_cfg.get("colorDepth", '8')) else 255
+                    _scaled_pixels = _pixels * (format_cfg["depthScale"] / _max_value)
+                _image.pixels.foreach_set(_scaled_pixels)
+
+                _file_path = os.path.join(output_path, format_name + "_" + "{:04d}".format(image_idx) +
+                                          TSSRenderPass.FILE_EXTENSIONS[format_cfg["fileFormat"]])
+                _time_1 = time.perf_counter()
+                _image.save_render(filepath=_file_path, scene=bpy.context.scene)
+                _time_2 = time.perf_counter()
+
+                _result = _results.setdefault(format_name, {"bytes": 0, "writeTime": 0.0, "format": format_cfg})
+                _result["bytes"] += os.path.getsize(_file_path)
+                _result["writeTime"] += _time_2 - _time_1
+                os.remove(_file_path)
+
+            bpy.data.images.remove(_image)
+
+        _num_samples = len({self._get_sample_key(image_path) for image_path in image_paths})
+        for result in _results.values():
+            result["bytesPerSample"] = result.pop("bytes") / float(_num_samples)
+            result["writeTimePerSample"] = result.pop("writeTime") / float(_num_samples)
+
+        return _results
+
+    def get_summary_table(self, results):
+        """ create summary table of results
+        Args:
+            results:        results of run [dict]
+        Returns:
+            summary table [str]
+        """
+
+        _lines = ["{:<20} {:>16} {:>18}".format("format", "bytesPerSample", "writeTime[sec]")]
+        for format_name, result in sorted(results.items(), key=lambda item: item[1]["bytesPerSample"]):
+            _lines.append("{:<20} {:>16.0f} {:>18.4f}".format(format_name, result["bytesPerSample"],
+                                                               result["writeTimePerSample"]))
+        return '\n'.join(_lines)
+
+
+if __name__ == "__main__":
+
+    argv = sys.argv
+
+    if "--" not in argv:
+        argv = []  # as if no args are passed
+    else:
+        argv = argv[argv.index("--") + 1:]  # get all args after "--"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', nargs='+', required=True, help="rendered images, which are written with every format.")
+    parser.add_argument('--formats', default=None, help="json file with formats to compare; name -> format cfg. If not given, default formats are compared.")
+    parser.add_argument('--output', default=None, help="json file, to which the results are written.")
+    args = parser.parse_args(argv)
+
+    _formats = None
+    if args.formats is not None:
+        with open(args.formats, 'r') as f:
+            _formats = json.load(f)
+
+    benchmark = COutputFormatBenchmark()
+    results = benchmark.run(image_paths=args.images, formats=_formats)
+    print(benchmark.get_summary_table(results))
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
@@ -0,0 +1,209 @@
+# blender imports
+import bpy
+
+# system imports
+import functools
+
+# utility imports
+from src.tools.deferred_render import CDeferredRender
+
+
+class CSceneReset():
+    """ snapshot of the loaded start file, which is used to reset the scene in place between batches
+
+        Instead of reopening the start file for every batch, all data-blocks, which were created by OAISYS during a
+        batch, are purged. The data-blocks of the start file, the nodes of the compositor and world node trees and
+        their links and input values are kept and restored to the state of the snapshot. The scene settings, which are
+        changed by render passes and sensors, and the passes and AOVs of the view layers are restored as well.
+    """
+
+    # bpy.data collections, which are purged by the reset
+    DATA_COLLECTIONS = ["objects", "meshes", "materials", "node_groups", "images", "textures", "cameras", "lights",
+                        "actions", "curves", "collections", "particles", "lattices", "metaballs"]
+
+    # scene settings, which are restored by the reset, in addition to the render settings of the passes
+    SCENE_SETTINGS = CDeferredRender.SCENE_SETTINGS + ["render.resolution_percentage",
+                                                       "render.use_persistent_data",
+                                                       "frame_start",
+                                                       "frame_end",
+                                                       "frame_step"]
+
+    def __init__(self):
+        super(CSceneReset, self).__init__()
+        self._data_pointers = {}            # pointers of data-blocks of start file per collection [dict]
+        self._node_tree_states = {}         # state of compositor and world node tree [dict]
+        self._scene_animated = False        # flag if scene of start file has animation data [bool]
+        self._scene_settings = {}           # scene settings of start file [dict]
+        self._view_layer_states = {}        # enabled passes and AOVs per view layer [dict]
+
+    def _get_node_trees(self):
+        """ get node trees, which are kept as scaffolding between batches
+        Args:
+            None
+        Returns:
+            dict of node trees [dict]
+        """
+
+        _node_trees = {}
+        if bpy.context.scene.node_tree is not None:
+            _node_trees["compositor"] = bpy.context.scene.node_tree
+        if "World" in bpy.data.worlds and bpy.data.worlds["World"].node_tree is not None:
+            _node_trees["world"] = bpy.data.worlds["World"].node_tree
+        return _node_trees
+
+    def capture(self):
+        """ store state of currently loaded start file
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        # store data-blocks of start file ##############################################################################
+        self._data_pointers = {}
+        for collection_name in self.DATA_COLLECTIONS:
+            _collection = getattr(bpy.data, collection_name, None)
+            if _collection is not None:
+                self._data_pointers[collection_name] = {block.as_pointer() for block in _collection}
+        ####################################################################### end of store data-blocks of start file #
+
+        # store nodes, links and input values of node trees ############################################################
+        self._node_tree_states = {}
+        for tree_name, node_tree in self._get_node_trees().items():
+            _inputs = []
+            for node in node_tree.nodes:
+                for socket_idx, socket in enumerate(node.inputs):
+                    if hasattr(socket, "default_value"):
+                        _value = socket.default_value
+                        if hasattr(_value, "__len__"):
+                            _value = tuple(_value)
+                        _inputs.append((node.name, socket_idx, _value))
+
+            _links = [(link.from_node.name, link.from_socket.identifier, link.to_node.name, link.to_socket.identifier)
+                      for link in node_tree.links]
+
+            self._node_tree_states[tree_name] = {"nodes": {node.name for node in node_tree.nodes},
+                                                 "links": _links,
+                                                 "inputs": _inputs,
+                                                 "animated": node_tree.animation_data is not None}
+        ##################################################### end of store nodes, links and input values of node trees #
+
+        # store scene settings and passes and AOVs of view layers ######################################################
+        _scene = bpy.context.scene
+        self._scene_settings = {}
+        for setting in self.SCENE_SETTINGS:
+            _struct, _name = self._get_setting_struct(setting)
+            self._scene_settings[setting] = getattr(_struct, _name)
+
+        self._view_layer_states = {}
+        for view_layer in _scene.view_layers:
+            _passes = {prop.identifier: getattr(view_layer, prop.identifier)
+                       for prop in view_layer.bl_rna.properties if prop.identifier.startswith("use_pass_")}
+            _aovs = [(aov.name, aov.type) for aov in view_layer.aovs]
+            self._view_layer_states[view_layer.name] = {"passes": _passes, "aovs": _aovs}
+        ############################################### end of store scene settings and passes and AOVs of view layers #
+
+        self._scene_animated = _scene.animation_data is not None
+
+    @staticmethod
+    def _get_setting_struct(setting):
+        """ get struct, which holds a scene setting
+        Args:
+            setting:    path of setting relative to scene, e.g. 'render.engine' [str]
+        Returns:
+            struct and name of property [tuple]
+        """
+
+        _path = setting.split('.')
+        return functools.reduce(getattr, _path[:-1], bpy.context.scene), _path[-1]
+
+    def is_captured(self):
+        """ check if snapshot was already captured
+        Args:
+            None
+        Returns:
+            True if snapshot exists [bool]
+        """
+
+        return bool(self._data_pointers)
+
+    def restore(self, keep_pointers=None):
+        """ reset scene to captured start file state
+        Args:
+            keep_pointers:  pointers of data-blocks, which were created by OAISYS, but are kept, e.g. images of
+                            CImageCache [set]
+        Returns:
+            None
+        """
+
+        if keep_pointers is None:
+            keep_pointers = set()
+
+        # restore node trees ###########################################################################################
+        for tree_name, node_tree in self._get_node_trees().items():
+            if tree_name not in self._node_tree_states:
+                continue
+            _state = self._node_tree_states[tree_name]
+
+            # remove animation, which was added by OAISYS
+            if not _state["animated"]:
+                node_tree.animation_data_clear()
+
+            # remove nodes, which were added by OAISYS
+            for node in [node for node in node_tree.nodes if node.name not in _state["nodes"]]:
+                node_tree.nodes.remove(node)
+
+            # restore links of start file
+            node_tree.links.clear()
+            for from_node, from_socket, to_node, to_socket in _state["links"]:
+                _from_socket = [s for s in node_tree.nodes[from_node].outputs if s.identifier == from_socket]
+                _to_socket = [s for s in node_tree.nodes[to_node].inputs if s.identifier == to_socket]
+                if _from_socket and _to_socket:
+                    node_tree.links.new(_from_socket[0], _to_socket[0])
+
+            # restore input values of start file
+            for node_name, socket_idx, value in _state["inputs"]:
+                node_tree.nodes[node_name].inputs[socket_idx].default_value = value
+        #################################################################################### end of restore node trees #
+
+        # restore scene settings and passes and AOVs of view layers ####################################################
+        for setting, value in self._scene_settings.items():
+            _struct, _name = self._get_setting_struct(setting)
+            setattr(_struct, _name, value)
+
+        for view_layer in bpy.context.scene.view_layers:
+            if view_layer.name not in self._view_layer_states:
+                continue
+            _state = self._view_layer_states[view_layer.name]
+
+            for pass_name, enabled in _state["passes"].items():
+                setattr(view_layer, pass_name, enabled)
+
+            # remove AOVs, which were added by OAISYS, and re-add AOVs of start file, which were removed
+            for aov in [aov for aov in view_layer.aovs if (aov.name, aov.type) not in _state["aovs"]]:
+                view_layer.aovs.remove(aov)
+            _aov_names = {aov.name for aov in view_layer.aovs}
+            for aov_name, aov_type in _state["aovs"]:
+                if aov_name not in _aov_names:
+                    _aov = view_layer.aovs.add()
+                    _aov.name = aov_name
+                    _aov.type = aov_type
+        ############################################# end of restore scene settings and passes and AOVs of view layers #
+
+        # remove scene animation, which was added by OAISYS
+        if not self._scene_animated:
+            bpy.context.scene.animation_data_clear()
+
+        # purge data-blocks, which were created by OAISYS ##############################################################
+        # only the collected data-blocks are removed; orphans of the start file, e.g. data-blocks with zero users, are
+        # kept, since they are part of the start file
+        _purge_list = []
+        for collection_name, pointers in self._data_pointers.items():
+            _collection = getattr(bpy.data, collection_name)
+            _purge_list.extend([block for block in _collection if block.as_pointer() not in pointers and
+                                block.as_pointer() not in keep_pointers])
+        if _purge_list:
+            bpy.data.batch_remove(ids=_purge_list)
+        ####################################################### end of purge data-blocks, which were created by OAISYS #
+
+        bpy.context.scene.frame_set(1)
@@ -0,0 +1,189 @@
+# system imports
+import fnmatch
+import io
+import json
+import os
+import pathlib
+import tarfile
+
+# NOTE: this module is used by the simulator and by post_processing; it must not import blender modules
+
+
+class CTarShardWriter():
+    """ packs the files of samples into rolling, uncompressed tar shards
+
+        All files of one sample are written to the same shard; a new shard is started, once the current shard exceeds
+        max_shard_size. Next to the shards, an index (one json line per file) stores the shard, sample key, name,
+        data offset and size of every file, so that single files can be read without scanning the shards (see
+        CTarShardReader).
+    """
+
+    INDEX_FILE = "index.jsonl"
+
+    def __init__(self, shard_folder_path, max_shard_size=1024**3, shard_prefix="shard"):
+        super(CTarShardWriter, self).__init__()
+        self._shard_folder_path = shard_folder_path     # folder of shards and index [str]
+        self._max_shard_size = max_shard_size           # size in bytes, after which a new shard is started [int]
+        self._shard_prefix = shard_prefix               # prefix of shard file names [str]
+        self._shard_id = -1                             # id of current shard [int]
+        self._shard_name = None                         # file name of current shard [str]
+        self._tar_file = None                           # current shard [tarfile.TarFile]
+
+        pathlib.Path(self._shard_folder_path).mkdir(parents=True, exist_ok=True)
+        self._index_file = open(os.path.join(self._shard_folder_path, self.INDEX_FILE), 'a')
+
+    def _next_shard(self):
+        """ close current shard and open next one
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        if self._tar_file is not None:
+            self._tar_file.close()
+
+        # shards of previous runs are kept; continue after the last existing shard
+        self._shard_id += 1
+        while True:
+            self._shard_name = self._shard_prefix + "-" + "{:06d}".format(self._shard_id) + ".tar"
+            if not os.path.exists(os.path.join(self._shard_folder_path, self._shard_name)):
+                break
+            self._shard_id += 1
+        self._tar_file = tarfile.open(os.path.join(self._shard_folder_path, self._shard_name), 'w',
+                                      format=tarfile.PAX_FORMAT)
+
+    def add_sample(self, sample_key, files, remove_files=False):
+        """ add files of sample to current shard
+        Args:
+            sample_key:     key of sample, e.g. step index [str]
+            files:          files of sample; [name in shard, path of file] [list]
+            remove_files:   if True, files are removed after they are written [bool]
+        Returns:
+            None
+        """
+
+        if self._tar_file is None or self._tar_file.offset >= self._max_shard_size:
+            self._next_shard()
+
+        for name, file_path in files:
+            _tar_info = self._tar_file.gettarinfo(name=file_path, arcname=name)
+            _header_offset = self._tar_file.offset
+            with open(file_path, 'rb') as f:
+                self._tar_file.addfile(_tar_info, fileobj=f)
+
+            _data_offset = _header_offset + len(_tar_info.tobuf(self._tar_file.format, self._tar_file.encoding,
+                                                                self._tar_file.errors))
+            self._index_file.write(json.dumps({"shard": self._shard_name, "sample": sample_key, "name": name,
+                                               "offset": _data_offset, "size": _tar_info.size}) + "\n")
+
+        self._tar_file.fileobj.flush()
+        self._index_file.flush()
+
+        if remove_files:
+            for _, file_path in files:
+                os.remove(file_path)
+
+    def close(self):
+        """ finish current shard and index
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        if self._tar_file is not None:
+            self._tar_file.close()
+            self._tar_file = None
+        self._index_file.close()
+
+
+class CTarShardReader():
+    """ random access to files of tar shards via the index of CTarShardWriter """
+
+    def __init__(self, shard_folder_path):
+        super(CTarShardReader, self).__init__()
+        self._shard_folder_path = shard_folder_path     # folder of shards and index [str]
+        self._entries = {}                              # name -> index entry [dict]
+
+        with open(os.path.join(self._shard_folder_path, CTarShardWriter.INDEX_FILE), 'r') as f:
+            for line in f:
+                _entry = json.loads(line)
+                self._entries[_entry["name"]] = _entry
+
+    def get_names(self, pattern="*"):
+        """ get names of all files, which match pattern
+        Args:
+            pattern:        fnmatch pattern, e.g. "rgbLeft/*rgb_00.png" [str]
+        Returns:
+            names [list]
+        """
+
+        return sorted(fnmatch.filter(self._entries.keys(), pattern))
+
+    def get_samples(self):
+        """ get files of all samples
+        Args:
+            None
+        Returns:
+            samples [dict]; sample key -> names [list]
+        """
+
+        _samples = {}
+        for name, entry in self._entries.items():
+            _samples.setdefault(entry["sample"], []).append(name)
+        return _samples
+
+    def read(self, name):
+        """ read single file
+        Args:
+            name:           name of file in shard [str]
+        Returns:
+            content of file [bytes]
+        """
+
+        _entry = self._entries[name]
+        with open(os.path.join(self._shard_folder_path, _entry["shard"]), 'rb') as f:
+            f.seek(_entry["offset"])
+            return f.read(_entry["size"])
+
+    def open(self, name):
+        return io.BytesIO(self.read(name))
+
+
+# files and folders of a batch, which are not packed; they are read by the simulator itself
+UNPACKED_BATCH_FILES = ["batch_complete.json", "build_complete.json", "render_jobs.json", "blender_file", "shards"]
+
+
+def pack_batch_folder(batch_folder_path, max_shard_size=1024**3, remove_files=False):
+    """ pack all files of an existing batch folder into shards in <batch>/shards; the files in the sensor folders are
+        grouped into samples by their leading step index, all other files (e.g. meta data) form the sample "meta".
+        Files and folders of UNPACKED_BATCH_FILES are skipped
+    Args:
+        batch_folder_path:  folder of batch [str]
+        max_shard_size:     size in bytes, after which a new shard is started [int]
+        remove_files:       if True, packed files are removed [bool]
+    Returns:
+        number of packed files [int]
+    """
+
+    _shard_folder_path = os.path.join(batch_folder_path, "shards")
+    _samples = {}
+    for root, folder_names, file_names in os.walk(batch_folder_path):
+        if os.path.samefile(root, batch_folder_path):
+            folder_names[:] = [name for name in folder_names if name not in UNPACKED_BATCH_FILES]
+            file_names = [name for name in file_names if name not in UNPACKED_BATCH_FILES]
+        for file_name in file_names:
+            _file_path = os.path.join(root, file_name)
+            _name = os.path.relpath(_file_path, batch_folder_path).replace(os.sep, "/")
+            _sample_key = "meta"
+            if 2 == len(_name.split("/")) and file_name[:4].isdigit():
+                _sample_key = file_name[:4]
+            _samples.setdefault(_sample_key, []).append([_name, _file_path])
+
+    _writer = CTarShardWriter(shard_folder_path=_shard_folder_path, max_shard_size=max_shard_size)
+    for sample_key in sorted(_samples.keys()):
+        _writer.add_sample(sample_key=sample_key, files=sorted(_samples[sample_key]), remove_files=remove_files)
+    _writer.close()
+
+    return sum(len(files) for files in _samples.values())
@@ -0,0 +1,115 @@
+# system imports
+import json
+import os
+
+# NOTE: this module must not import blender modules
+
+
+class CTextureIndex():
+    """ process-wide index of the map files of texture sets, used instead of listing the texture folder for every map
+
+        A texture set is a folder with map files, e.g. <library>/Ground037/Ground037_2K_Color.jpg. The file names of
+        all sets of a library are stored in <library>/oaisys_texture_index.json together with the modification time of
+        the set folder. A set is only listed again, if its folder was changed (files added, removed or renamed) or if it
+        is not indexed yet. Within one process, every set is checked once; afterwards, lookups are served from memory.
+        If the library is read-only, the index is only kept in memory.
+    """
+
+    INDEX_FILE = "oaisys_texture_index.json"
+
+    _libraries = {}                 # loaded indices; library path -> {set name: {"mtime", "files"}} [dict]
+    _checked_sets = set()           # set folders, which were validated in this process [set]
+
+    def __init__(self):
+        super(CTextureIndex, self).__init__()
+
+    @classmethod
+    def _load_library(cls, library_path):
+        """ load index file of library
+        Args:
+            library_path:   folder of texture library [str]
+        Returns:
+            index of library [dict]
+        """
+
+        if library_path not in cls._libraries:
+            _index = {}
+            try:
+                with open(os.path.join(library_path, cls.INDEX_FILE), 'r') as f:
+                    _index = json.load(f)
+            except (OSError, ValueError):
+                pass
+            cls._libraries[library_path] = _index
+
+        return cls._libraries[library_path]
+
+    @classmethod
+    def _save_library(cls, library_path):
+        """ write index file of library; the file is replaced atomically, since several processes may share a library
+        Args:
+            library_path:   folder of texture library [str]
+        Returns:
+            None
+        """
+
+        _index_path = os.path.join(library_path, cls.INDEX_FILE)
+        _tmp_path = _index_path + "." + str(os.getpid()) + ".tmp"
+        try:
+            with open(_tmp_path, 'w') as f:
+                json.dump(cls._libraries[library_path], f)
+            os.replace(_tmp_path, _index_path)
+        except OSError:
+            pass
+
+    @classmethod
+    def get_files(cls, set_path):
+        """ get file names of texture set
+        Args:
+            set_path:       folder of texture set [str]
+        Returns:
+            file names in the order of os.listdir [list]
+        """
+
+        _set_path = os.path.normpath(os.path.abspath(set_path))
+        _library_path, _set_name = os.path.split(_set_path)
+        _index = cls._load_library(_library_path)
+
+        if _set_path not in cls._checked_sets:
+            _mtime = os.path.getmtime(_set_path)
+            if _set_name not in _index or _index[_set_name]["mtime"] != _mtime:
+                _index[_set_name] = {"mtime": _mtime, "files": os.listdir(_set_path)}
+                cls._save_library(_library_path)
+            cls._checked_sets.add(_set_path)
+
+        return _index[_set_name]["files"]
+
+    @classmethod
+    def find(cls, set_path, prefix, return_complete_list=False):
+        """ find map files of texture set
+        Args:
+            set_path:               folder of texture set [str]
+            prefix:                 keyword, which has to be part of the file name [str]
+            return_complete_list:   return all found files with prefix or only the first one [bool]
+        Returns:
+            path to file [str] or paths to files [list]; None, if no file was found
+        """
+
+        _map_files = [file_name for file_name in cls.get_files(set_path) if prefix in file_name]
+        if not _map_files:
+            return None
+
+        if return_complete_list:
+            return [os.path.join(set_path, file_name) for file_name in _map_files]
+        return os.path.join(set_path, _map_files[0])
+
+    @classmethod
+    def invalidate(cls):
+        """ validate all texture sets again on next lookup, e.g. after the library was changed during a run
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        cls._libraries = {}
+        cls._checked_sets = set()
@@ -0,0 +1,214 @@
+# blender imports
+import bpy
+
+# system imports
+import argparse
+import json
+import math
+import os
+import sys
+
+
+class CTextureMipCache():
+    """ downscaled copies (mip levels) of textures and HDRIs, from which the smallest sufficient level is loaded
+
+        The levels are created once with this tool:
+            blender --background --python src/tools/texture_mip_cache.py -- --folders <texture library> <hdri folder>
+        For every image <folder>/<name><ext>, the levels are written to <folder>/oaisys_mips/<name>_<factor>x<ext>,
+        together with an index mips.json, which stores the size and modification time of the original images.
+
+        While rendering, the loader picks the smallest level, which still has at least one texel per pixel at the
+        closest camera distance. The pixel footprint at distance d is d / f, with f the largest focal length in pixels
+        of all sensors. A texture, which repeats every textureExtent meters, therefore needs textureExtent * f / d
+        texels; a full environment map needs 2 * pi * f texels horizontally, independent of the distance. Images
+        without levels, outdated levels and textures without textureExtent are loaded in full resolution.
+    """
+
+    LEVELS = [2, 4, 8]
+    MIP_FOLDER = "oaisys_mips"
+    INDEX_FILE = "mips.json"
+    IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".tif", ".tiff", ".exr", ".hdr", ".tga", ".bmp"]
+
+    _settings = None                # selection settings; None, if mip levels are not used [dict]
+    _indices = {}                   # loaded indices; mip folder -> index [dict]
+
+    def __init__(self):
+        super(CTextureMipCache, self).__init__()
+
+    @classmethod
+    def configure(cls, settings, sensor_cfgs):
+        """ enable selection of mip levels
+        Args:
+            settings:       settings; distanceRange [min, max] of the cameras in meters and optionally focalLength in
+                            pixels, which overwrites the focal length of the sensors [dict]
+            sensor_cfgs:    cfgs of sensors of SENSOR_SETUP; the largest focal length of their KMatrix is used [list]
+        Returns:
+            None
+        """
+
+        _focal_length = settings.get("focalLength", None)
+        if _focal_length is None:
+            _focal_length = 0.0
+            for sensor_cfg in sensor_cfgs:
+                if "KMatrix" in sensor_cfg.get("sensorParams", {}):
+                    _k_mat = sensor_cfg["sensorParams"]["KMatrix"]
+                    _focal_length = max(_focal_length, _k_mat[0], _k_mat[4])
+        if _focal_length <= 0.0:
+            raise Exception("textureMipCache: no focal length found in sensors, please set focalLength!")
+
+        cls._settings = {"focalLength": _focal_length, "minDistance": settings["distanceRange"][0]}
+
+    @classmethod
+    def reset_settings(cls):
+        """ disable selection of mip levels, e.g. before the next job of a worker
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        cls._settings = None
+
+    @classmethod
+    def _get_index(cls, mip_folder_path):
+        """ load index of mip folder
+        Args:
+            mip_folder_path:    mip folder [str]
+        Returns:
+            index [dict]; file name -> {"mtime", "size", "levels"}
+        """
+
+        if mip_folder_path not in cls._indices:
+            _index = {}
+            try:
+                with open(os.path.join(mip_folder_path, cls.INDEX_FILE), 'r') as f:
+                    _index = json.load(f)
+            except (OSError, ValueError):
+                pass
+            cls._indices[mip_folder_path] = _index
+
+        return cls._indices[mip_folder_path]
+
+    @classmethod
+    def get_path(cls, file_path, texture_extent=None, environment=False):
+        """ get path of smallest sufficient mip level of image
+        Args:
+            file_path:          path of original image [str]
+            texture_extent:     size in meters, after which the texture repeats on the surface [float]
+            environment:        True, if image is an environment map [bool]
+        Returns:
+            path of mip level or of original image [str]
+        """
+
+        if cls._settings is None:
+            return file_path
+
+        # texels, which are needed in horizontal direction
+        if environment:
+            _required_width = 2.0 * math.pi * cls._settings["focalLength"]
+        elif texture_extent is not None and cls._settings["minDistance"] > 0.0:
+            _required_width = texture_extent * cls._settings["focalLength"] / cls._settings["minDistance"]
+        else:
+            return file_path
+
+        _folder_path, _file_name = os.path.split(file_path)
+        _mip_folder_path = os.path.join(_folder_path, cls.MIP_FOLDER)
+        _entry = cls._get_index(_mip_folder_path).get(_file_name)
+        if _entry is None or _entry["mtime"] != os.path.getmtime(file_path):
+            return file_path
+
+        # levels are checked from the smallest to the largest one
+        for factor in sorted(_entry["levels"].keys(), key=int, reverse=True):
+            if _entry["size"][0] // int(factor) >= _required_width:
+                return os.path.join(_mip_folder_path, _entry["levels"][factor])
+
+        return file_path
+
+    @classmethod
+    def create_levels(cls, folder_path, levels=None):
+        """ create mip levels of all images in folder and its sub folders; up to date levels are skipped
+        Args:
+            folder_path:        folder with images [str]
+            levels:             downscale factors, e.g. [2, 4, 8]; if None, LEVELS are used [list]
+        Returns:
+            number of images, for which levels were created [int]
+        """
+
+        if levels is None:
+            levels = cls.LEVELS
+
+        _num_images = 0
+        for root, folder_names, file_names in os.walk(folder_path):
+            folder_names[:] = [name for name in folder_names if name != cls.MIP_FOLDER]
+            _file_names = [name for name in sorted(file_names)
+                           if os.path.splitext(name)[1].lower() in cls.IMAGE_EXTENSIONS]
+            if not _file_names:
+                continue
+
+            _mip_folder_path = os.path.join(root, cls.MIP_FOLDER)
+            _index = cls._get_index(_mip_folder_path)
+            for file_name in _file_names:
+                _file_path = os.path.join(root, file_name)
+                _entry = _index.get(file_name)
+                if _entry is not None and _entry["mtime"] == os.path.getmtime(_file_path) and \
+                        sorted(int(factor) for factor in _entry["levels"]) == sorted(levels):
+                    continue
+
+                _index[file_name] = cls._create_image_levels(file_path=_file_path, mip_folder_path=_mip_folder_path,
+                                                             levels=levels)
+                _num_images += 1
+                print("OAISYS mip cache: " + _file_path)
+
+            if _index:
+                with open(os.path.join(_mip_folder_path, cls.INDEX_FILE), 'w') as f:
+                    json.dump(_index, f, indent=1)
+
+        return _num_images
+
+    @classmethod
+    def _create_image_levels(cls, file_path, mip_folder_path, levels):
+        """ create mip levels of single image; every level is downscaled from the previous one
+        Args:
+            file_path:          path of image [str]
+            mip_folder_path:    folder, to which the levels are written [str]
+            levels:             downscale factors [list]
+        Returns:
+            index entry of image [dict]
+        """
+
+        os.makedirs(mip_folder_path, exist_ok=True)
+        _name, _ext = os.path.splitext(os.path.basename(file_path))
+
+        _image = bpy.data.images.load(file_path, check_existing=False)
+        _width, _height = _image.size
+        _levels = {}
+        for factor in sorted(levels):
+            if _width // factor < 1 or _height // factor < 1:
+                break
+            _image.scale(_width // factor, _height // factor)
+            _level_name = _name + "_" + str(factor) + "x" + _ext
+            _image.filepath_raw = os.path.join(mip_folder_path, _level_name)
+            _image.save()
+            _levels[str(factor)] = _level_name
+        bpy.data.images.remove(_image)
+
+        return {"mtime": os.path.getmtime(file_path), "size": [_width, _height], "levels": _levels}
+
+
+if __name__ == "__main__":
+
+    argv = sys.argv
+
+    if "--" not in argv:
+        argv = []  # as if no args are passed
+    else:
+        argv = argv[argv.index("--") + 1:]  # get all args after "--"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--folders', nargs='+', required=True, help="folders with textures and HDRIs; sub folders are included.")
+    parser.add_argument('--levels', nargs='+', type=int, default=None, help="downscale factors of levels, default: 2 4 8.")
+    args = parser.parse_args(argv)
+
+    for _folder_path in args.folders:
+        _num_images = CTextureMipCache.create_levels(folder_path=_folder_path, levels=args.levels)
+        print("OAISYS mip cache: created levels of " + str(_num_images) + " images in " + _folder_path)
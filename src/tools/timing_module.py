@@ -1,119 +1,247 @@
 # imports ##########################################################
+import functools
+import json
+import os
+import pathlib
 import time
-import TerrainStageSimulator.src.color_print as TCpr
-#from tabulate import tabulate
+import src.tools.color_print as TCpr
 ####################################################################
 
 # timingDict:
-#   timingDict['[self._className]_[name]'] = {minTime, maxTime, avgTime, numSamples, accumlatedTime, newTic, ticTime}
+#   timingDict['[class name].[function name]'] = {totalTime, minTime, maxTime, numCalls}
 
 ####################################################################
 class CTimingModule():
-    """docstring for CTimingModule"""
-    def __init__(self):
-        super(CTimingModule, self).__init__()
+    """ profiler for the create, step, activate_pass, render, log_step and reset_module functions of all OAISYS modules
 
-    def _initTiming(self,name):
-        self._className = name
-        self._timingDict = {}
-        self._timingTables = []
-
-    def _tic(self,name):
-        # get current time
-        now = time.time()
-
-        # build up name of key
-        keyName = self._className + '_' + name
-
-        # check if entry of key already exist
-        if keyName in self._timingDict.keys():
-            self._timingDict[keyName]['newTic'] = True
-            self._timingDict[keyName]['ticTime'] = now
-        else:
-            # new entry
-            self._timingSample = {}
-            self._timingSample['numSamples'] = 0
-            self._timingSample['newTic'] = True
-            self._timingSample['ticTime'] = now
-            self._timingDict[keyName] = self._timingSample
-
-    def _toc(self,name):
-        # get current time
-        now = time.time()
-
-        # build up name of key
-        keyName = self._className + '_' + name
-
-        # check if entry of key already exist
-        if keyName in self._timingDict.keys():
-            # check of tic was called before toc
-            if self._timingDict[keyName]['newTic']:
-                # calc delta time
-                deltaTime = now - self._timingDict[keyName]['ticTime']
-                # min time ####################################################
-                if 'minTime' in self._timingDict[keyName].keys():
-                    if deltaTime < self._timingDict[keyName]['minTime']:
-                        self._timingDict[keyName]['minTime'] = deltaTime
-                else:
-                    self._timingDict[keyName]['minTime'] = deltaTime
-                #############################################################
-
-                # max time ####################################################
-                if 'maxTime' in self._timingDict[keyName].keys():
-                    if deltaTime > self._timingDict[keyName]['maxTime']:
-                        self._timingDict[keyName]['maxTime'] = deltaTime
-                else:
-                    self._timingDict[keyName]['maxTime'] = deltaTime
-                #############################################################
-
-                # average time ####################################################
-                self._timingDict[keyName]['numSamples'] += 1
-                if 'average' in self._timingDict[keyName].keys():
-                    self._timingDict[keyName]['accumlatedTime'] += deltaTime
-                    self._timingDict[keyName]['average'] = self._timingDict[keyName]['accumlatedTime']/self._timingDict[keyName]['numSamples']
-                else:
-                    self._timingDict[keyName]['average'] = deltaTime
-                    self._timingDict[keyName]['accumlatedTime'] = deltaTime
-                #############################################################
-
-                # clean up ##################
-                self._timingDict[keyName]['newTic'] = False
-                self._timingDict[keyName]['ticTime'] = -1
-                ##################
+        Classes are registered with profile_class; registering a base class also registers every class, which is
+        instantiated from it, before its functions are called. The profiled functions only add an overhead of one
+        check, while no profiler is active. Timings are inclusive, i.e. the step time of a handle contains the step
+        time of its sub modules.
 
-            else:
-                print('ERROR: call tic before toc!')
-            
-        else:
-            print('ERROR: call tic before toc!')
+        For every batch, one json line is written per sample (plus one for setup and reset) to
+        <batch>/meta_data/profiling_data/profiling.jsonl and a summary table is printed and written to
+        <batch>/meta_data/profiling_data/profiling_summary.txt.
+    """
+
+    PROFILED_FUNCTIONS = ["create", "step", "activate_pass", "render", "log_step", "reset_module"]
 
+    _active = None                          # currently active profiler [CTimingModule]
+
+    def __init__(self):
+        super(CTimingModule, self).__init__()
+        self._batch_id = None               # id of current batch [int]
+        self._log_folder_path = None        # folder of profiling data of current batch [str]
+        self._sample = None                 # name of current sample [int or str]
+        self._sample_start = None           # start time of current sample [float]
+        self._sample_dict = {}              # timings of current sample [dict]
+        self._batch_dict = {}               # timings of current batch, see timingDict above [dict]
+        self._batch_time = 0.0              # accumulated sample time of current batch [float]
+        self._running_calls = set()         # calls which are currently timed [set]
+
+    @classmethod
+    def profile_class(cls, profiled_class):
+        """ wrap profiled functions of class and of its base classes
+        Args:
+            profiled_class:     class to profile [class]
+        Returns:
+            None
+        """
+
+        for _class in profiled_class.__mro__:
+            if _class is object or _class.__dict__.get("_oaisys_profiled_class") is _class:
+                continue
+
+            for func_name in cls.PROFILED_FUNCTIONS:
+                _func = _class.__dict__.get(func_name)
+                if callable(_func):
+                    setattr(_class, func_name, cls._wrap_function(func=_func, func_name=func_name))
+
+            # register classes derived from this class, once they are instantiated
+            _init = _class.__dict__.get("__init__")
+            if callable(_init):
+                setattr(_class, "__init__", cls._wrap_init(func=_init))
+
+            _class._oaisys_profiled_class = _class
+
+    @classmethod
+    def _wrap_function(cls, func, func_name):
+        @functools.wraps(func)
+        def _profiled_function(obj, *args, **kwargs):
+            if cls._active is None:
+                return func(obj, *args, **kwargs)
+            return cls._active._time_call(obj, func_name, func, args, kwargs)
+        return _profiled_function
+
+    @classmethod
+    def _wrap_init(cls, func):
+        @functools.wraps(func)
+        def _profiled_init(obj, *args, **kwargs):
+            cls.profile_class(type(obj))
+            return func(obj, *args, **kwargs)
+        return _profiled_init
+
+    def enable(self):
+        CTimingModule._active = self
+
+    def disable(self):
+        # profiled functions are only timed by one profiler at a time
+        CTimingModule._active = None
+
+    @classmethod
+    def disable_all(cls):
+        """ disable active profiler, e.g. after a run, which raised before its profiler was disabled
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        cls._active = None
+
+    def is_enabled(self):
+        return CTimingModule._active is self
+
+    def _time_call(self, obj, func_name, func, args, kwargs):
+        """ time single call of a profiled function
+        Args:
+            obj:                object of call [object]
+            func_name:          name of profiled function [str]
+            func:               original function [function]
+            args:               positional arguments of call [tuple]
+            kwargs:             keyword arguments of call [dict]
+        Returns:
+            return value of func
+        """
+
+        # calls of overwritten functions via super() are part of the outer call
+        _call_key = (id(obj), func_name)
+        if _call_key in self._running_calls:
+            return func(obj, *args, **kwargs)
+
+        self._running_calls.add(_call_key)
+        _tic = time.perf_counter()
+        try:
+            return func(obj, *args, **kwargs)
+        finally:
+            _delta_time = time.perf_counter() - _tic
+            self._running_calls.discard(_call_key)
+            _key_name = type(obj).__name__ + '.' + func_name
+            _entry = self._sample_dict.setdefault(_key_name, {'time': 0.0, 'calls': 0})
+            _entry['time'] += _delta_time
+            _entry['calls'] += 1
+
+    def start_batch(self, batch_id, log_folder_path):
+        """ start profiling of new batch
+        Args:
+            batch_id:           id of batch [int]
+            log_folder_path:    folder for profiling data of batch [str]
+        Returns:
+            None
+        """
+
+        if not self.is_enabled():
+            return
+
+        self._batch_id = batch_id
+        self._log_folder_path = log_folder_path
+        self._batch_dict = {}
+        self._batch_time = 0.0
+        pathlib.Path(self._log_folder_path).mkdir(parents=True, exist_ok=True)
+
+    def start_sample(self, sample):
+        """ start profiling of new sample
+        Args:
+            sample:             sample number or name of phase, e.g. "setup" or "reset" [int or str]
+        Returns:
+            None
+        """
+
+        if not self.is_enabled():
+            return
+
+        self._sample = sample
+        self._sample_dict = {}
+        self._sample_start = time.perf_counter()
+
+    def end_sample(self):
+        """ end profiling of current sample and write json line
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        if not self.is_enabled():
+            return
+
+        _wall_time = time.perf_counter() - self._sample_start
+        self._batch_time += _wall_time
+
+        # accumulate batch timings ####################################################
+        for key_name, entry in self._sample_dict.items():
+            _call_time = entry['time'] / entry['calls']
+            if key_name in self._batch_dict:
+                _batch_entry = self._batch_dict[key_name]
+                _batch_entry['totalTime'] += entry['time']
+                _batch_entry['numCalls'] += entry['calls']
+                _batch_entry['minTime'] = min(_batch_entry['minTime'], _call_time)
+                _batch_entry['maxTime'] = max(_batch_entry['maxTime'], _call_time)
+            else:
+                self._batch_dict[key_name] = {'totalTime': entry['time'], 'numCalls': entry['calls'],
+                                              'minTime': _call_time, 'maxTime': _call_time}
+        #############################################################
+
+        _record = {'batchID': self._batch_id, 'sample': self._sample, 'wallTime': _wall_time,
+                   'timings': self._sample_dict}
+        with open(os.path.join(self._log_folder_path, "profiling.jsonl"), 'a') as f:
+            f.write(json.dumps(_record) + '\n')
+
+    def end_batch(self):
+        """ end profiling of current batch; print and write summary table
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        if not self.is_enabled():
+            return
+
+        _summary = self.get_summary_table()
+        TCpr.prOrange(_summary)
+        with open(os.path.join(self._log_folder_path, "profiling_summary.txt"), 'w') as f:
+            f.write(_summary + '\n')
 
     def get_timing(self):
-        return self._timingDict
-
-    def _add_new_timing_table(self,newTimingTable):
-        self._timingTables.append(newTimingTable)
-
-    def _print_timing_tables(self):
-        # add own timing table
-        self._timingTables.append(self._timingDict)
-
-        # header for tables
-        timingHeaders=['timingAgent', 'avgTime[sec]', 'minTime[sec]', 'maxTime[sec]', 'numSamples']
-
-        # go through timing tables and print timing information
-        TCpr.prOrange('##### Timming Tables ####################################################################\n')
-        for tableEntry in self._timingTables:
-            # go through timing agents of entry of timing table
-            tableRows = []
-            for key in tableEntry:
-                print("key: ", key)
-                print("tableEntry[key]['average']: ", tableEntry[key]['average'])
-                print("tableEntry[key]['minTime']: ", tableEntry[key]['minTime'])
-                print("tableEntry[key]['maxTime']: ", tableEntry[key]['maxTime'])
-                print("tableEntry[key]['numSamples']: ", tableEntry[key]['numSamples'])
-                #tableSingleRow = [key ,tableEntry[key]['average'], tableEntry[key]['minTime'], tableEntry[key]['maxTime'], tableEntry[key]['numSamples']]
-                #tableRows.append(tableSingleRow)
-            # print table
-            #TCpr.prOrange(tabulate(tableRows,headers=timingHeaders))
-            TCpr.prOrange('##########################################################################################\n')
\ No newline at end of file
+        return self._batch_dict
+
+    def get_summary_table(self):
+        """ create summary table of current batch; min and max times are averages per call within one sample
+        Args:
+            None
+        Returns:
+            summary table [str]
+        """
+
+        _headers = ['timingAgent', 'totalTime[sec]', 'share[%]', 'numCalls', 'avgTime[sec]', 'minTime[sec]',
+                    'maxTime[sec]']
+        _rows = []
+        for key_name, entry in sorted(self._batch_dict.items(), key=lambda item: -item[1]['totalTime']):
+            _share = 100.0 * entry['totalTime'] / self._batch_time if self._batch_time > 0 else 0.0
+            _rows.append([key_name,
+                          "{:.4f}".format(entry['totalTime']),
+                          "{:.1f}".format(_share),
+                          str(entry['numCalls']),
+                          "{:.4f}".format(entry['totalTime'] / entry['numCalls']),
+                          "{:.4f}".format(entry['minTime']),
+                          "{:.4f}".format(entry['maxTime'])])
+
+        _widths = [max([len(_headers[ii])] + [len(row[ii]) for row in _rows]) for ii in range(len(_headers))]
+        _lines = ['##### Timing Table of Batch {} ({:.2f} sec) #####'.format(self._batch_id, self._batch_time),
+                  '  '.join(header.ljust(_widths[ii]) for ii, header in enumerate(_headers)),
+                  '  '.join('-' * width for width in _widths)]
+        for row in _rows:
+            _lines.append('  '.join(value.ljust(_widths[ii]) if 0 == ii else value.rjust(_widths[ii])
+                                    for ii, value in enumerate(row)))
+        return '\n'.join(_lines)
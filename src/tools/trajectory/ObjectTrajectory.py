@@ -1,63 +1,90 @@
 import bpy
 import numpy as np
 import mathutils
+import collections
+
+
+# number of meshes, whose mass properties are cached
+MASS_PROPERTIES_CACHE_SIZE = 8
+
+# cached mass properties; pointer of mesh data-block -> mass properties
+_mass_properties_cache = collections.OrderedDict()
 
 
 def get_single_mesh_data(mesh):
     """
-    Get the vertices and faces of the single mesh object in the Blender scene.
+    Get the vertices and triangles of a mesh object. The data is read with foreach_get; polygons are split into the
+    loop triangles of the mesh.
+
+    Args:
+    =
+    - mesh (bpy.types.Object): Mesh object.
 
     Returns:
     =
-    - vertices (numpy.ndarray): Array of vertices.
-    - faces (numpy.ndarray): Array of faces.
+    - vertices (numpy.ndarray): Array of vertices, shape (N, 3).
+    - faces (numpy.ndarray): Array of triangles, shape (M, 3).
     """
-    '''
-    mesh_objects = [obj for obj in bpy.data.objects if obj.type == 'MESH']
-    print(f"get_single_mesh_data: {get_single_mesh_data}")
+    mesh_data = mesh.data
 
-    if len(mesh_objects) != 1:
-        print("Error: There should be exactly one mesh object in the scene, but there are:", len(mesh_objects))
-        return None, None
+    vertices = np.empty(len(mesh_data.vertices) * 3, dtype=np.float32)
+    mesh_data.vertices.foreach_get("co", vertices)
 
-    mesh = mesh_objects[0].data
-    '''
-    mesh_data = mesh.data
-    vertices = np.array([v.co for v in mesh_data.vertices])
-    faces = np.array([f.vertices for f in mesh_data.polygons])
+    mesh_data.calc_loop_triangles()
+    faces = np.empty(len(mesh_data.loop_triangles) * 3, dtype=np.int32)
+    mesh_data.loop_triangles.foreach_get("vertices", faces)
+
+    return vertices.reshape(-1, 3).astype(np.float64), faces.reshape(-1, 3)
 
-    return vertices, faces
+
+def _get_signed_tetrahedra(vertices, faces):
+    """
+    Get the tetrahedra spanned by the origin and every triangle of a closed mesh. Their signed volumes add up to the
+    volume of the mesh; the signs are flipped for meshes with inward facing normals.
+
+    Args:
+    =
+    - vertices (numpy.ndarray): Array of vertices.
+    - faces (numpy.ndarray): Array of triangles.
+
+    Returns:
+    =
+    - corners (numpy.ndarray): Corners of the triangles, shape (M, 3, 3); corners[:, i] is the i-th corner.
+    - determinants (numpy.ndarray): Six times the signed volume of every tetrahedron.
+    """
+    corners = vertices[faces]
+    determinants = np.einsum('ij,ij->i', corners[:, 0], np.cross(corners[:, 1], corners[:, 2]))
+
+    if determinants.sum() < 0:
+        determinants = -determinants
+
+    return corners, determinants
 
 
 def compute_center_of_mass(vertices, faces, density):
     """
-    Compute the center of mass of an object given its vertices, faces, and density.
+    Compute the center of mass of a solid object with uniform density given its vertices and triangles. The mesh is
+    assumed to be closed; for open meshes, whose volume vanishes, the area weighted center of the surface is returned.
 
     Args:
     =
     - vertices (numpy.ndarray): Array of vertices.
-    - faces (numpy.ndarray): Array of faces.
+    - faces (numpy.ndarray): Array of triangles.
     - density (float): Density of the object.
 
     Returns:
     =
     - center_of_mass (numpy.ndarray): Coordinates of the center of mass.
     """
-    total_mass = 0
-    center_of_mass = np.zeros(3)
+    corners, determinants = _get_signed_tetrahedra(vertices, faces)
+    volume = determinants.sum() / 6.0
 
-    for face in faces:
-        v0, v1, v2 = vertices[face[0]], vertices[face[1]], vertices[face[2]]
-        normal = np.cross(v1 - v0, v2 - v0)
-        area = 0.5 * np.linalg.norm(normal)
-        centroid = (v0 + v1 + v2) / 3
-        mass = density * area
-        total_mass += mass
-        center_of_mass += mass * centroid
+    if volume <= 1e-12 * max(np.abs(determinants).sum(), 1e-300):
+        areas = 0.5 * np.linalg.norm(np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]), axis=1)
+        return (areas[:, None] * corners.mean(axis=1)).sum(axis=0) / areas.sum()
 
-    center_of_mass /= total_mass
-
-    return center_of_mass
+    # the centroid of every tetrahedron is the sum of its corners divided by four, the origin is one of them
+    return (determinants[:, None] * corners.sum(axis=1)).sum(axis=0) / (4.0 * determinants.sum())
 
 
 def find_furthest_point(vertices, center):
@@ -75,37 +102,99 @@ def find_furthest_point(vertices, center):
         - max_distance (float): Maximum distance from the center of mass.
     """
     #Calculate the furthest distance of each vertex from the center of mass.
-    distances = [np.linalg.norm(vertex - center) for vertex in vertices]
+    distances = np.linalg.norm(vertices - center, axis=1)
 
     #Find the index of the furthest point.
     furthest_point_index = np.argmax(distances)
 
-    return vertices[furthest_point_index], distances[furthest_point_index]
+    return vertices[furthest_point_index], float(distances[furthest_point_index])
 
 
-def compute_moments_of_inertia(vertices, faces):
+def compute_moments_of_inertia(vertices, faces, center_of_mass=None, density=1.0):
     """
-    Compute the moments of inertia of an object.
+    Compute the inertia tensor of a solid object with uniform density about its center of mass. The second moments
+    of the tetrahedra between the origin and every triangle are summed up and shifted to the center of mass; the mesh
+    is assumed to be closed.
 
     Args:
     =
     - vertices (numpy.ndarray): Array of vertices.
-    - faces (numpy.ndarray): Array of faces.
+    - faces (numpy.ndarray): Array of triangles.
+    - center_of_mass (numpy.ndarray): Center of mass; computed, if None.
+    - density (float): Density of the object.
 
     Returns:
     =
-    - total_inertia (numpy.ndarray): Moments of inertia matrix.
+    - total_inertia (numpy.ndarray): Inertia tensor, shape (3, 3).
     """
-    total_inertia = np.zeros((3, 3))
-    for face in faces:
-        v0, v1, v2 = vertices[face[0]], vertices[face[1]], vertices[face[2]]
-        normal = np.cross(v1 - v0, v2 - v0)
-        inertia = np.outer(normal, normal)
-        total_inertia += inertia
+    if center_of_mass is None:
+        center_of_mass = compute_center_of_mass(vertices, faces, density)
+
+    corners, determinants = _get_signed_tetrahedra(vertices, faces)
+    mass = density * determinants.sum() / 6.0
+
+    # second moment of tetrahedron (0, a, b, c): det / 120 * (sum of outer products of corners + outer product of
+    # their sum)
+    corner_sums = corners.sum(axis=1)
+    covariance = np.einsum('t,tki,tkj->ij', determinants, corners, corners) + \
+                 np.einsum('t,ti,tj->ij', determinants, corner_sums, corner_sums)
+    covariance *= density / 120.0
+
+    # shift to center of mass
+    covariance -= mass * np.outer(center_of_mass, center_of_mass)
+
+    total_inertia = np.trace(covariance) * np.eye(3) - covariance
 
     return total_inertia
 
 
+def get_mass_properties(mesh, density=1.0):
+    """
+    Get the mass properties of a mesh object. The results are cached per mesh data-block and computed again, if the
+    vertices of the mesh changed.
+
+    Args:
+    =
+    - mesh (bpy.types.Object): Mesh object.
+    - density (float): Density of the object.
+
+    Returns:
+    =
+    - mass_properties (dict): "vertices", "faces", "centerOfMass", "inertia", "eigenvectors", "furthestPoint" and
+                              "furthestDistance" of the mesh.
+    """
+    key = (mesh.data.as_pointer(), density)
+
+    vertices = np.empty(len(mesh.data.vertices) * 3, dtype=np.float32)
+    mesh.data.vertices.foreach_get("co", vertices)
+
+    mass_properties = _mass_properties_cache.get(key)
+    if mass_properties is not None and np.array_equal(mass_properties["rawVertices"], vertices):
+        _mass_properties_cache.move_to_end(key)
+        return mass_properties
+
+    vertices, faces = get_single_mesh_data(mesh)
+    center_of_mass = compute_center_of_mass(vertices, faces, density)
+    inertia = compute_moments_of_inertia(vertices, faces, center_of_mass, density)
+    _, eigenvectors = diagonalize_inertia_matrix(inertia)
+    furthest_point, furthest_distance = find_furthest_point(vertices, center_of_mass)
+
+    mass_properties = {"rawVertices": vertices.astype(np.float32).ravel(),
+                       "vertices": vertices,
+                       "faces": faces,
+                       "centerOfMass": center_of_mass,
+                       "inertia": inertia,
+                       "eigenvectors": eigenvectors,
+                       "furthestPoint": furthest_point,
+                       "furthestDistance": furthest_distance}
+
+    _mass_properties_cache[key] = mass_properties
+    while len(_mass_properties_cache) > MASS_PROPERTIES_CACHE_SIZE:
+        _mass_properties_cache.popitem(last=False)
+
+    return mass_properties
+
+
 def diagonalize_inertia_matrix(moments_of_inertia):
     """
     Diagonalize the inertia matrix to find principal axes.
@@ -197,18 +286,9 @@ def step_rotation(rotational_period, observation_time, previous_rotation, mesh):
     =
     - new_rotation (numpy.ndarray): New rotation vector.
     """        
-    # 1. Calculate the Center of Mass of the object ##############################
-    # Read the vertices and faces of the mesh
-    vertices, faces = get_single_mesh_data(mesh)
-
-    # Calculate the Center of Mass  
-    center_of_mass = compute_center_of_mass(vertices, faces, density=1.0)
-
-    # 2. Calculate the Inertia Tensor of the object ##############################
-    moments_of_inertia = compute_moments_of_inertia(vertices, faces)
-
-    # 3. Diagonalize the Inertia Matrix
-    inertia_matrix, eigenvectors = diagonalize_inertia_matrix(moments_of_inertia)
+    # 1.-3. Get the principal axes of the object ################################
+    # The center of mass, the inertia tensor and its eigenvectors are cached per mesh
+    eigenvectors = get_mass_properties(mesh, density=1.0)["eigenvectors"]
 
     # 4. Calculate rotation matrix  
     R = rotational_matrix(rotational_period, observation_time, eigenvectors)
@@ -0,0 +1,119 @@
+# system imports
+import json
+import os
+import socket
+import time
+
+
+class CWorkerClient():
+    """ client for the OAISYS worker service (see terrain_stage_simulator_2_worker.py); does not require blender """
+
+    def __init__(self, socket_path):
+        super(CWorkerClient, self).__init__()
+        self._socket_path = os.path.abspath(socket_path)    # path of UNIX socket of worker [str]
+
+    def request(self, request):
+        """ send single request to worker
+        Args:
+            request:        request [dict]
+        Returns:
+            reply [dict]
+        """
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as _connection:
+            _connection.connect(self._socket_path)
+            _connection.sendall((json.dumps(request) + "\n").encode())
+            _reply = json.loads(_connection.makefile('r').readline())
+
+        if not _reply["ok"]:
+            raise Exception("OAISYS worker request failed: " + _reply["error"])
+        return _reply
+
+    def wait_until_ready(self, timeout=300.0, poll_interval=1.0):
+        """ wait until worker accepts requests
+        Args:
+            timeout:        maximum waiting time in seconds [float]
+            poll_interval:  time between connection attempts in seconds [float]
+        Returns:
+            None
+        """
+
+        _time_start = time.time()
+        while True:
+            try:
+                self.request({"cmd": "status"})
+                return
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.time() - _time_start > timeout:
+                    raise Exception("OAISYS worker at " + self._socket_path + " is not reachable!")
+                time.sleep(poll_interval)
+
+    def submit(self, cfg_path, num_batches=None, output_id_offset=None, base_folder_path=None, resume=False):
+        """ submit config job; arguments correspond to terrain_stage_simulator_2_cmdline.py
+        Args:
+            cfg_path:           path to cfg file [str]
+            num_batches:        overwrites numBatches of cfg, if not None [int]
+            output_id_offset:   overwrites outputIDOffset of cfg, if not None [int]
+            base_folder_path:   existing base output folder, if not None [str]
+            resume:             if True, complete batches in base_folder_path are skipped [bool]
+        Returns:
+            id of job [str]
+        """
+
+        # paths are resolved by the worker, which may run in a different working directory
+        if base_folder_path is not None:
+            base_folder_path = os.path.abspath(base_folder_path)
+
+        return self.request({"cmd": "submit",
+                             "cfgPath": os.path.abspath(cfg_path),
+                             "numBatches": num_batches,
+                             "outputIDOffset": output_id_offset,
+                             "baseFolder": base_folder_path,
+                             "resume": resume})["jobID"]
+
+    def status(self, job_id=None):
+        """ get status of job or of all jobs
+        Args:
+            job_id:         id of job; if None, all jobs are returned [str]
+        Returns:
+            job [dict] or list of jobs [list]
+        """
+
+        if job_id is None:
+            return self.request({"cmd": "status"})["jobs"]
+        return self.request({"cmd": "status", "jobID": job_id})["job"]
+
+    def cancel(self, job_id):
+        """ cancel job; queued jobs are dropped, running jobs are stopped before their next batch
+        Args:
+            job_id:         id of job [str]
+        Returns:
+            job [dict]
+        """
+
+        return self.request({"cmd": "cancel", "jobID": job_id})["job"]
+
+    def wait(self, job_id, poll_interval=5.0):
+        """ wait until job is finished, cancelled or failed
+        Args:
+            job_id:         id of job [str]
+            poll_interval:  time between status requests in seconds [float]
+        Returns:
+            job [dict]
+        """
+
+        while True:
+            _job = self.status(job_id=job_id)
+            if _job["state"] in ["finished", "cancelled", "failed"]:
+                return _job
+            time.sleep(poll_interval)
+
+    def shutdown(self):
+        """ stop worker after the current job
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        self.request({"cmd": "shutdown"})
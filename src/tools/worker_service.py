@@ -0,0 +1,251 @@
+# system imports
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+import traceback
+import uuid
+
+# simulation imports
+import src.TSS_simulation as TSSStageSimulator
+
+# utility imports
+from src.tools.image_cache import CImageCache
+from src.tools.keyframe_buffer import CKeyframeBuffer
+from src.tools.node_group_library import CNodeGroupLibrary
+from src.tools.texture_mip_cache import CTextureMipCache
+from src.tools.timing_module import CTimingModule
+from src.utilities.OAISYSLogger import OAISYSLogger
+
+
+class CWorkerService():
+    """ long-lived OAISYS worker, which runs config jobs one after another inside one blender process
+
+        Requests are received on a UNIX socket. Every request and every reply is a single line of json. Supported
+        commands:
+            {"cmd": "submit", "cfgPath": <str>, "numBatches": <int>, "outputIDOffset": <int>, "baseFolder": <str>,
+             "resume": <bool>}                                  -> {"ok": true, "jobID": <str>}
+            {"cmd": "status", "jobID": <str>}                   -> {"ok": true, "job": <dict>}
+            {"cmd": "status"}                                   -> {"ok": true, "jobs": <list>}
+            {"cmd": "cancel", "jobID": <str>}                   -> {"ok": true, "job": <dict>}
+            {"cmd": "shutdown"}                                 -> {"ok": true}
+        Only cfgPath is mandatory for submit. Jobs are executed in the main thread, since bpy is not thread-safe. A
+        running job is cancelled before its next batch starts; jobs, which are still queued at shutdown, are cancelled.
+        The process-wide settings of the tools (logging, caches, node group library, keyframe buffer) are reset
+        before every job, so that a job never uses the settings of a previous cfg.
+    """
+
+    def __init__(self, socket_path):
+        super(CWorkerService, self).__init__()
+        self._socket_path = os.path.abspath(socket_path)  # path of UNIX socket [str]
+        self._server_socket = None                          # listening socket [socket.socket]
+        self._job_queue = queue.Queue()                     # ids of queued jobs [queue.Queue]
+        self._jobs = {}                                     # all jobs by id [dict]
+        self._jobs_lock = threading.Lock()                  # lock for _jobs [threading.Lock]
+        self._shutdown = threading.Event()                  # set if service is supposed to stop [threading.Event]
+
+    def run(self):
+        """ serve requests and execute jobs until shutdown is requested
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        # create socket ################################################################################################
+        if os.path.exists(self._socket_path):
+            os.remove(self._socket_path)
+        self._server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server_socket.bind(self._socket_path)
+        self._server_socket.listen()
+        self._server_socket.settimeout(1.0)
+        ######################################################################################### end of create socket #
+
+        _server_thread = threading.Thread(target=self._serve)
+        _server_thread.daemon = True
+        _server_thread.start()
+
+        print("OAISYS worker is listening on " + self._socket_path)
+        sys.stdout.flush()
+
+        # execute jobs #################################################################################################
+        try:
+            while not self._shutdown.is_set():
+                try:
+                    _job_id = self._job_queue.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                self._execute_job(job_id=_job_id)
+        finally:
+            self._shutdown.set()
+            _server_thread.join()
+            self._cancel_queued_jobs()
+            self._server_socket.close()
+            if os.path.exists(self._socket_path):
+                os.remove(self._socket_path)
+        ########################################################################################## end of execute jobs #
+
+    def _execute_job(self, job_id):
+        """ execute a single job in the current process
+        Args:
+            job_id:         id of job [str]
+        Returns:
+            None
+        """
+
+        with self._jobs_lock:
+            _job = self._jobs[job_id]
+            if "queued" != _job["state"]:
+                return
+            _job["state"] = "running"
+            _job["startedAt"] = time.time()
+
+        print("OAISYS worker: start job " + job_id + " (" + _job["cfgPath"] + ")")
+        sys.stdout.flush()
+
+        self._reset_process_state()
+
+        try:
+            _stage_simulator = TSSStageSimulator.TSS_OP_CStageSimulator()
+            _result = _stage_simulator.execute(_job["cfgPath"],
+                                               num_batches=_job["numBatches"],
+                                               output_id_offset=_job["outputIDOffset"],
+                                               base_folder_path=_job["baseFolder"],
+                                               resume=_job["resume"],
+                                               stop_requested=lambda: _job["cancelRequested"])
+            _state = "cancelled" if 'CANCELLED' in _result else "finished"
+            _error = None
+        except Exception:
+            _state = "failed"
+            _error = traceback.format_exc()
+            print(_error)
+            # buffered keyframes of the failed batch reference data-blocks, which are removed by the next job
+            CKeyframeBuffer.clear()
+        finally:
+            # a raising job does not reach the end of execute, which disables the profiler
+            CTimingModule.disable_all()
+
+        with self._jobs_lock:
+            _job["state"] = _state
+            _job["error"] = _error
+            _job["finishedAt"] = time.time()
+
+        print("OAISYS worker: job " + job_id + " " + _state)
+        sys.stdout.flush()
+
+    def _reset_process_state(self):
+        """ reset class state of tools, which is shared by all jobs of the process
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        OAISYSLogger.reset_settings()
+        CImageCache.reset_settings()
+        CTextureMipCache.reset_settings()
+        CNodeGroupLibrary.reset_settings()
+        CKeyframeBuffer.clear()
+        CTimingModule.disable_all()
+
+    def _cancel_queued_jobs(self):
+        """ cancel all jobs, which are still queued
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        with self._jobs_lock:
+            for job in self._jobs.values():
+                if "queued" == job["state"]:
+                    job["state"] = "cancelled"
+                    job["finishedAt"] = time.time()
+
+    def _serve(self):
+        """ accept connections and answer requests; one request per connection
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        while not self._shutdown.is_set():
+            try:
+                _connection, _ = self._server_socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            with _connection:
+                try:
+                    _connection.settimeout(10.0)
+                    _request = json.loads(_connection.makefile('r').readline())
+                    _reply = self._handle_request(request=_request)
+                except Exception as e:
+                    _reply = {"ok": False, "error": str(e)}
+                try:
+                    _connection.sendall((json.dumps(_reply) + "\n").encode())
+                except OSError:
+                    pass
+
+    def _handle_request(self, request):
+        """ handle single request
+        Args:
+            request:        decoded request [dict]
+        Returns:
+            reply [dict]
+        """
+
+        _cmd = request.get("cmd")
+
+        if "submit" == _cmd:
+            if "cfgPath" not in request:
+                return {"ok": False, "error": "submit requires cfgPath"}
+            _job_id = uuid.uuid4().hex
+            with self._jobs_lock:
+                self._jobs[_job_id] = {"jobID": _job_id,
+                                       "cfgPath": request["cfgPath"],
+                                       "numBatches": request.get("numBatches"),
+                                       "outputIDOffset": request.get("outputIDOffset"),
+                                       "baseFolder": request.get("baseFolder"),
+                                       "resume": request.get("resume", False),
+                                       "state": "queued",
+                                       "cancelRequested": False,
+                                       "error": None,
+                                       "submittedAt": time.time(),
+                                       "startedAt": None,
+                                       "finishedAt": None}
+            self._job_queue.put(_job_id)
+            return {"ok": True, "jobID": _job_id}
+
+        if "status" == _cmd:
+            with self._jobs_lock:
+                if request.get("jobID") is None:
+                    return {"ok": True, "jobs": [dict(job) for job in self._jobs.values()]}
+                if request["jobID"] not in self._jobs:
+                    return {"ok": False, "error": "unknown job " + str(request["jobID"])}
+                return {"ok": True, "job": dict(self._jobs[request["jobID"]])}
+
+        if "cancel" == _cmd:
+            with self._jobs_lock:
+                if request.get("jobID") not in self._jobs:
+                    return {"ok": False, "error": "unknown job " + str(request.get("jobID"))}
+                _job = self._jobs[request["jobID"]]
+                if "queued" == _job["state"]:
+                    # queued jobs are skipped by the executing loop
+                    _job["state"] = "cancelled"
+                elif "running" == _job["state"]:
+                    # running jobs are stopped before their next batch
+                    _job["cancelRequested"] = True
+                return {"ok": True, "job": dict(_job)}
+
+        if "shutdown" == _cmd:
+            self._shutdown.set()
+            return {"ok": True}
+
+        return {"ok": False, "error": "unknown command " + str(_cmd)}
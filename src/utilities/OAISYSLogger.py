@@ -1,23 +1,104 @@
 import csv
 import os
 import pathlib
+import time
+
+import numpy as np
 
 
 class OAISYSLogger:
-    """docstring for OAISYSLogger"""
+    """ logger of meta data; rows are buffered and written in bulk
+
+        In format "csv", one csv file per identifier is written. The files are kept open for the whole batch and the
+        buffered rows are written, once flushInterval seconds have passed since the last write and when the batch
+        ends (see close_all). In format "npz", all rows of a batch are kept in memory and written to one columnar file
+        <batch>/meta_data/meta_data.npz with one array per file, e.g. "sensor_data/rgbLeft".
+    """
+
+    FORMATS = ["csv", "npz"]
+    DEFAULT_SETTINGS = {"format": "csv", "flushInterval": 10.0}
+
+    _settings = dict(DEFAULT_SETTINGS)                      # logging settings of all loggers [dict]
+    _open_loggers = []                                      # loggers with open files or buffered rows [list]
 
     def __init__(self, output_path=None):
         self.logger = None
         self.logging_handles = {}
         self.log_dir_created = False
+        self.output_path = None
         if output_path is not None:
             self.output_path = output_path
+        self._files = {}                # open csv files; identifier -> file [dict]
+        self._buffers = {}              # buffered rows; identifier -> list of rows [dict]
+        self._last_flush = time.time()  # time of last write [float]
+        self._registered = False        # True, if logger is in _open_loggers [bool]
+        self._created_files = set()     # identifiers, whose csv file was created by this logger [set]
+
+    @classmethod
+    def configure(cls, settings):
+        """ set logging settings of all loggers
+        Args:
+            settings:               settings; format ("csv" or "npz") and flushInterval in seconds [dict]
+        Returns:
+            None
+        """
+
+        cls._settings = {**cls._settings, **settings}
+        if cls._settings["format"] not in cls.FORMATS:
+            raise Exception("Unknown meta data format " + str(cls._settings["format"]) + "!")
+
+    @classmethod
+    def reset_settings(cls):
+        """ restore default settings and close loggers, which are still open, e.g. before the next job of a worker
+        Args:
+            None
+        Returns:
+            None
+        """
+
+        for logger in cls._open_loggers:
+            logger.close()
+        cls._open_loggers = []
+        cls._settings = dict(cls.DEFAULT_SETTINGS)
+
+    @classmethod
+    def close_all(cls, meta_data_path):
+        """ write all buffered rows and close all files; called at the end of every batch
+        Args:
+            meta_data_path:         meta data folder of batch; npz files are written to this folder [str]
+        Returns:
+            None
+        """
+
+        _columns = {}
+        for logger in cls._open_loggers:
+            if "npz" == cls._settings["format"]:
+                for identifier, rows in logger._buffers.items():
+                    _file_path = os.path.splitext(logger.logging_handles[identifier])[0]
+                    _columns[os.path.relpath(_file_path, meta_data_path).replace(os.sep, "/")] = rows
+                logger._buffers = {}
+            logger.close()
+            logger._registered = False
+        cls._open_loggers = []
+
+        if _columns:
+            pathlib.Path(meta_data_path).mkdir(parents=True, exist_ok=True)
+            _arrays = {}
+            for name, rows in _columns.items():
+                try:
+                    _arrays[name] = np.asarray(rows, dtype=np.float64)
+                except ValueError:
+                    _arrays[name] = np.asarray(rows, dtype=str)
+            np.savez(os.path.join(meta_data_path, "meta_data.npz"), **_arrays)
 
     def reset(self):
+        self.close()
         self.logger = None
         self.logging_handles = {}
         self.log_dir_created = False
         self.output_path = None
+        self._buffers = {}
+        self._created_files = set()
 
     def set_output_path(self, output_path):
         self.output_path = output_path
@@ -32,13 +113,47 @@ class OAISYSLogger:
         self.log_dir_created = True
         pathlib.Path(path).mkdir(parents=True, exist_ok=True)
 
-    def log_pose(self, identifier, value, file_name=None):
-        """ log pose to csv
+    def flush(self):
+        """ write buffered csv rows
+        Args:
+            None
+        Returns:
+            None
+        """
+        self._last_flush = time.time()
+        if "csv" != self._settings["format"]:
+            return
+
+        for identifier, rows in self._buffers.items():
+            if not rows:
+                continue
+            # files are created(w) on first write, which overwrites files of previous runs, and opened(a) afterwards
+            if identifier not in self._files:
+                writer_mode = 'a' if identifier in self._created_files else 'w'
+                self._files[identifier] = open(self.logging_handles[identifier], mode=writer_mode, newline='')
+                self._created_files.add(identifier)
+            self._files[identifier].write(''.join(rows))
+            self._files[identifier].flush()
+            self._buffers[identifier] = []
+
+    def close(self):
+        """ write buffered rows and close files
+        Args:
+            None
+        Returns:
+            None
+        """
+        self.flush()
+        for file in self._files.values():
+            file.close()
+        self._files = {}
+
+    def _log_row(self, identifier, value, file_name):
+        """ buffer row of identifier
         Args:
             identifier:             identifier on which data has to be logged [dict]
-            value:                  value, which has to be logged (x, y, z, qw, qx, qy, qz) [array]
-            file_name:              name of file, where data is stored. By default, this parameter will be equal as the
-                                    identifier [str]
+            value:                  values of row [list]
+            file_name:              name of file, where data is stored; by default the identifier [str]
         Returns:
             None
         """
@@ -50,18 +165,32 @@ class OAISYSLogger:
         if file_name is None:
             file_name = identifier
 
-        # store identifier information and set write mode
+        # store identifier information
         if identifier not in self.logging_handles:
             self.logging_handles[identifier] = os.path.join(self.output_path, file_name + ".csv")
-            writer_mode = 'w'
+            self._buffers[identifier] = []
+        if not self._registered:
+            OAISYSLogger._open_loggers.append(self)
+            self._registered = True
+
+        if "csv" == self._settings["format"]:
+            self._buffers[identifier].append(''.join(str(v) + ', ' for v in value) + '\n')
+            if time.time() - self._last_flush > self._settings["flushInterval"]:
+                self.flush()
         else:
-            writer_mode = 'a'
+            self._buffers[identifier].append(list(value))
 
-        # create(w)/open(a) csv file and store pose data
-        with open(self.logging_handles[identifier], mode=writer_mode, newline='') as file:
-            for v in value:
-                file.write(str(v) + ', ')
-            file.write('\n')
+    def log_pose(self, identifier, value, file_name=None):
+        """ log pose to csv
+        Args:
+            identifier:             identifier on which data has to be logged [dict]
+            value:                  value, which has to be logged (x, y, z, qw, qx, qy, qz) [array]
+            file_name:              name of file, where data is stored. By default, this parameter will be equal as the
+                                    identifier [str]
+        Returns:
+            None
+        """
+        self._log_row(identifier=identifier, value=value, file_name=file_name)
 
     def log_scalar(self, identifier, value, file_name=None):
         """ log scalar value to file
@@ -73,22 +202,4 @@ class OAISYSLogger:
         Returns:
             None
         """
-        # check if log folder exist
-        if self.log_dir_created is False:
-            self.create_log_dir(path=self.output_path)
-
-        # set file_name if not done yet
-        if file_name is None:
-            file_name = identifier
-
-        # store identifier information and set write mode
-        if identifier not in self.logging_handles:
-            self.logging_handles[identifier] = os.path.join(self.output_path, file_name + ".csv")
-            writer_mode = 'w'
-        else:
-            writer_mode = 'a'
-
-        # create(w)/open(a) csv file and store scalar
-        with open(self.logging_handles[identifier], mode=writer_mode, newline='') as file:
-            file.write(str(value) + ', ')
-            file.write('\n')
+        self._log_row(identifier=identifier, value=[value], file_name=file_name)
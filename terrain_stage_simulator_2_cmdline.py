@@ -36,10 +36,22 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
     parser.add_argument('-c', required=False, help="config json file.")
+    parser.add_argument('--num-batches', dest='num_batches', type=int, default=None,
+                        help="overwrites numBatches of the config file.")
+    parser.add_argument('--output-id-offset', dest='output_id_offset', type=int, default=None,
+                        help="overwrites outputIDOffset of the config file.")
+    parser.add_argument('--base-folder', dest='base_folder', default=None,
+                        help="existing output folder, which is used instead of a new timestamped folder.")
+    parser.add_argument('--resume', dest='resume', action='store_true',
+                        help="skip batches in base folder, which are already complete.")
     args = parser.parse_args(argv)
     _configPath = args.c
 
     # setup stage simulator
     stage_simulator = TSSStageSimulator.TSS_OP_CStageSimulator()
-    stage_simulator.execute(_configPath)
+    stage_simulator.execute(_configPath,
+                            num_batches=args.num_batches,
+                            output_id_offset=args.output_id_offset,
+                            base_folder_path=args.base_folder,
+                            resume=args.resume)
 
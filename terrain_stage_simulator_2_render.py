@@ -0,0 +1,32 @@
+# blender imports
+import bpy
+
+# system imports
+import sys
+import argparse
+
+# import files from TSS
+from src.tools.deferred_render import CDeferredRender
+
+if __name__ == "__main__":
+
+    argv = sys.argv
+
+    if "--" not in argv:
+        argv = []  # as if no args are passed
+    else:
+        argv = argv[argv.index("--") + 1:]  # get all args after "--"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--base-folder', required=True, help="base output folder of a run with renderMode 'deferred', or a single batch folder.")
+    parser.add_argument('--worker-id', type=int, default=0, help="id of this worker, 0 <= worker-id < num-workers.")
+    parser.add_argument('--num-workers', type=int, default=1, help="number of workers, which render the batches together.")
+    parser.add_argument('--frames-per-chunk', type=int, default=0, help="number of frames per animation render; if < 1, every render job is split into num-workers frame ranges.")
+    args = parser.parse_args(argv)
+
+    # render share of this worker; frame ranges, which are already rendered, are skipped
+    deferred_render = CDeferredRender()
+    deferred_render.render(batch_folder_paths=CDeferredRender.find_batch_folders(base_folder_path=args.base_folder),
+                           worker_id=args.worker_id,
+                           num_workers=args.num_workers,
+                           frames_per_chunk=args.frames_per_chunk)
@@ -0,0 +1,26 @@
+# blender imports
+import bpy
+
+# system imports
+import sys
+import argparse
+
+# import files from TSS
+from src.tools.worker_service import CWorkerService
+
+if __name__ == "__main__":
+
+    argv = sys.argv
+
+    if "--" not in argv:
+        argv = []  # as if no args are passed
+    else:
+        argv = argv[argv.index("--") + 1:]  # get all args after "--"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--socket', required=True, help="path of UNIX socket, on which jobs are received.")
+    args = parser.parse_args(argv)
+
+    # run worker until shutdown is requested
+    worker_service = CWorkerService(socket_path=args.socket)
+    worker_service.run()
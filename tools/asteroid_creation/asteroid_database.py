@@ -5,6 +5,11 @@ import random
 import time
 # from tqdm import tqdm
 import subprocess
+import sys
+
+# worker client of OAISYS; repo root is two levels above this file
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")))
+from src.tools.worker_client import CWorkerClient
 
 # Path to the original JSON file
 original_file_path = './cfgExamples/wout_paper.json'
@@ -19,6 +24,8 @@ parent_directory = os.getcwd()
 run_script_path = "./run_oaisys.py"
 # Blender install directory
 blender_install_path = "/home/guer_an/Desktop"
+# Socket of the persistent OAISYS worker; blender is started once and reused for all runs
+worker_socket_path = os.path.join(os.getcwd(), "oaisys_worker.sock")
 
 # Variables to change:
 # Simulation parameters -> 15 x (1 x 50) = 2,500 images FOR TRAIN PURPOSES
@@ -53,6 +60,18 @@ runs_folder = os.path.join(parent_directory, "run")
 if not os.path.exists(runs_folder):
     os.makedirs(runs_folder)
 
+# Start persistent OAISYS worker
+worker_process = subprocess.Popen([
+    "python3",
+    run_script_path,
+    "--blender-install-path",
+    blender_install_path,
+    "--serve",
+    worker_socket_path
+])
+worker = CWorkerClient(worker_socket_path)
+worker.wait_until_ready()
+
 for i in range(num_runs):
     print("=========================================================")
     print(f"Run number: {i}/{num_runs} =======================================")
@@ -114,16 +133,11 @@ for i in range(num_runs):
         json.dump(config_data, file, indent=2)
         file.truncate()
 
-    # Command template to execute
-    command_template = [
-        "python3",
-        run_script_path,
-        "--blender-install-path",
-        blender_install_path,
-        "--config-file"
-    ]
-    # Execute the command with the copied config file path
-    subprocess.run(command_template + [run_config_file_path])
+    # Submit the copied config file to the worker and wait for the run to finish
+    job_id = worker.submit(run_config_file_path)
+    job = worker.wait(job_id)
+    if job["state"] != "finished":
+        print(f"Run {i} {job['state']}: {job['error']}")
 
     # Record the time taken for this run
     run_end = time.time()
@@ -133,6 +147,10 @@ for i in range(num_runs):
 
 
 
+# Stop persistent OAISYS worker
+worker.shutdown()
+worker_process.wait()
+
 total_time_end = time.time()
 total_time_taken = total_time_end - total_time_start
 